@@ -92,6 +92,7 @@ fastapi_users = FastAPIUsers[User, int](
 
 # Dependencies
 current_active_user = fastapi_users.current_user(active=True)
+current_optional_user = fastapi_users.current_user(active=True, optional=True)
 current_verified_user = fastapi_users.current_user(active=True, verified=True)
 current_superuser = fastapi_users.current_user(active=True, superuser=True)
 
@@ -0,0 +1,32 @@
+"""
+Measure OCR latency with the adaptive two-tier mode off and on.
+
+Usage (from the backend directory):
+    python -m benchmarks.adaptive path/to/images/*.jpg [--repeat 3]
+
+With adaptive mode on, the report also shows how many images were accepted
+by the fast tier and how many escalated to the full path. A `<image>.txt`
+next to an image is used as ground truth for the CER.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.preprocessing import load_images, run_mode, print_report
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive two-tier OCR before/after comparison")
+    parser.add_argument("images", nargs="+", help="Image files to OCR")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the image set per mode")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+
+    for label, adaptive in (("full path only", False), ("adaptive", True)):
+        report = run_mode(images, args.repeat, adaptive=adaptive)
+        print_report(label, report)
+
+if __name__ == "__main__":
+    main()
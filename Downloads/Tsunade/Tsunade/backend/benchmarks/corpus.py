@@ -0,0 +1,136 @@
+"""
+Generate a deterministic synthetic prescription corpus for OCR benchmarks.
+
+Usage (from the backend directory):
+    python -m benchmarks.corpus benchmarks/corpus [--count 24] [--seed 7]
+
+Each image `rx-XXX-<dpi>dpi-<angle>deg.png` is written next to a matching
+`.txt` ground truth file, the layout the other benchmarks expect. The same
+seed always produces the same corpus, so results are comparable across runs.
+"""
+import argparse
+import os
+import random
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+DRUG_NAMES = [
+    "Amoxicillin", "Paracetamol", "Metformin", "Atorvastatin", "Amlodipine",
+    "Omeprazole", "Azithromycin", "Cetirizine", "Pantoprazole", "Losartan",
+    "Ibuprofen", "Levothyroxine", "Montelukast", "Ciprofloxacin", "Doxycycline",
+    "Metoprolol", "Clopidogrel", "Salbutamol", "Prednisolone", "Ranitidine"
+]
+STRENGTHS = ["5mg", "10mg", "20mg", "25mg", "40mg", "50mg", "100mg", "250mg", "500mg", "650mg"]
+FORMS = ["Tab", "Cap", "Syp", "Inj"]
+FREQUENCIES = ["OD", "BD", "TDS", "QID", "1-0-1", "1-1-1", "0-0-1", "SOS"]
+DURATIONS = ["3 days", "5 days", "7 days", "10 days", "14 days", "1 month"]
+PATIENTS = ["Ravi Kumar", "Anita Sharma", "John Mathew", "Priya Nair", "Arjun Rao", "Meera Iyer"]
+DOCTORS = ["Dr. S. Menon", "Dr. A. Gupta", "Dr. R. Patel", "Dr. K. Das"]
+
+RESOLUTIONS = [150, 200, 300]
+ROTATIONS = [0.0, -2.0, 3.0]
+PAGE_SIZE_INCHES = (8.5, 11.0)
+FONT_CANDIDATES = ["DejaVuSans.ttf", "LiberationSans-Regular.ttf", "Arial.ttf", "arial.ttf"]
+
+def _load_font(size: int):
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+def prescription_lines(rng: random.Random) -> List[str]:
+    """
+    Ground-truth text of one prescription
+    """
+    lines = [
+        f"Patient: {rng.choice(PATIENTS)}   Age: {rng.randint(18, 85)}",
+        f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        "Rx"
+    ]
+    for index, drug in enumerate(rng.sample(DRUG_NAMES, rng.randint(2, 5)), start=1):
+        lines.append(
+            f"{index}. {rng.choice(FORMS)} {drug} {rng.choice(STRENGTHS)} "
+            f"{rng.choice(FREQUENCIES)} x {rng.choice(DURATIONS)}"
+        )
+    lines.append(rng.choice(DOCTORS))
+    return lines
+
+def render_prescription(lines: List[str], dpi: int, angle: float, rng: random.Random) -> Image.Image:
+    """
+    Draw prescription text on a letter-size page with scanner-like noise
+    """
+    width = int(PAGE_SIZE_INCHES[0] * dpi)
+    height = int(PAGE_SIZE_INCHES[1] * dpi)
+    image = Image.new("L", (width, height), 245)
+    draw = ImageDraw.Draw(image)
+
+    font = _load_font(max(10, dpi // 6))
+    margin = dpi
+    line_height = int(dpi * 0.35)
+    y = margin
+    for line in lines:
+        draw.text((margin + rng.randint(-4, 4), y), line, fill=rng.randint(10, 50), font=font)
+        y += line_height
+
+    # Speckle noise and a faint fold line, as on a photocopied prescription
+    for _ in range(width * height // 2000):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.point((x, y), fill=rng.randint(120, 200))
+    fold_y = rng.randrange(height // 3, 2 * height // 3)
+    draw.line((0, fold_y, width, fold_y + rng.randint(-10, 10)), fill=215, width=max(1, dpi // 100))
+
+    image = image.filter(ImageFilter.GaussianBlur(radius=dpi / 300.0 * 0.6))
+    if angle:
+        image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=245)
+    image = image.convert("RGB")
+    image.info["dpi"] = (dpi, dpi)
+    return image
+
+def build_corpus(
+    output_dir: str,
+    count: int = 24,
+    seed: int = 7,
+    resolutions: List[int] = RESOLUTIONS,
+    rotations: List[float] = ROTATIONS
+) -> List[Tuple[str, str]]:
+    """
+    Write `count` prescriptions, cycling through resolutions and rotations
+
+    Returns:
+        (image path, ground truth path) pairs
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    written = []
+    for index in range(count):
+        dpi = resolutions[index % len(resolutions)]
+        angle = rotations[(index // len(resolutions)) % len(rotations)]
+        lines = prescription_lines(rng)
+
+        name = f"rx-{index:03d}-{dpi}dpi-{int(angle)}deg"
+        image_path = os.path.join(output_dir, name + ".png")
+        truth_path = os.path.join(output_dir, name + ".txt")
+        render_prescription(lines, dpi, angle, rng).save(image_path, dpi=(dpi, dpi))
+        with open(truth_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        written.append((image_path, truth_path))
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic prescription OCR corpus")
+    parser.add_argument("output_dir", help="Directory for the generated images and ground truth")
+    parser.add_argument("--count", type=int, default=24, help="Number of prescriptions")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    written = build_corpus(args.output_dir, args.count, args.seed)
+    print(f"Wrote {len(written)} prescriptions to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the tesserocr and pytesseract OCR backends against each other.
+
+Usage (from the backend directory):
+    python -m benchmarks.engines path/to/images/*.jpg [--repeat 3] [--no-preprocess]
+
+Both engines OCR the same images with the same preprocessing settings.
+A `<image>.txt` next to an image is used as ground truth for the CER.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ocr import OCRProcessor
+from benchmarks.metrics import character_error_rate, percentile
+from benchmarks.preprocessing import load_images
+
+def run_engine(processor: OCRProcessor, images, preprocess: bool, repeat: int):
+    # Warm-up call so one-off model loading is reported separately
+    warmup_start = time.perf_counter()
+    processor.extract_text_with_timings(images[0][1], preprocess=preprocess, adaptive=False)
+    warmup_ms = (time.perf_counter() - warmup_start) * 1000
+
+    ocr_latencies = []
+    error_rates = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for image_path, image_data, truth in images:
+            result = processor.extract_text_with_timings(image_data, preprocess=preprocess, adaptive=False)
+            ocr_latencies.append(result["timings"]["ocr"])
+            if truth is not None:
+                error_rates.append(character_error_rate(result["text"], truth))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "warmup_ms": warmup_ms,
+        "images_per_sec": len(ocr_latencies) / elapsed if elapsed else 0.0,
+        "ocr_p50_ms": percentile(ocr_latencies, 50),
+        "ocr_p95_ms": percentile(ocr_latencies, 95),
+        "cer": sum(error_rates) / len(error_rates) if error_rates else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="tesserocr vs pytesseract OCR benchmark")
+    parser.add_argument("images", nargs="+", help="Image files to OCR")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the image set per engine")
+    parser.add_argument("--no-preprocess", action="store_true", help="Disable the preprocessing pipeline")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+
+    for engine_name in ("pytesseract", "tesserocr"):
+        processor = OCRProcessor(engine=engine_name)
+        if processor.engine is None or processor.engine.name != engine_name:
+            print(f"\n[{engine_name}] not available, skipped")
+            continue
+
+        report = run_engine(processor, images, not args.no_preprocess, args.repeat)
+        cer = "n/a" if report["cer"] is None else f"{report['cer']:.3f}"
+        print(f"\n[{engine_name}] {report['images_per_sec']:.2f} images/sec, "
+              f"OCR p50 {report['ocr_p50_ms']:.0f} ms, p95 {report['ocr_p95_ms']:.0f} ms, "
+              f"first call {report['warmup_ms']:.0f} ms, CER {cer}")
+
+if __name__ == "__main__":
+    main()
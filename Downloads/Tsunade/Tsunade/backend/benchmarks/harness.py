@@ -0,0 +1,154 @@
+"""
+OCR throughput and latency harness across engines, pipeline settings and
+concurrency levels.
+
+Usage (from the backend directory):
+    python -m benchmarks.harness [--corpus benchmarks/corpus] [--concurrency 4]
+        [--engines pytesseract,tesserocr] [--repeat 1]
+        [--save results.json] [--compare baseline.json --tolerance 0.15]
+
+The synthetic corpus (see benchmarks.corpus) is generated first if the
+directory is empty. Every configuration runs at concurrency 1..N in a fresh
+process pool, one OCRProcessor per worker, and reports p50/p95 latency,
+images/sec, peak worker RSS and character error rate. With --compare, the
+run exits non-zero when a configuration got slower or less accurate than
+the baseline by more than the tolerance.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import build_corpus
+from benchmarks.metrics import character_error_rate, percentile
+from benchmarks.preprocessing import load_images
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# Pipeline settings passed to extract_text_with_timings
+PIPELINES = {
+    "raw": {"preprocess": False, "detect_regions": False, "adaptive": False},
+    "preprocessed": {"preprocess": True, "detect_regions": False, "adaptive": False},
+    "regions": {"preprocess": True, "detect_regions": True, "adaptive": False},
+    "adaptive": {"preprocess": True, "detect_regions": True, "adaptive": True}
+}
+
+_processor = None
+
+def _init_worker(engine_name: str):
+    global _processor
+    from utils.ocr import OCRProcessor
+    _processor = OCRProcessor(engine=engine_name)
+
+def _ocr_one(image_data: bytes, options: dict):
+    start = time.perf_counter()
+    result = _processor.extract_text_with_timings(image_data, **options)
+    latency_ms = (time.perf_counter() - start) * 1000
+    # ru_maxrss is reported in KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result["text"], latency_ms, peak_rss_mb
+
+def engine_available(engine_name: str) -> bool:
+    from utils.ocr import OCRProcessor
+    processor = OCRProcessor(engine=engine_name)
+    return processor.engine is not None and processor.engine.name == engine_name
+
+def run_configuration(images, engine_name: str, options: dict, concurrency: int, repeat: int) -> dict:
+    """
+    OCR the corpus with `concurrency` worker processes and summarise the run
+    """
+    with ProcessPoolExecutor(max_workers=concurrency, initializer=_init_worker, initargs=(engine_name,)) as pool:
+        # Warm every worker so model loading is not counted as latency
+        list(pool.map(_ocr_one, [images[0][1]] * concurrency, [options] * concurrency))
+
+        work = [(data, truth) for _ in range(repeat) for _, data, truth in images]
+        start = time.perf_counter()
+        futures = [(pool.submit(_ocr_one, data, options), truth) for data, truth in work]
+        results = [(future.result(), truth) for future, truth in futures]
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for (_, latency, _), _ in results]
+    error_rates = [character_error_rate(text, truth) for (text, _, _), truth in results if truth is not None]
+    return {
+        "images_per_sec": len(results) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "peak_rss_mb": max(rss for (_, _, rss), _ in results),
+        "cer": sum(error_rates) / len(error_rates) if error_rates else None
+    }
+
+def find_regressions(results: dict, baseline: dict, tolerance: float):
+    """
+    Configurations that are slower or less accurate than the baseline
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {previous['p95_ms']:.0f} -> {current['p95_ms']:.0f} ms")
+        if current["images_per_sec"] < previous["images_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: {previous['images_per_sec']:.2f} -> {current['images_per_sec']:.2f} images/sec")
+        if current["cer"] is not None and previous.get("cer") is not None and current["cer"] > previous["cer"] + 0.01:
+            regressions.append(f"{key}: CER {previous['cer']:.3f} -> {current['cer']:.3f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR throughput/latency harness")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Corpus directory (generated if empty)")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="Highest concurrency level to run")
+    parser.add_argument("--engines", default="pytesseract,tesserocr", help="Comma-separated OCR engines")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help="Comma-separated pipeline settings")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the corpus per configuration")
+    parser.add_argument("--save", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --save run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "*.png")))
+    if not paths:
+        build_corpus(args.corpus)
+        paths = sorted(glob.glob(os.path.join(args.corpus, "*.png")))
+    images = load_images(paths)
+    print(f"Corpus: {len(images)} images from {args.corpus}")
+
+    results = {}
+    for engine_name in args.engines.split(","):
+        if not engine_available(engine_name):
+            print(f"\n[{engine_name}] not available, skipped")
+            continue
+        for pipeline in args.pipelines.split(","):
+            for concurrency in range(1, max(1, args.concurrency) + 1):
+                key = f"{engine_name}/{pipeline}/c{concurrency}"
+                report = run_configuration(images, engine_name, PIPELINES[pipeline], concurrency, args.repeat)
+                results[key] = report
+                cer = "n/a" if report["cer"] is None else f"{report['cer']:.3f}"
+                print(f"[{key}] {report['images_per_sec']:.2f} images/sec, "
+                      f"p50 {report['p50_ms']:.0f} ms, p95 {report['p95_ms']:.0f} ms, "
+                      f"peak RSS {report['peak_rss_mb']:.0f} MB, CER {cer}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+if __name__ == "__main__":
+    main()
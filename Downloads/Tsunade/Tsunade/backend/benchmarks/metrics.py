@@ -0,0 +1,39 @@
+from typing import List
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Levenshtein distance between two strings
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+def character_error_rate(predicted: str, truth: str) -> float:
+    """
+    Edit distance normalised by ground-truth length, ignoring whitespace layout
+    """
+    predicted = " ".join(predicted.split())
+    truth = " ".join(truth.split())
+    if not truth:
+        return 0.0 if not predicted else 1.0
+    return edit_distance(predicted, truth) / len(truth)
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
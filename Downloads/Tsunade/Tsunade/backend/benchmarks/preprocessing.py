@@ -0,0 +1,89 @@
+"""
+Compare OCR throughput and accuracy with the preprocessing pipeline on and off.
+
+Usage (from the backend directory):
+    python -m benchmarks.preprocessing path/to/images/*.jpg [--repeat 3]
+
+If a `<image>.txt` file sits next to an image it is used as ground truth
+for the character error rate.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ocr import ocr_processor
+from benchmarks.metrics import character_error_rate, percentile
+
+def load_ground_truth(image_path: str):
+    truth_path = os.path.splitext(image_path)[0] + ".txt"
+    if os.path.exists(truth_path):
+        with open(truth_path, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+def load_images(paths):
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((path, f.read(), load_ground_truth(path)))
+    return images
+
+def print_report(label: str, report):
+    cer = "n/a" if report["cer"] is None else f"{report['cer']:.3f}"
+    print(f"\n[{label}] {report['images_per_sec']:.2f} images/sec, "
+          f"p50 {report['p50_ms']:.0f} ms, p95 {report['p95_ms']:.0f} ms, CER {cer}")
+    if report.get("tiers"):
+        print("  tiers: " + ", ".join(f"{tier}={count}" for tier, count in sorted(report["tiers"].items())))
+    for stage, ms in report["stages_ms"].items():
+        print(f"  {stage:<10} {ms:8.1f} ms")
+
+def run_mode(images, repeat: int, **options):
+    """
+    OCR every image `repeat` times with the given extract_text_with_timings options
+    """
+    latencies = []
+    stage_totals = defaultdict(float)
+    error_rates = []
+    tiers = Counter()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for image_path, image_data, truth in images:
+            call_start = time.perf_counter()
+            result = ocr_processor.extract_text_with_timings(image_data, **options)
+            latencies.append((time.perf_counter() - call_start) * 1000)
+            tiers[result["tier"]] += 1
+            for stage, ms in result["timings"].items():
+                stage_totals[stage] += ms
+            if truth is not None:
+                error_rates.append(character_error_rate(result["text"], truth))
+    elapsed = time.perf_counter() - start
+
+    runs = len(latencies)
+    return {
+        "images_per_sec": runs / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "stages_ms": {stage: total / runs for stage, total in stage_totals.items()},
+        "cer": sum(error_rates) / len(error_rates) if error_rates else None,
+        "tiers": dict(tiers)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR preprocessing on/off comparison")
+    parser.add_argument("images", nargs="+", help="Image files to OCR")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the image set per mode")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+
+    for label, preprocess in (("raw", False), ("preprocessed", True)):
+        report = run_mode(images, args.repeat, preprocess=preprocess, detect_regions=False, adaptive=False)
+        print_report(label, report)
+
+if __name__ == "__main__":
+    main()
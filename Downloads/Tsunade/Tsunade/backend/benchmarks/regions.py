@@ -0,0 +1,73 @@
+"""
+Measure OCR latency with text-region detection off and on.
+
+Usage (from the backend directory):
+    python -m benchmarks.regions path/to/images/*.jpg [--repeat 3] [--no-preprocess]
+    python -m benchmarks.regions path/to/images/*.jpg --detect-only
+
+Both runs use the same images and preprocessing settings. A `<image>.txt`
+next to an image is used as ground truth for the CER, so any accuracy cost
+of cropping shows up next to the latency gain. --detect-only skips OCR and
+reports how many regions are found per page, the share of the page they
+cover and the detection time, on raw and preprocessed pages.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.preprocessing import load_images, run_mode, print_report
+
+def detect_only(images):
+    """
+    Region detection statistics without running Tesseract
+    """
+    from utils.ocr import ImagePreprocessor, TextRegionDetector
+
+    preprocessor = ImagePreprocessor()
+    detector = TextRegionDetector()
+    for label, preprocess in (("raw", False), ("preprocessed", True)):
+        counts, coverages, timings = [], [], []
+        for _, image_data, _ in images:
+            image = Image.open(io.BytesIO(image_data)).convert("RGB")
+            if preprocess:
+                image, _ = preprocessor.process(image)
+            pixels = preprocessor._to_grayscale(image)
+
+            start = time.perf_counter()
+            regions = detector.detect(pixels)
+            timings.append((time.perf_counter() - start) * 1000)
+            counts.append(len(regions))
+            coverages.append(sum((right - left) * (bottom - top) for left, top, right, bottom in regions) / pixels.size)
+
+        print(f"\n[{label}] regions found on {sum(count > 0 for count in counts)}/{len(counts)} pages, "
+              f"{sum(counts)} regions, mean coverage {np.mean(coverages):.2f}")
+        print(f"  detection  mean {np.mean(timings):.1f} ms, p95 {np.percentile(timings, 95):.1f} ms")
+        print(f"  per page   {counts}")
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR text-region detection before/after comparison")
+    parser.add_argument("images", nargs="+", help="Image files to OCR")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the image set per mode")
+    parser.add_argument("--no-preprocess", action="store_true", help="Disable the preprocessing pipeline")
+    parser.add_argument("--detect-only", action="store_true", help="Report region detection only, without OCR")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    if args.detect_only:
+        detect_only(images)
+        return
+    preprocess = not args.no_preprocess
+
+    for label, detect_regions in (("full page", False), ("text regions", True)):
+        report = run_mode(images, args.repeat, preprocess=preprocess, detect_regions=detect_regions, adaptive=False)
+        print_report(label, report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Local stand-in for the OpenAI chat completions API, for load testing the
+GPT-backed routes without spending quota.
+
+Usage (from the backend directory):
+    python -m benchmarks.stub_llm [--port 8900] [--latency lognormal:1200,0.5]
+        [--tokens-per-second 40] [--error-rate 0.01] [--rate-limit-rate 0.02]
+        [--retry-after 2] [--seed 7]
+
+Then start the API against it, for every method or only some of them:
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub uvicorn main:app
+    OPENAI_BASE_URL_MEDICINE_INFO=http://127.0.0.1:8900/v1 ...
+
+Each request is recognised by the X-GPT-Method header GPTProcessor sends
+with it and gets a canned answer in the JSON shape that method parses (the
+function-call arguments of analyze_prescription follow
+PRESCRIPTION_ANALYSIS_SCHEMA); chat and summaries get plain text. Requests
+without the header are routed on whether they carry `functions`.
+Streaming is supported.
+
+Latency specs, in milliseconds until the response (or first token):
+    fixed:MS  uniform:MIN,MAX  normal:MEAN,STDDEV  lognormal:MEDIAN,SIGMA
+A fraction of requests can fail with 500 (--error-rate) or 429 with a
+Retry-After header (--rate-limit-rate). GET /stats reports request counts.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import DRUG_NAMES
+
+# Header naming the GPTProcessor method of a request (utils.gpt.GPT_METHOD_HEADER)
+METHOD_HEADER = "X-GPT-Method"
+
+# Condition each known drug suggests, for the canned disease lists
+DRUG_CONDITIONS = {
+    "metformin": "Diabetes Type 2",
+    "atorvastatin": "Hyperlipidemia",
+    "amlodipine": "Hypertension",
+    "losartan": "Hypertension",
+    "metoprolol": "Hypertension",
+    "levothyroxine": "Hypothyroidism",
+    "montelukast": "Asthma",
+    "salbutamol": "Asthma",
+    "omeprazole": "Gastroesophageal Reflux Disease",
+    "pantoprazole": "Gastroesophageal Reflux Disease",
+    "ranitidine": "Gastroesophageal Reflux Disease",
+    "clopidogrel": "Coronary Artery Disease",
+    "cetirizine": "Allergic Rhinitis",
+    "ibuprofen": "Arthritis",
+    "prednisolone": "Arthritis"
+}
+DEFAULT_MEDICINES = ["Paracetamol"]
+DEFAULT_CONDITION = "Bacterial Infection"
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Sampler of latencies in seconds for a spec like "lognormal:1200,0.5"
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000.0
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000.0
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000.0
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000.0
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+def find_medicines(text: str) -> List[str]:
+    """
+    Known drug names mentioned in a prompt, in order of appearance
+    """
+    found = sorted(
+        (match.start(), drug)
+        for drug in DRUG_NAMES
+        for match in [re.search(re.escape(drug), text, re.IGNORECASE)]
+        if match
+    )
+    return [drug for _, drug in found] or list(DEFAULT_MEDICINES)
+
+def conditions_for(medicines: List[str]) -> List[str]:
+    conditions = []
+    for medicine in medicines:
+        condition = DRUG_CONDITIONS.get(medicine.lower(), DEFAULT_CONDITION)
+        if condition not in conditions:
+            conditions.append(condition)
+    return conditions
+
+def _line_after(prompt: str, label: str) -> str:
+    match = re.search(re.escape(label) + r"\s*(.*)", prompt)
+    return match.group(1).strip() if match else ""
+
+def medicine_info(name: str) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "description": f"{name} is used to treat {DRUG_CONDITIONS.get(name.lower(), DEFAULT_CONDITION).lower()}.",
+        "dosage": "As prescribed by your doctor, usually once or twice daily",
+        "precautions": "Tell your doctor about allergies and other medicines you take",
+        "side_effects": "Nausea, headache, dizziness",
+        "category": "General medication",
+        "interactions": "May interact with alcohol and other prescription drugs",
+        "pregnancy_safety": "Consult your doctor before use during pregnancy",
+        "storage": "Store at room temperature away from moisture",
+        "missed_dose": "Take it as soon as you remember unless the next dose is due"
+    }
+
+def exercise_plan(conditions: str) -> Dict[str, Any]:
+    exercises = [
+        {
+            "name": "Brisk Walking",
+            "duration": "20-30 minutes",
+            "description": "Walking at a pace that raises the heart rate",
+            "benefits": f"Improves cardiovascular fitness for {conditions}",
+            "precautions": "Stop if you feel chest pain or dizziness",
+            "time_of_day": "morning"
+        },
+        {
+            "name": "Gentle Stretching",
+            "duration": "10 minutes",
+            "description": "Full-body stretching routine",
+            "benefits": "Keeps joints mobile and reduces stiffness",
+            "precautions": "Do not bounce or force a stretch",
+            "time_of_day": "evening"
+        }
+    ]
+    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+    weekly_plan = {day: [exercises[index % 2]["name"]] for index, day in enumerate(days)}
+    weekly_plan["sunday"] = ["Rest or light stretching"]
+    return {
+        "daily_exercises": exercises,
+        "weekly_plan": weekly_plan,
+        "general_advice": "Start slowly and increase intensity gradually. Consult your doctor before starting.",
+        "contraindications": ["High-intensity exercise without medical clearance"]
+    }
+
+def canned_answer(body: Dict[str, Any], method: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Message for a chat completion request, shaped like the answer the
+    calling GPTProcessor method expects
+
+    Args:
+        body: The chat completion request
+        method: GPTProcessor method named by the METHOD_HEADER request
+            header; without it, function-calling requests are answered
+            like analyze_prescription and anything else like chat
+
+    Returns:
+        (kind, message) where message has content or a function_call
+    """
+    messages = body.get("messages", [])
+    prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if method is None:
+        method = "analyze_prescription" if body.get("functions") else "chat"
+
+    if method == "analyze_prescription":
+        medicines = find_medicines(prompt)
+        arguments = {
+            "medicines": [
+                {
+                    "original": medicine,
+                    "corrected": medicine,
+                    "confidence": 95,
+                    "method": "no_change",
+                    "explanation": "Name is spelled correctly",
+                    "is_valid": True
+                }
+                for medicine in medicines
+            ],
+            "diseases": conditions_for(medicines),
+            "confidence": 90,
+            "summary": "No corrections were needed."
+        }
+        call = body.get("function_call")
+        name = call["name"] if isinstance(call, dict) else body["functions"][0]["name"]
+        return method, {"content": None, "function_call": {"name": name, "arguments": json.dumps(arguments)}}
+
+    if method == "medicine_info":
+        names = [name.strip() for name in _line_after(prompt, "Medicines:").split(",") if name.strip()]
+        return method, {"content": json.dumps([medicine_info(name) for name in names])}
+    if method == "exercise_recommendations":
+        conditions = _line_after(prompt, "following conditions:") or "general health"
+        return method, {"content": json.dumps(exercise_plan(conditions))}
+    if method == "extract_medicines":
+        return method, {"content": json.dumps(find_medicines(prompt))}
+    if method == "extract_diseases":
+        return method, {"content": json.dumps(conditions_for(find_medicines(prompt)))}
+    if method == "verify_medicines":
+        names = [name.strip() for name in _line_after(prompt, "Extracted medicine names:").split(",") if name.strip()]
+        corrected = [
+            {
+                "original": name,
+                "corrected": name,
+                "confidence": 95,
+                "method": "no_change",
+                "explanation": "Name is spelled correctly",
+                "is_valid": True
+            }
+            for name in names
+        ]
+        return method, {"content": json.dumps({
+            "corrected_medicines": corrected,
+            "summary": "No corrections were needed.",
+            "total_corrected": 0,
+            "total_invalid": 0
+        })}
+
+    return method, {"content": (
+        "This is a canned answer from the local stub server. Medicines should be taken "
+        "exactly as prescribed, and any side effects discussed with your doctor or pharmacist. "
+        "Please consult a healthcare provider for advice about your specific situation."
+    )}
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def create_app(
+    latency: Callable[[random.Random], float],
+    tokens_per_second: float = 40.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    retry_after: float = 2.0,
+    seed: int = 7
+) -> FastAPI:
+    """
+    The stub server application
+    """
+    app = FastAPI(title="Stub OpenAI API")
+    rng = random.Random(seed)
+    counts: Counter = Counter()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        kind, message = canned_answer(body, request.headers.get(METHOD_HEADER))
+        counts[kind] += 1
+
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            counts["429"] += 1
+            await asyncio.sleep(0.005)
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded", "code": None, "param": None}},
+                headers={"Retry-After": str(retry_after)}
+            )
+        await asyncio.sleep(latency(rng))
+        if roll < rate_limit_rate + error_rate:
+            counts["500"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Internal error (stub)", "type": "server_error", "code": None, "param": None}}
+            )
+
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+        prompt_tokens = _token_count(json.dumps(body.get("messages", [])))
+        text = message.get("content") or message["function_call"]["arguments"]
+
+        if body.get("stream"):
+            async def events():
+                pieces = re.findall(r"\S+\s*", message.get("content") or "")
+                for piece in pieces:
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(1.0 / tokens_per_second)
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        # Answers longer than max_tokens are cut off, like the real API
+        finish_reason = "function_call" if "function_call" in message else "stop"
+        max_tokens = body.get("max_tokens")
+        if max_tokens and message.get("content") and _token_count(text) > max_tokens:
+            text = text[:max_tokens * 4]
+            message = {**message, "content": text}
+            finish_reason = "length"
+
+        # Generation time grows with the answer length, like the real API
+        await asyncio.sleep(_token_count(text) / tokens_per_second)
+        completion_tokens = _token_count(text)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", **message},
+                "finish_reason": finish_reason
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return dict(counts)
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8900, help="Port to listen on")
+    parser.add_argument("--latency", default="lognormal:1200,0.5", help="Latency distribution before the answer starts")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Generation speed of the answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, default=2.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(
+        parse_latency(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Build the offline drug index used for medicine verification.
+
+Inputs are the openFDA drug-label bulk download
+(https://open.fda.gov/data/downloads/, drug-label-*.json.zip) and an RxNorm
+full release (https://www.nlm.nih.gov/research/umls/rxnorm/, the rrf/ folder).
+
+Usage:
+    python build_drug_index.py --fda downloads/drug-label-*.json.zip --rxnorm downloads/RxNorm_full/rrf
+"""
+
+import sys
+import os
+import glob
+import time
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.drug_index import DRUG_INDEX_PATH, build_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline drug index")
+    parser.add_argument("--fda", nargs="*", default=[], help="openFDA drug-label bulk files (.json or .json.zip)")
+    parser.add_argument("--rxnorm", help="RxNorm release directory containing RXNCONSO.RRF")
+    parser.add_argument("--output", default=DRUG_INDEX_PATH, help=f"Index file (default: {DRUG_INDEX_PATH})")
+    args = parser.parse_args()
+
+    fda_files = sorted(path for pattern in args.fda for path in glob.glob(pattern))
+    if not fda_files and not args.rxnorm:
+        parser.error("give openFDA label files (--fda), an RxNorm directory (--rxnorm), or both")
+
+    try:
+        started = time.time()
+        counts = build_index(args.output, fda_files, args.rxnorm)
+        print(f"✅ Drug index written to {args.output} in {time.time() - started:.1f}s")
+        for key, value in counts.items():
+            print(f"   {key}: {value}")
+    except Exception as e:
+        print(f"❌ Error building drug index: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -331,7 +331,7 @@ ChatSession Document Schema:
     "_id": ObjectId,
     "user_id": int,
     "session_id": str,
-    "messages": [
+    "messages": [  # oldest summarized messages dropped beyond CHAT_SESSION_MAX_MESSAGES
         {
             "role": "user" | "assistant",
             "content": str,
@@ -342,10 +342,13 @@ ChatSession Document Schema:
     "context": {
         "current_medicines": [str],
         "current_conditions": [str],
-        "user_profile_summary": dict
+        "user_profile_summary": dict,
+        "client_context": str,  # medicine context last sent by the client
+        "conversation_summary": str,  # compacted summary of older turns
+        "summarized_messages": int  # leading messages covered by the summary
     },
     "created_at": datetime,
-    "updated_at": datetime,
+    "updated_at": datetime,  # sessions expire CHAT_SESSION_TTL_DAYS after this
     "is_active": bool
 }
 
@@ -354,17 +357,35 @@ PrescriptionImage Document Schema:
     "_id": ObjectId,
     "user_id": int,
     "medicine_history_id": int,
-    "image_data": str,  # base64 encoded
+    "image_data": str,  # base64 encoded, not stored for OCR scans
+    "image_digest": str,  # sha256 of the uploaded bytes
     "image_metadata": {
         "filename": str,
         "size": int,
         "format": str,
+        "page": int,  # page number within a batch or multi-page document
         "upload_timestamp": datetime
     },
     "ocr_results": {
         "extracted_text": str,
-        "confidence_score": float,
-        "processing_time": float
+        "confidence_score": float,  # mean Tesseract word confidence, 0-100
+        "processing_time": float,  # milliseconds, sum of stage timings
+        "tier": "fast" | "full",
+        "cached": bool,
+        "region_count": int,
+        "word_count": int,
+        "low_confidence_words": int,
+        "timings": {stage: float},  # milliseconds per pipeline stage
+        "words": [
+            {
+                "text": str,
+                "confidence": float,
+                "left": int,
+                "top": int,
+                "width": int,
+                "height": int
+            }
+        ]
     },
     "created_at": datetime
 }
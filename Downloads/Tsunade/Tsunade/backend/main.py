@@ -55,11 +55,47 @@ async def lifespan(app: FastAPI):
     except ImportError as e:
         print(f"⚠️ Database config not available (continuing without external databases): {e}")
     
+    try:
+        from utils.ocr_jobs import ocr_job_queue
+        await ocr_job_queue.start()
+    except Exception as e:
+        print(f"⚠️ OCR job queue failed to start: {e}")
+    
+    try:
+        from utils.gpt import gpt_processor
+        gpt_processor.start_exercise_prewarm()
+    except Exception as e:
+        print(f"⚠️ Exercise plan pre-warming failed to start: {e}")
+    
     print("✅ API startup completed")
     yield
     
     # Shutdown
     print("🔄 Shutting down LP Assistant API...")
+    try:
+        from utils.ocr_jobs import ocr_job_queue
+        await ocr_job_queue.stop()
+    except Exception as e:
+        print(f"⚠️ OCR job queue shutdown failed: {e}")
+    
+    try:
+        from utils.ocr import ocr_pool
+        ocr_pool.shutdown()
+    except Exception as e:
+        print(f"⚠️ OCR worker pool shutdown failed: {e}")
+    
+    try:
+        from utils.gpt import gpt_processor
+        await gpt_processor.aclose()
+    except Exception as e:
+        print(f"⚠️ OpenAI client shutdown failed: {e}")
+    
+    try:
+        from utils.medicine_db import medicine_db
+        await medicine_db.aclose()
+    except Exception as e:
+        print(f"⚠️ Medicine database client shutdown failed: {e}")
+    
     try:
         from database.config import close_redis, close_mongodb
         try:
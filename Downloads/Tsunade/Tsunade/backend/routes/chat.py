@@ -1,6 +1,11 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collections import deque
+from functools import partial
+import json
+import time
 import sys
 import os
 
@@ -8,17 +13,85 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.gpt import gpt_processor
+from utils.llm_scheduler import LLMBusyError, PRIORITY_INTERACTIVE
+from utils.chat_sessions import chat_session_store, ChatSessionNotFoundError, CHAT_SESSION_SUMMARY_TOKENS
+from utils.semantic_cache import chat_answer_cache
 
 router = APIRouter()
 
+# Recent time-to-first-token samples for /chat/stream, in milliseconds
+ttft_samples: deque = deque(maxlen=500)
+
 class ChatRequest(BaseModel):
     message: str
-    context: str = ""  # Optional context about medicines
+    context: str = ""  # Optional context about medicines; kept by the session once sent
+    session_id: Optional[str] = None  # Continue a conversation; a new session is started if omitted
+    user_id: Optional[int] = None
 
 class ChatResponse(BaseModel):
     response: str
     success: bool
     message: str
+    session_id: Optional[str] = None
+    cached: bool = False
+
+def _build_chat_messages(request: ChatRequest, context: str = "", history: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
+    """
+    System message, bounded session history and the user message for a chat request
+    """
+    # Create context-aware prompt
+    context_prompt = ""
+    if context:
+        context_prompt = f"\n\nContext about your medicines: {context}"
+    
+    prompt = f"""
+    You are RX Assistant, a certified healthcare AI assistant. A user is asking about their medicines or health.
+    
+    User question: {request.message}
+    {context_prompt}
+    
+    Please provide a helpful, accurate, and friendly response. Remember:
+    - Be professional but warm
+    - Provide accurate medical information
+    - Always recommend consulting a healthcare provider for specific medical advice
+    - Include relevant safety warnings when appropriate
+    - If you're not sure about something, say so and suggest consulting a doctor
+    
+    Respond in a conversational, helpful tone.
+    """
+    
+    return [
+        {"role": "system", "content": "You are RX Assistant, a helpful healthcare AI that provides accurate medical information while always encouraging users to consult healthcare professionals for specific advice."},
+        *(history or []),
+        {"role": "user", "content": prompt}
+    ]
+
+async def _open_session(request: ChatRequest):
+    """
+    Session for a chat request and the medicine context to use with it
+    """
+    try:
+        session = await chat_session_store.open(request.session_id, request.user_id)
+    except ChatSessionNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+    context = request.context or session["context"].get("client_context", "")
+    return session, context
+
+async def _record_turn(session: Dict[str, Any], request: ChatRequest, context: str, answer: str):
+    """
+    Store a turn and compact the session in the background if it is over budget
+    """
+    try:
+        await chat_session_store.append_turn(session, request.message, answer, context)
+        chat_session_store.schedule_compaction(
+            session,
+            partial(gpt_processor.summarize_conversation, max_tokens=CHAT_SESSION_SUMMARY_TOKENS)
+        )
+    except Exception as e:
+        print(f"Could not record chat turn: {e}")
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_assistant(request: ChatRequest):
@@ -32,52 +105,229 @@ async def chat_with_assistant(request: ChatRequest):
                 detail="Message is required"
             )
         
-        # Create context-aware prompt
-        context_prompt = ""
-        if request.context:
-            context_prompt = f"\n\nContext about your medicines: {request.context}"
-        
-        prompt = f"""
-        You are RX Assistant, a certified healthcare AI assistant. A user is asking about their medicines or health.
-        
-        User question: {request.message}
-        {context_prompt}
+        session, context = await _open_session(request)
+        history = chat_session_store.history_messages(session)
         
-        Please provide a helpful, accurate, and friendly response. Remember:
-        - Be professional but warm
-        - Provide accurate medical information
-        - Always recommend consulting a healthcare provider for specific medical advice
-        - Include relevant safety warnings when appropriate
-        - If you're not sure about something, say so and suggest consulting a doctor
-        
-        Respond in a conversational, helpful tone.
-        """
-        
-        # Get response from GPT
-        response = gpt_processor.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are RX Assistant, a helpful healthcare AI that provides accurate medical information while always encouraging users to consult healthcare professionals for specific advice."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        
-        assistant_response = response.choices[0].message.content.strip()
+        # Questions that open a conversation can be answered from the near-duplicate cache
+        cached = chat_answer_cache.lookup(request.message, scope=context) if not history else None
+        if cached is not None:
+            assistant_response = cached["answer"]
+        else:
+            # Get response from GPT
+            response = await gpt_processor.create_completion(
+                priority=PRIORITY_INTERACTIVE,
+                method="chat",
+                messages=_build_chat_messages(request, context, history),
+                temperature=0.7,
+                max_tokens=1000
+            )
+            
+            assistant_response = response.choices[0].message.content.strip()
+            if not history:
+                chat_answer_cache.add(request.message, assistant_response, scope=context)
+        await _record_turn(session, request, context, assistant_response)
         
         return ChatResponse(
             response=assistant_response,
             success=True,
-            message="Response generated successfully"
+            message="Response served from cache" if cached else "Response generated successfully",
+            session_id=session["session_id"],
+            cached=cached is not None
         )
         
+    except HTTPException:
+        raise
+    except LLMBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Chat processing failed: {str(e)}"
         )
 
+@router.post("/chat/stream")
+async def stream_chat_with_assistant(request: ChatRequest):
+    """
+    Chat with RX Assistant, streaming the answer as server-sent events:
+    a `token` event for every chunk of text as GPT produces it, then a
+    `done` event with the full response and the time to first token.
+    /chat remains available for clients that want a single JSON response.
+    """
+    if not request.message.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Message is required"
+        )
+    
+    try:
+        session, context = await _open_session(request)
+        history = chat_session_store.history_messages(session)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Chat processing failed: {str(e)}"
+        )
+    
+    cached = chat_answer_cache.lookup(request.message, scope=context) if not history else None
+    if cached is not None:
+        async def cached_event_stream():
+            await _record_turn(session, request, context, cached["answer"])
+            yield f"event: token\ndata: {json.dumps({'content': cached['answer']})}\n\n"
+            yield "event: done\ndata: " + json.dumps({
+                "response": cached["answer"],
+                "success": True,
+                "message": "Response served from cache",
+                "session_id": session["session_id"],
+                "cached": True
+            }) + "\n\n"
+        
+        return StreamingResponse(
+            cached_event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    start = time.perf_counter()
+    try:
+        stream = await gpt_processor.create_completion(
+            priority=PRIORITY_INTERACTIVE,
+            method="chat",
+            messages=_build_chat_messages(request, context, history),
+            temperature=0.7,
+            max_tokens=1000,
+            stream=True
+        )
+    except LLMBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Chat processing failed: {str(e)}"
+        )
+    
+    async def event_stream():
+        parts = []
+        ttft_ms = None
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - start) * 1000, 2)
+                    ttft_samples.append(ttft_ms)
+                parts.append(content)
+                yield f"event: token\ndata: {json.dumps({'content': content})}\n\n"
+            
+            total_ms = round((time.perf_counter() - start) * 1000, 2)
+            print(f"Chat stream: first token {ttft_ms} ms, complete {total_ms} ms")
+            assistant_response = "".join(parts).strip()
+            if not history:
+                chat_answer_cache.add(request.message, assistant_response, scope=context)
+            await _record_turn(session, request, context, assistant_response)
+            yield "event: done\ndata: " + json.dumps({
+                "response": assistant_response,
+                "success": True,
+                "message": "Response generated successfully",
+                "session_id": session["session_id"],
+                "ttft_ms": ttft_ms,
+                "total_ms": total_ms,
+                "cached": False
+            }) + "\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'Chat processing failed: {str(e)}'})}\n\n"
+        finally:
+            # Release the pooled connection and scheduler slot even if the client disconnected mid-stream
+            await stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/chat/stats")
+async def get_chat_stats():
+    """
+    Time-to-first-token percentiles of recent streamed chat responses
+    """
+    samples = sorted(ttft_samples)
+    
+    def percentile(pct: float):
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(pct / 100.0 * len(samples)))]
+    
+    return {
+        "streamed_responses": len(samples),
+        "ttft_p50_ms": percentile(50),
+        "ttft_p95_ms": percentile(95),
+        "scheduler": gpt_processor.scheduler.stats(),
+        "sessions": chat_session_store.stats(),
+        "answer_cache": chat_answer_cache.stats(),
+        "success": True
+    }
+
+@router.get("/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str, user_id: int):
+    """
+    Messages and conversation summary of one of the user's chat sessions
+    """
+    try:
+        session = await chat_session_store.open(session_id, user_id)
+    except ChatSessionNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+    
+    return {
+        "session_id": session["session_id"],
+        "messages": [
+            {
+                "role": message["role"],
+                "content": message["content"],
+                "timestamp": message["timestamp"].isoformat(),
+                "message_id": message["message_id"]
+            }
+            for message in session["messages"]
+        ],
+        "summary": session["context"].get("conversation_summary", ""),
+        "summarized_messages": session["context"].get("summarized_messages", 0),
+        "success": True
+    }
+
+@router.delete("/chat/sessions/{session_id}")
+async def close_chat_session(session_id: str, user_id: int):
+    """
+    End one of the user's chat sessions
+    """
+    try:
+        await chat_session_store.close(session_id, user_id)
+    except ChatSessionNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+    
+    return {
+        "session_id": session_id,
+        "success": True,
+        "message": "Chat session closed"
+    }
+
 @router.get("/chat/suggestions")
 async def get_chat_suggestions():
     """
@@ -2,8 +2,10 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any
 import json
-from utils.ocr import ocr_processor
+from utils.ocr import ocr_pool, OCRQueueFullError
+from utils.image_ingest import spool_upload, ImageTooLargeError
 from utils.gpt import gpt_processor
+from utils.llm_scheduler import LLMBusyError
 
 router = APIRouter()
 
@@ -27,11 +29,9 @@ async def get_exercise_recommendations(
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read and process the image
-        image_data = await file.read()
-        
-        # Extract text using OCR
-        extracted_text = ocr_processor.extract_text_from_image(image_data)
+        # Stream the image into a size-limited spool and OCR it
+        with await spool_upload(file) as image:
+            extracted_text = await ocr_pool.extract_text_from_image(image)
         
         if not extracted_text or len(extracted_text.strip()) < 10:
             raise HTTPException(status_code=400, detail="Could not extract sufficient text from image")
@@ -44,14 +44,29 @@ async def get_exercise_recommendations(
             except json.JSONDecodeError:
                 raise HTTPException(status_code=400, detail="Invalid user profile JSON format")
         
-        # Extract diseases from prescription text
-        diseases = gpt_processor.extract_diseases(extracted_text)
+        # Extract diseases and (corrected) medicines in one GPT call
+        try:
+            analysis = await gpt_processor.analyze_prescription(extracted_text)
+        except LLMBusyError:
+            raise
+        except Exception as e:
+            # Recommendations only need the diseases; fall back to extracting those alone
+            print(f"Prescription analysis failed, extracting diseases only: {e}")
+            try:
+                diseases = await gpt_processor.extract_diseases(extracted_text)
+            except LLMBusyError:
+                raise
+            except Exception as e:
+                print(f"Disease extraction failed: {e}")
+                diseases = []
+            analysis = {"diseases": diseases, "corrected_medicines": [], "confidence": None}
+        diseases = analysis["diseases"]
+        medicines = [
+            medicine["corrected"] for medicine in analysis["corrected_medicines"] if medicine["is_valid"]
+        ]
         
         # Get exercise recommendations based on diseases and user profile
-        exercise_recommendations = gpt_processor.get_exercise_recommendations(diseases, profile_data)
-        
-        # Also extract medicines for comprehensive analysis
-        medicines = gpt_processor.extract_medicines(extracted_text)
+        exercise_recommendations = await gpt_processor.get_exercise_recommendations(diseases, profile_data)
         
         return JSONResponse(
             status_code=200,
@@ -60,6 +75,7 @@ async def get_exercise_recommendations(
                 "extracted_text": extracted_text,
                 "diseases": diseases,
                 "medicines": medicines,
+                "analysis_confidence": analysis["confidence"],
                 "exercise_recommendations": exercise_recommendations,
                 "user_profile": profile_data
             }
@@ -67,6 +83,12 @@ async def get_exercise_recommendations(
         
     except HTTPException:
         raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except OCRQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except LLMBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error in exercise recommendations endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -89,17 +111,15 @@ async def extract_diseases_only(
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read and process the image
-        image_data = await file.read()
-        
-        # Extract text using OCR
-        extracted_text = ocr_processor.extract_text_from_image(image_data)
+        # Stream the image into a size-limited spool and OCR it
+        with await spool_upload(file) as image:
+            extracted_text = await ocr_pool.extract_text_from_image(image)
         
         if not extracted_text or len(extracted_text.strip()) < 10:
             raise HTTPException(status_code=400, detail="Could not extract sufficient text from image")
         
         # Extract diseases from prescription text
-        diseases = gpt_processor.extract_diseases(extracted_text)
+        diseases = await gpt_processor.extract_diseases(extracted_text)
         
         return JSONResponse(
             status_code=200,
@@ -112,10 +132,24 @@ async def extract_diseases_only(
         
     except HTTPException:
         raise
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except OCRQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error in disease extraction endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.get("/exercise-plan/stats")
+async def get_exercise_plan_stats():
+    """
+    Exercise plan cache statistics
+    """
+    return {
+        "cache": gpt_processor.exercise_cache_stats(),
+        "success": True
+    }
+
 @router.post("/exercise-plan")
 async def create_exercise_plan(
     diseases: list = [],
@@ -133,7 +167,7 @@ async def create_exercise_plan(
     """
     try:
         # Get exercise recommendations
-        exercise_recommendations = gpt_processor.get_exercise_recommendations(diseases, user_profile)
+        exercise_recommendations = await gpt_processor.get_exercise_recommendations(diseases, user_profile)
         
         return JSONResponse(
             status_code=200,
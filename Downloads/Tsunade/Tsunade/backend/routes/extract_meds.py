@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Optional
 import sys
 import os
 
@@ -8,6 +8,8 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.gpt import gpt_processor
+from utils.llm_scheduler import LLMBusyError
+from utils.medicine_corrector import medicine_corrector
 
 router = APIRouter()
 
@@ -21,6 +23,7 @@ class MedicineInfo(BaseModel):
     method: str
     explanation: str
     is_valid: bool = True
+    source: str = "gpt"  # "dictionary" or "gpt"
 
 class ExtractMedsResponse(BaseModel):
     medicines: List[MedicineInfo]
@@ -29,10 +32,25 @@ class ExtractMedsResponse(BaseModel):
     count: int
     correction_summary: str
 
+def _gpt_medicine(medicine: Any) -> Optional[Dict[str, Any]]:
+    """
+    A medicine from GPT's answer checked against MedicineInfo, or None if it
+    is malformed (missing fields, no corrected name, non-numeric confidence)
+    """
+    if not isinstance(medicine, dict) or not isinstance(medicine.get('corrected'), str) or not medicine['corrected'].strip():
+        return None
+    try:
+        return MedicineInfo(**{**medicine, 'source': "gpt"}).dict()
+    except (ValidationError, TypeError):
+        return None
+
 @router.post("/extract-meds", response_model=ExtractMedsResponse)
 async def extract_medicines(request: ExtractMedsRequest):
     """
-    Extract medicine names from prescription text using GPT-4
+    Extract medicine names from prescription text.
+    Medicines the local dictionary recognises confidently on prescription
+    entry lines are resolved without GPT; all other lines that mention a
+    medicine (including "avoid ..." or "allergic to ..." lines) are sent to GPT-4.
     """
     try:
         if not request.prescription_text.strip():
@@ -41,10 +59,35 @@ async def extract_medicines(request: ExtractMedsRequest):
                 detail="Prescription text is required"
             )
         
-        # Extract medicines using GPT
-        raw_medicines = gpt_processor.extract_medicines(request.prescription_text)
+        # Local dictionary fast path
+        dictionary_medicines, unresolved_lines = medicine_corrector.match_prescription_text(request.prescription_text)
+        for medicine in dictionary_medicines:
+            medicine['source'] = "dictionary"
+        
+        summaries = []
+        if dictionary_medicines:
+            summaries.append(f"{len(dictionary_medicines)} medicine(s) recognised from the local dictionary.")
         
-        if not raw_medicines:
+        # Extract and verify whatever the dictionary could not resolve in a single GPT call
+        verification_result = {'corrected_medicines': dictionary_medicines}
+        if unresolved_lines or not dictionary_medicines:
+            gpt_text = "\n".join(unresolved_lines) if dictionary_medicines else request.prescription_text
+            gpt_result = await gpt_processor.analyze_prescription(gpt_text)
+            
+            known = {medicine['corrected'].lower() for medicine in dictionary_medicines}
+            for item in gpt_result.get('corrected_medicines') or []:
+                medicine = _gpt_medicine(item)
+                if medicine is None:
+                    print(f"Dropping malformed medicine from GPT: {item!r}")
+                    continue
+                if medicine['corrected'].lower() in known:
+                    continue
+                verification_result['corrected_medicines'].append(medicine)
+            if gpt_result.get('summary'):
+                summaries.append(gpt_result['summary'])
+        verification_result['summary'] = " ".join(summaries) or 'No corrections made.'
+        
+        if not verification_result.get('corrected_medicines'):
             return ExtractMedsResponse(
                 medicines=[],
                 success=False,
@@ -53,12 +96,6 @@ async def extract_medicines(request: ExtractMedsRequest):
                 correction_summary="No medicines found to correct."
             )
         
-        # Use GPT-4 to verify and correct medicine names
-        verification_result = gpt_processor.verify_and_correct_medicine_names(
-            raw_medicines, 
-            request.prescription_text
-        )
-        
         # Convert to MedicineInfo objects
         medicine_info_list = []
         corrections_made = []
@@ -70,7 +107,8 @@ async def extract_medicines(request: ExtractMedsRequest):
                 confidence=medicine['confidence'],
                 method=medicine['method'],
                 explanation=medicine['explanation'],
-                is_valid=medicine['is_valid']
+                is_valid=medicine['is_valid'],
+                source=medicine.get('source', "gpt")
             )
             medicine_info_list.append(medicine_info)
             
@@ -89,6 +127,12 @@ async def extract_medicines(request: ExtractMedsRequest):
             correction_summary=correction_summary
         )
         
+    except LLMBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -112,7 +156,7 @@ async def test_extract_medicines():
         Take 1 capsule daily before breakfast
         """
         
-        medicines = gpt_processor.extract_medicines(sample_text)
+        medicines = await gpt_processor.extract_medicines(sample_text)
         
         return ExtractMedsResponse(
             medicines=medicines,
@@ -8,7 +8,9 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.gpt import gpt_processor
+from utils.llm_scheduler import LLMBusyError
 from utils.medicine_db import medicine_db
+from utils.drug_index import drug_index
 
 router = APIRouter()
 
@@ -48,7 +50,7 @@ async def get_medicine_information(request: MedInfoRequest):
             )
         
         # Get medicine information using GPT
-        medicines_info = gpt_processor.get_medicine_info(request.medicines)
+        medicines_info = await gpt_processor.get_medicine_info(request.medicines)
         
         if not medicines_info:
             return MedInfoResponse(
@@ -58,12 +60,8 @@ async def get_medicine_information(request: MedInfoRequest):
                 count=0
             )
         
-        # Cross-verify with FDA and RxNav databases
-        verified_medicines_info = []
-        for info in medicines_info:
-            medicine_name = info.get("name", "Unknown")
-            verified_info = medicine_db.cross_verify_medicine(medicine_name, info)
-            verified_medicines_info.append(verified_info)
+        # Cross-verify with FDA and RxNav databases, all medicines and both sources at once
+        verified_medicines_info = await medicine_db.cross_verify_medicines(medicines_info)
         
         # Convert to MedicineInfo objects
         medicine_info_objects = []
@@ -90,6 +88,12 @@ async def get_medicine_information(request: MedInfoRequest):
             count=len(medicine_info_objects)
         )
         
+    except LLMBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -104,7 +108,7 @@ async def test_medicine_information():
     try:
         sample_medicines = ["Amoxicillin", "Ibuprofen", "Omeprazole"]
         
-        medicines_info = gpt_processor.get_medicine_info(sample_medicines)
+        medicines_info = await gpt_processor.get_medicine_info(sample_medicines)
         
         # Convert to MedicineInfo objects
         medicine_info_objects = []
@@ -131,6 +135,21 @@ async def test_medicine_information():
             detail=f"Test failed: {str(e)}"
         )
 
+@router.get("/med-info/stats")
+async def get_medicine_info_stats():
+    """
+    Per-medicine information cache hit ratio and size, how many GPT
+    calls were coalesced with an identical call already in flight, and
+    local drug index hits
+    """
+    return {
+        "cache": gpt_processor.medicine_cache_stats(),
+        "singleflight": gpt_processor.singleflight.stats(),
+        "scheduler": gpt_processor.scheduler.stats(),
+        "drug_index": drug_index.stats(),
+        "success": True
+    }
+
 @router.get("/med-info/{medicine_name}")
 async def get_single_medicine_info(medicine_name: str):
     """
@@ -143,7 +162,7 @@ async def get_single_medicine_info(medicine_name: str):
                 detail="Medicine name is required"
             )
         
-        medicines_info = gpt_processor.get_medicine_info([medicine_name])
+        medicines_info = await gpt_processor.get_medicine_info([medicine_name])
         
         if not medicines_info:
             raise HTTPException(
@@ -167,6 +186,12 @@ async def get_single_medicine_info(medicine_name: str):
             "message": f"Successfully retrieved information for {medicine_name}"
         }
         
+    except LLMBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
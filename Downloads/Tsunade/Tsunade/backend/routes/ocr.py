@@ -1,13 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Depends
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict, Any
+import asyncio
+import json
+import time
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.ocr import ocr_processor
+from utils.ocr import ocr_pool, OCRQueueFullError, OCR_BATCH_MAX_FILES
+from utils.ocr_jobs import ocr_job_queue
+from utils.image_ingest import SpooledImage, spool_upload, spool_base64_json, ImageTooLargeError
+from utils.documents import detect_document_kind, is_supported_content_type, UnsupportedDocumentError
+from utils.ocr_store import ocr_scan_store
+from database.models import User
+from auth.auth import current_active_user, current_optional_user
 
 router = APIRouter()
 
@@ -15,44 +27,132 @@ class OCRResponse(BaseModel):
     text: str
     success: bool
     message: str
+    tier: Optional[str] = None
+    confidence: Optional[float] = None
+    page_count: Optional[int] = None
+
+class OCRPageResult(BaseModel):
+    page: int
+    filename: Optional[str] = None
+    text: str
+    success: bool
+    message: str
+    processing_time_ms: float
+
+class BatchOCRResponse(BaseModel):
+    pages: List[OCRPageResult]
+    merged_text: str
+    success: bool
+    message: str
+    pages_succeeded: int
+    pages_failed: int
+    total_time_ms: float
+
+class OCRJobResponse(BaseModel):
+    job_id: str
+    status: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    processing_time_ms: Optional[float] = None
+
+async def _extract_upload(image: SpooledImage, kind: str, **metadata) -> Dict[str, Any]:
+    """
+    OCR a spooled upload and record its scans. Multi-page PDFs and TIFFs are
+    OCRed page by page and the text is merged; the upload only fails if
+    every page does.
+    
+    Returns:
+        Dictionary with text, tier, mean_confidence and page_count (None
+        for single images)
+    """
+    if kind == "image":
+        result = await ocr_pool.extract(image)
+        ocr_scan_store.record(result, **metadata)
+        return {**result, "page_count": None}
+    
+    pages = [page async for page in ocr_pool.extract_document(image, kind)]
+    failed = [page for page in pages if "error" in page]
+    if failed and len(failed) == len(pages):
+        raise Exception(failed[0]["error"])
+    for page in pages:
+        ocr_scan_store.record(page, **{**metadata, "page": page["page"]})
+    confidences = [page["mean_confidence"] for page in pages if page.get("mean_confidence") is not None]
+    return {
+        "text": "\n\n".join(page["text"] for page in pages if page["text"]),
+        "tier": None,
+        "mean_confidence": round(sum(confidences) / len(confidences), 2) if confidences else None,
+        "page_count": len(pages)
+    }
 
 @router.post("/ocr", response_model=OCRResponse)
-async def extract_text_from_image(file: UploadFile = File(...)):
+async def extract_text_from_image(file: UploadFile = File(...), user: Optional[User] = Depends(current_optional_user)):
     """
-    Extract text from uploaded prescription image using OCR
+    Extract text from uploaded prescription image using OCR.
+    Multi-page PDFs and TIFFs are OCRed page by page and the text is merged;
+    use /ocr/document to receive pages as they finish.
     """
     try:
         # Validate file type
         if file.content_type is None:
             print(f"Warning: content_type is None for file {file.filename}")
-        elif not file.content_type.startswith('image/'):
+        elif not is_supported_content_type(file.content_type):
             raise HTTPException(
                 status_code=400, 
-                detail="File must be an image (JPEG, PNG, etc.)"
+                detail="File must be an image (JPEG, PNG, TIFF, etc.) or a PDF"
             )
         
         # Print debug info
         print(f"Processing file: {file.filename}, content_type: {file.content_type}")
         
-        # Read file content
-        image_data = await file.read()
-        
-        # Extract text using OCR
-        extracted_text = ocr_processor.extract_text_from_image(image_data)
+        # Stream file content into a size-limited spool and OCR it
+        with await spool_upload(file) as image:
+            result = await _extract_upload(
+                image, detect_document_kind(image.header, file.content_type),
+                filename=file.filename, size=image.size, format=file.content_type,
+                digest=image.digest, user_id=user.id if user else None
+            )
+        extracted_text = result["text"]
+        page_count = result["page_count"]
         
         if not extracted_text.strip():
             return OCRResponse(
                 text="",
                 success=False,
-                message="No text could be extracted from the image. Please ensure the image is clear and contains readable text."
+                message="No text could be extracted from the image. Please ensure the image is clear and contains readable text.",
+                tier=result["tier"],
+                confidence=result["mean_confidence"],
+                page_count=page_count
             )
         
         return OCRResponse(
             text=extracted_text,
             success=True,
-            message="Text extracted successfully"
+            message="Text extracted successfully",
+            tier=result["tier"],
+            confidence=result["mean_confidence"],
+            page_count=page_count
         )
         
+    except HTTPException:
+        raise
+    except UnsupportedDocumentError as e:
+        raise HTTPException(
+            status_code=415,
+            detail=str(e)
+        )
+    except ImageTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    except OCRQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -60,36 +160,328 @@ async def extract_text_from_image(file: UploadFile = File(...)):
         )
 
 @router.post("/ocr/base64", response_model=OCRResponse)
-async def extract_text_from_base64(request: dict):
+async def extract_text_from_base64(request: Request, user: Optional[User] = Depends(current_optional_user)):
     """
-    Extract text from base64 encoded image
+    Extract text from base64 encoded image.
+    Expects a JSON body {"image": "<base64 or data URL>"}, decoded as it streams in.
     """
     try:
-        base64_string = request.get("image")
-        if not base64_string:
+        image = await spool_base64_json(request.stream(), field="image")
+        if image is None:
             raise HTTPException(
                 status_code=400,
                 detail="Base64 image string is required"
             )
         
         # Extract text using OCR
-        extracted_text = ocr_processor.extract_text_from_base64(base64_string)
+        with image:
+            result = await ocr_pool.extract(image)
+        ocr_scan_store.record(
+            result, size=image.size, format="base64", digest=image.digest, user_id=user.id if user else None
+        )
+        extracted_text = result["text"]
         
         if not extracted_text.strip():
             return OCRResponse(
                 text="",
                 success=False,
-                message="No text could be extracted from the image. Please ensure the image is clear and contains readable text."
+                message="No text could be extracted from the image. Please ensure the image is clear and contains readable text.",
+                tier=result["tier"],
+                confidence=result["mean_confidence"]
             )
         
         return OCRResponse(
             text=extracted_text,
             success=True,
-            message="Text extracted successfully"
+            message="Text extracted successfully",
+            tier=result["tier"],
+            confidence=result["mean_confidence"]
         )
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except ImageTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    except OCRQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"OCR processing failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+async def _ocr_page(page: int, file: UploadFile, user_id: Optional[int] = None) -> OCRPageResult:
+    """
+    OCR a single file of a batch, reporting failures instead of raising.
+    A PDF or multi-page TIFF is OCRed page by page into one merged text.
+    """
+    start = time.perf_counter()
+    try:
+        if not is_supported_content_type(file.content_type):
+            raise Exception("File must be an image (JPEG, PNG, TIFF, etc.) or a PDF")
+        
+        with await spool_upload(file) as image:
+            result = await _extract_upload(
+                image, detect_document_kind(image.header, file.content_type),
+                filename=file.filename, size=image.size, format=file.content_type,
+                digest=image.digest, page=page, user_id=user_id
+            )
+        text = result["text"]
+        
+        if not text.strip():
+            success, message = False, "No text could be extracted from this page"
+        else:
+            success, message = True, "Text extracted successfully"
+    except Exception as e:
+        text, success, message = "", False, str(e)
+    
+    return OCRPageResult(
+        page=page,
+        filename=file.filename,
+        text=text,
+        success=success,
+        message=message,
+        processing_time_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+
+@router.post("/ocr/batch", response_model=BatchOCRResponse)
+async def extract_text_from_images(files: List[UploadFile] = File(...), user: Optional[User] = Depends(current_optional_user)):
+    """
+    Extract text from several prescription pages in parallel.
+    Each file is reported separately; a failed file does not fail the batch.
+    PDFs and multi-page TIFFs count as one file with their pages' text merged.
+    """
+    if not files:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one file is required"
+        )
+    if len(files) > OCR_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {OCR_BATCH_MAX_FILES} files"
+        )
+    
+    start = time.perf_counter()
+    pages = await asyncio.gather(*[
+        _ocr_page(page, file, user.id if user else None) for page, file in enumerate(files, start=1)
+    ])
+    
+    merged_text = "\n\n".join(page.text for page in pages if page.success)
+    succeeded = sum(1 for page in pages if page.success)
+    
+    return BatchOCRResponse(
+        pages=pages,
+        merged_text=merged_text,
+        success=succeeded > 0,
+        message=f"Extracted text from {succeeded} of {len(pages)} page(s)",
+        pages_succeeded=succeeded,
+        pages_failed=len(pages) - succeeded,
+        total_time_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+
+@router.post("/ocr/document")
+async def stream_document_text(file: UploadFile = File(...), user: Optional[User] = Depends(current_optional_user)):
+    """
+    OCR a multi-page PDF or TIFF and stream each page as server-sent events
+    as soon as it is done: a `document` event with the page count, one `page`
+    event per page in order, then a final `done` event with the merged text.
+    Single images are accepted too and produce one page.
+    """
+    if not is_supported_content_type(file.content_type):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an image (JPEG, PNG, TIFF, etc.) or a PDF"
+        )
+    
+    try:
+        document = await spool_upload(file)
+    except ImageTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    
+    kind = detect_document_kind(document.header, file.content_type)
+    
+    async def event_stream():
+        start = time.perf_counter()
+        texts = []
+        succeeded = 0
+        try:
+            announced = False
+            async for page in ocr_pool.extract_document(document, kind):
+                if not announced:
+                    announced = True
+                    yield f"event: document\ndata: {json.dumps({'filename': file.filename, 'page_count': page['page_count']})}\n\n"
+                ocr_scan_store.record(
+                    page, filename=file.filename, size=document.size, format=file.content_type,
+                    digest=document.digest, page=page["page"], user_id=user.id if user else None
+                )
+                if "error" not in page:
+                    texts.append(page["text"])
+                    succeeded += 1 if page["text"].strip() else 0
+                # Per-word boxes are persisted but kept out of the stream
+                event = {key: value for key, value in page.items() if key != "words"}
+                yield f"event: page\ndata: {json.dumps(event)}\n\n"
+            
+            yield "event: done\ndata: " + json.dumps({
+                "merged_text": "\n\n".join(text for text in texts if text),
+                "pages_succeeded": succeeded,
+                "success": succeeded > 0,
+                "total_time_ms": round((time.perf_counter() - start) * 1000, 2)
+            }) + "\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'OCR processing failed: {str(e)}'})}\n\n"
+        finally:
+            document.close()
+    
+    # The generator's own cleanup never runs if the client disconnects
+    # before streaming starts, so the spool is closed after the response too
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(document.close)
+    )
+
+@router.post("/ocr/jobs", response_model=OCRJobResponse, status_code=202)
+async def submit_ocr_job(file: UploadFile = File(...)):
+    """
+    Queue a prescription image for OCR and return a job id immediately.
+    Poll /ocr/jobs/{job_id} or subscribe to /ocr/jobs/{job_id}/events for the result.
+    """
+    if file.content_type is not None and not file.content_type.startswith('image/'):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an image (JPEG, PNG, etc.)"
+        )
+    
+    try:
+        # The queue takes over the spool and streams it to its store
+        job = await ocr_job_queue.submit(await spool_upload(file))
+    except ImageTooLargeError as e:
+        raise HTTPException(
+            status_code=413,
+            detail=str(e)
+        )
+    except OCRQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Could not queue OCR job: {str(e)}"
+        )
+    
+    return OCRJobResponse(**job)
+
+@router.get("/ocr/jobs/{job_id}", response_model=OCRJobResponse)
+async def get_ocr_job(job_id: str):
+    """
+    Current status of an OCR job, including the text once completed
+    """
+    job = await ocr_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="OCR job not found or expired"
+        )
+    return OCRJobResponse(**job)
+
+@router.get("/ocr/jobs/{job_id}/events")
+async def stream_ocr_job(job_id: str):
+    """
+    Server-sent events for an OCR job: a `status` event on every state change,
+    then a final `result` event carrying the completed or failed job.
+    """
+    job = await ocr_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="OCR job not found or expired"
+        )
+    
+    async def event_stream():
+        last_status = None
+        last_sent = time.monotonic()
+        deadline = time.monotonic() + ocr_job_queue.result_ttl
+        
+        while time.monotonic() < deadline:
+            current = await ocr_job_queue.get(job_id)
+            if current is None:
+                yield f"event: error\ndata: {json.dumps({'detail': 'OCR job not found or expired'})}\n\n"
+                return
+            
+            if current["status"] in ("completed", "failed"):
+                yield f"event: result\ndata: {json.dumps(current)}\n\n"
+                return
+            
+            if current["status"] != last_status:
+                last_status = current["status"]
+                last_sent = time.monotonic()
+                yield f"event: status\ndata: {json.dumps({'job_id': job_id, 'status': last_status})}\n\n"
+            elif time.monotonic() - last_sent > 15:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/ocr/scans")
+async def find_ocr_scans(
+    max_confidence: Optional[float] = None,
+    min_processing_time: Optional[float] = None,
+    limit: int = 50,
+    current_user: User = Depends(current_active_user)
+):
+    """
+    The current user's recorded scans that were low quality (mean word
+    confidence at most `max_confidence`) and/or slow (at least
+    `min_processing_time` ms); timings and metadata only, no text
+    """
+    try:
+        scans = await ocr_scan_store.find_scans(
+            current_user.id, max_confidence, min_processing_time, min(max(1, limit), 500)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"OCR scan history unavailable: {str(e)}"
+        )
+    return {
+        "scans": jsonable_encoder(scans),
+        "count": len(scans),
+        "success": True
+    }
+
+@router.get("/ocr/stats")
+async def get_ocr_stats():
+    """
+    OCR worker pool utilisation and result cache hit/miss counters
+    """
+    return {
+        "stats": ocr_pool.stats(),
+        "job_queue_depth": await ocr_job_queue.depth(),
+        "success": True
+    }
@@ -0,0 +1,19 @@
+import pytest
+
+@pytest.fixture
+def fake_redis():
+    """In-memory Redis client; tests using it are skipped without fakeredis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+@pytest.fixture
+def with_redis():
+    """Point a TwoTierCache or SingleFlight at the given client instead of the shared one"""
+    def attach(component, client):
+        async def get_redis():
+            return client
+
+        component._get_redis = get_redis
+        return component
+
+    return attach
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import cache as cache_module
+from utils.cache import TwoTierCache
+
+class BrokenRedis:
+    """Redis client whose every command fails, like a dropped connection"""
+
+    async def get(self, key):
+        raise ConnectionError("connection reset")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("connection reset")
+
+@pytest.mark.unit
+class TestLocalTier:
+    """Test the in-process LRU tier"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted beyond max_entries"""
+        async def scenario():
+            cache = TwoTierCache("test", max_entries=2, use_redis=False)
+            await cache.set("a", 1)
+            await cache.set("b", 2)
+            assert await cache.get("a") == 1
+            await cache.set("c", 3)
+            assert await cache.get("b") is None
+            assert await cache.get("a") == 1
+            assert await cache.get("c") == 3
+
+        asyncio.run(scenario())
+
+    def test_evicts_beyond_max_bytes(self):
+        """Test that entries are evicted once their serialized size exceeds max_bytes"""
+        async def scenario():
+            cache = TwoTierCache("test", max_entries=10, max_bytes=20, use_redis=False)
+            await cache.set("a", "x" * 10)
+            await cache.set("b", "y" * 10)
+            assert cache.stats()["entries"] == 1
+            assert await cache.get("b") == "y" * 10
+            # A single entry larger than the limit is still kept
+            await cache.set("c", "z" * 40)
+            assert await cache.get("c") == "z" * 40
+            assert cache.stats()["entries"] == 1
+
+        asyncio.run(scenario())
+
+    def test_expired_entries_miss(self, monkeypatch):
+        """Test that entries older than the TTL are not returned"""
+        async def scenario():
+            now = [1000.0]
+            monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+            cache = TwoTierCache("test", ttl=60, use_redis=False)
+            await cache.set("a", 1)
+            now[0] += 59
+            assert await cache.get("a") == 1
+            now[0] += 2
+            assert await cache.get("a") is None
+            assert cache.stats()["entries"] == 0
+
+        asyncio.run(scenario())
+
+    def test_zero_entries_disables_local_tier(self):
+        """Test that max_entries=0 stores nothing locally"""
+        async def scenario():
+            cache = TwoTierCache("test", max_entries=0, use_redis=False)
+            await cache.set("a", 1)
+            assert await cache.get("a") is None
+            assert cache.stats()["misses"] == 1
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestRedisTier:
+    """Test the shared Redis tier"""
+
+    def test_redis_hit_is_promoted(self, fake_redis, with_redis):
+        """Test that a value set by another worker is read from Redis and then kept locally"""
+        async def scenario():
+            writer = with_redis(TwoTierCache("test"), fake_redis)
+            reader = with_redis(TwoTierCache("test"), fake_redis)
+            await writer.set("a", {"name": "Metformin"})
+            assert json.loads(await fake_redis.get("test:a")) == {"name": "Metformin"}
+            assert 0 < await fake_redis.ttl("test:a") <= 86400
+
+            assert await reader.get("a") == {"name": "Metformin"}
+            assert await reader.get("a") == {"name": "Metformin"}
+            stats = reader.stats()
+            assert (stats["redis_hits"], stats["memory_hits"]) == (1, 1)
+
+        asyncio.run(scenario())
+
+    def test_redis_errors_fall_back_to_local_tier(self, with_redis):
+        """Test that Redis failures are treated as misses, not errors"""
+        async def scenario():
+            cache = with_redis(TwoTierCache("test", max_entries=1), BrokenRedis())
+            await cache.set("a", 1)
+            assert await cache.get("a") == 1
+            await cache.set("b", 2)
+            assert await cache.get("a") is None
+            assert cache.stats()["misses"] == 1
+
+        asyncio.run(scenario())
+
+    def test_unreachable_redis_is_retried_later(self, monkeypatch):
+        """Test that a failed connection is not retried on every lookup"""
+        async def scenario():
+            attempts = []
+
+            async def get_redis():
+                attempts.append(1)
+                raise ConnectionError("refused")
+
+            config = type(sys)("database.config")
+            config.get_redis = get_redis
+            monkeypatch.setitem(sys.modules, "database.config", config)
+            cache = TwoTierCache("test")
+            assert await cache.get("a") is None
+            await cache.set("a", 1)
+            assert await cache.get("b") is None
+            assert len(attempts) == 1
+            assert cache._redis_retry_at > 0
+
+        asyncio.run(scenario())
@@ -0,0 +1,226 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MEDICINE_CACHE_REDIS", "false")
+os.environ.setdefault("EXERCISE_CACHE_REDIS", "false")
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chat_sessions import ChatSessionStore, ChatSessionNotFoundError
+from routes import chat
+
+class FakeCollection:
+    """Records the writes ChatSessionStore makes to the Mongo collection"""
+
+    def __init__(self, matched_count=1):
+        self.inserted = []
+        self.updates = []
+        self.matched_count = matched_count
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def insert_one(self, document):
+        self.inserted.append(document)
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+        return SimpleNamespace(matched_count=self.matched_count)
+
+async def summarize(summary, messages):
+    return f"{summary} {len(messages)} messages".strip()
+
+@pytest.mark.unit
+class TestLazySessions:
+    """Test that new sessions are stored with their first turn"""
+
+    def test_new_session_is_stored_on_first_turn(self):
+        """Test that opening a session stores nothing until a turn is appended"""
+        async def scenario():
+            store = ChatSessionStore()
+            session = await store.open()
+            assert store._local == {}
+            with pytest.raises(ChatSessionNotFoundError):
+                await store.open(session["session_id"])
+
+            await store.append_turn(session, "Hello", "Hi there")
+            stored = await store.open(session["session_id"])
+            assert [message["content"] for message in stored["messages"]] == ["Hello", "Hi there"]
+            assert "_new" not in stored
+
+        asyncio.run(scenario())
+
+    def test_mongo_session_is_inserted_with_first_turn(self, monkeypatch):
+        """Test that a new Mongo session is one insert holding the turn, later turns are updates"""
+        async def scenario():
+            store = ChatSessionStore()
+            collection = FakeCollection()
+            monkeypatch.setattr(store, "_get_collection", lambda: collection)
+
+            session = await store.open(user_id=7)
+            assert collection.inserted == []
+
+            await store.append_turn(session, "Hello", "Hi there", "Metformin")
+            assert len(collection.inserted) == 1
+            document = collection.inserted[0]
+            assert document["user_id"] == 7
+            assert len(document["messages"]) == 2
+            assert document["context"]["client_context"] == "Metformin"
+            assert "_new" not in document
+            assert collection.updates == []
+
+            await store.append_turn(session, "Thanks", "You're welcome")
+            assert len(collection.inserted) == 1
+            assert len(collection.updates) == 1
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestCompaction:
+    """Test that compaction bounds the stored messages"""
+
+    def test_stored_messages_are_capped(self):
+        """Test that the oldest summarized messages are dropped beyond max_messages"""
+        async def scenario():
+            store = ChatSessionStore(token_budget=40, max_messages=6)
+            session = await store.open()
+            for turn in range(20):
+                await store.append_turn(session, f"Question {turn} " + "x" * 40, f"Answer {turn} " + "y" * 40)
+                await store._compact(session, summarize)
+                assert len(session["messages"]) <= 6
+
+            context = session["context"]
+            assert 0 < context["summarized_messages"] <= len(session["messages"])
+            assert session["messages"][-1]["content"].startswith("Answer 19")
+            history = store.history_messages(session)
+            assert history[0]["role"] == "system"
+            assert history[-1]["content"] == session["messages"][-1]["content"]
+
+        asyncio.run(scenario())
+
+    def test_mongo_compaction_trims_the_same_prefix(self, monkeypatch):
+        """Test that the Mongo update drops exactly the messages dropped in memory"""
+        async def scenario():
+            store = ChatSessionStore(token_budget=40, max_messages=4)
+            collection = FakeCollection()
+            monkeypatch.setattr(store, "_get_collection", lambda: collection)
+            session = await store.open()
+            for turn in range(4):
+                await store.append_turn(session, f"Question {turn} " + "x" * 40, f"Answer {turn} " + "y" * 40)
+
+            await store._compact(session, summarize)
+            query, pipeline = collection.updates[-1]
+            assert query == {"session_id": session["session_id"], "context.summarized_messages": 0}
+            fields = pipeline[0]["$set"]
+            drop = fields["messages"]["$slice"][1]
+            assert drop == 8 - len(session["messages"])
+            assert fields["context.summarized_messages"] == session["context"]["summarized_messages"]
+
+        asyncio.run(scenario())
+
+    def test_mongo_compaction_lost_to_another_worker(self, monkeypatch):
+        """Test that a compaction whose summary state changed meanwhile is discarded"""
+        async def scenario():
+            store = ChatSessionStore(token_budget=40, max_messages=4)
+            collection = FakeCollection(matched_count=0)
+            monkeypatch.setattr(store, "_get_collection", lambda: collection)
+            session = await store.open()
+            for turn in range(4):
+                await store.append_turn(session, f"Question {turn} " + "x" * 40, f"Answer {turn} " + "y" * 40)
+
+            await store._compact(session, summarize)
+            assert len(collection.updates) == 4
+            assert len(session["messages"]) == 8
+            assert session["context"]["summarized_messages"] == 0
+            assert store.compactions == 0
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestSessionOwnership:
+    """Test that sessions are only available to the user who started them"""
+
+    def session_store(self, monkeypatch):
+        store = ChatSessionStore()
+        monkeypatch.setattr(chat, "chat_session_store", store)
+        session = asyncio.run(store.open(user_id=7))
+        asyncio.run(store.append_turn(session, "Hello", "Hi there"))
+        return store, session["session_id"]
+
+    def test_owner_can_read_and_close(self, monkeypatch):
+        """Test that the session's user can read and end it"""
+        store, session_id = self.session_store(monkeypatch)
+        session = asyncio.run(chat.get_chat_session(session_id, user_id=7))
+        assert [message["content"] for message in session["messages"]] == ["Hello", "Hi there"]
+        asyncio.run(chat.close_chat_session(session_id, user_id=7))
+        assert store._local[session_id]["is_active"] is False
+
+    @pytest.mark.parametrize("handler", ["get_chat_session", "close_chat_session"])
+    def test_other_user_is_not_found(self, monkeypatch, handler):
+        """Test that another user's session is reported as not found"""
+        store, session_id = self.session_store(monkeypatch)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(getattr(chat, handler)(session_id, user_id=8))
+        assert error.value.status_code == 404
+        assert store._local[session_id]["is_active"] is True
+
+    def test_other_user_cannot_continue(self, monkeypatch):
+        """Test that a chat request cannot continue another user's session"""
+        store, session_id = self.session_store(monkeypatch)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(chat.chat_with_assistant(chat.ChatRequest(message="Hello", session_id=session_id, user_id=8)))
+        assert error.value.status_code == 404
+
+    def test_mongo_close_is_scoped_to_user(self, monkeypatch):
+        """Test that closing a Mongo session only matches the user's own session"""
+        store = ChatSessionStore()
+        collection = FakeCollection(matched_count=0)
+        monkeypatch.setattr(store, "_get_collection", lambda: collection)
+        with pytest.raises(ChatSessionNotFoundError):
+            asyncio.run(store.close("abc", 8))
+        assert collection.updates[0][0] == {"session_id": "abc", "user_id": 8}
+
+@pytest.mark.unit
+class TestChatRoutes:
+    """Test session handling of the chat routes"""
+
+    def test_failed_chat_leaves_no_session(self, monkeypatch):
+        """Test that a GPT failure on a new conversation does not store a session"""
+        store = ChatSessionStore()
+        monkeypatch.setattr(chat, "chat_session_store", store)
+        monkeypatch.setattr(chat.chat_answer_cache, "lookup", lambda message, scope="": None)
+
+        async def create_completion(**kwargs):
+            raise Exception("upstream error")
+
+        monkeypatch.setattr(chat.gpt_processor, "create_completion", create_completion)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(chat.chat_with_assistant(chat.ChatRequest(message="Hello")))
+        assert error.value.status_code == 500
+        assert store._local == {}
+
+    @pytest.mark.parametrize("handler", ["chat_with_assistant", "stream_chat_with_assistant"])
+    def test_store_error_is_a_chat_error(self, monkeypatch, handler):
+        """Test that a session store failure is reported like other chat failures"""
+        async def open_session(session_id=None, user_id=None):
+            raise ConnectionError("MongoDB unreachable")
+
+        monkeypatch.setattr(chat.chat_session_store, "open", open_session)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(getattr(chat, handler)(chat.ChatRequest(message="Hello", session_id="abc")))
+        assert error.value.status_code == 500
+        assert error.value.detail == "Chat processing failed: MongoDB unreachable"
+
+    @pytest.mark.parametrize("handler", ["chat_with_assistant", "stream_chat_with_assistant"])
+    def test_unknown_session_is_not_found(self, monkeypatch, handler):
+        """Test that an unknown session id is still a 404"""
+        monkeypatch.setattr(chat, "chat_session_store", ChatSessionStore())
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(getattr(chat, handler)(chat.ChatRequest(message="Hello", session_id="abc")))
+        assert error.value.status_code == 404
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import asyncio
+import zipfile
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import medicine_db as medicine_db_module
+from utils.drug_index import DrugIndex, build_index
+from utils.medicine_db import MedicineDatabase
+
+FDA_LABELS = {
+    "results": [
+        {
+            "set_id": "label-metformin",
+            "drug_interactions": ["Alcohol potentiates the effect of metformin on lactate metabolism."],
+            "openfda": {
+                "generic_name": ["METFORMIN HYDROCHLORIDE"],
+                "brand_name": ["Glucophage"],
+                "rxcui": ["861007"]
+            }
+        },
+        {
+            "set_id": "label-without-names",
+            "openfda": {}
+        }
+    ]
+}
+
+def conso_row(rxcui, term_type, name, source="RXNORM", suppress="N"):
+    # RXCUI|LAT|TS|LUI|STT|SUI|ISPREF|RXAUI|SAUI|SCUI|SDUI|SAB|TTY|CODE|STR|SRL|SUPPRESS|CVF|
+    fields = [rxcui, "ENG", "", "", "", "", "", f"A{rxcui}", "", "", "", source, term_type, rxcui, name, "", suppress, ""]
+    return "|".join(fields) + "|"
+
+def rel_row(first, second, relation):
+    # RXCUI1|RXAUI1|STYPE1|REL|RXCUI2|RXAUI2|STYPE2|RELA|RUI|SRUI|SAB|SL|DIR|RG|SUPPRESS|CVF|
+    fields = [first, "", "CUI", "RO", second, "", "CUI", relation, "", "", "RXNORM", "RXNORM", "", "", "N", ""]
+    return "|".join(fields) + "|"
+
+@pytest.fixture
+def index_path(tmp_path):
+    """Drug index built from a tiny openFDA file and RxNorm release"""
+    fda_path = tmp_path / "drug-label-0001-of-0001.json"
+    fda_path.write_text(json.dumps(FDA_LABELS))
+
+    rrf_dir = tmp_path / "rxnorm" / "rrf"
+    rrf_dir.mkdir(parents=True)
+    (rrf_dir / "RXNCONSO.RRF").write_text("\n".join([
+        conso_row("6809", "IN", "metformin"),
+        conso_row("151827", "BN", "Glucophage"),
+        conso_row("29046", "IN", "lisinopril"),
+        conso_row("860975", "SCD", "metformin hydrochloride 500 MG Oral Tablet"),
+        conso_row("99999", "IN", "withdrawnol", suppress="O"),
+        conso_row("88888", "IN", "othersourcine", source="MTHSPL")
+    ]) + "\n")
+    (rrf_dir / "RXNREL.RRF").write_text(rel_row("6809", "151827", "has_tradename") + "\n")
+
+    path = str(tmp_path / "data" / "drug_index.sqlite")
+    counts = build_index(path, [str(fda_path)], str(tmp_path / "rxnorm"))
+    assert counts == {"labels": 1, "fda_names": 2, "rxnorm_names": 3}
+    return path
+
+@pytest.mark.unit
+class TestBuildIndex:
+    """Test building the drug index from bulk files"""
+
+    def test_zipped_fda_file(self, tmp_path):
+        """Test that openFDA .json.zip downloads are read"""
+        archive_path = tmp_path / "drug-label-0001-of-0001.json.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("drug-label-0001-of-0001.json", json.dumps(FDA_LABELS))
+        path = str(tmp_path / "drug_index.sqlite")
+        assert build_index(path, [str(archive_path)])["labels"] == 1
+        assert DrugIndex(path).lookup("glucophage")["sources"] == ["FDA"]
+
+    def test_missing_rxnconso_raises(self, tmp_path):
+        """Test that an RxNorm directory without RXNCONSO.RRF is reported"""
+        with pytest.raises(Exception, match="RXNCONSO.RRF"):
+            build_index(str(tmp_path / "drug_index.sqlite"), rxnorm_dir=str(tmp_path))
+
+@pytest.mark.unit
+class TestDrugIndexLookups:
+    """Test lookups in a built drug index"""
+
+    def test_lookup_merges_sources(self, index_path):
+        """Test that a brand known to both sources is found with its generic and label brands"""
+        entry = DrugIndex(index_path).lookup("  GLUCOPHAGE ")
+        assert entry["name"] == "Glucophage"
+        assert entry["sources"] == ["FDA", "RxNorm"]
+        assert entry["brand_names"] == ["Glucophage"]
+        assert entry["generic_name"] in ("METFORMIN HYDROCHLORIDE", "metformin")
+        assert entry["rxcui"] in ("861007", "151827")
+
+    def test_rxnorm_only_name(self, index_path):
+        """Test that an RxNorm ingredient without a label is found"""
+        entry = DrugIndex(index_path).lookup("lisinopril")
+        assert entry["sources"] == ["RxNorm"]
+        assert entry["brand_names"] == []
+
+    @pytest.mark.parametrize("name", ["withdrawnol", "othersourcine", "metformin hydrochloride 500 mg oral tablet", "zyxorin"])
+    def test_excluded_and_unknown_names(self, index_path, name):
+        """Test that suppressed, other-source, non-ingredient and unknown names are not found"""
+        index = DrugIndex(index_path)
+        assert index.lookup(name) is None
+        assert index.stats()["hits"] == 0
+
+    def test_search_by_prefix(self, index_path):
+        """Test that search matches names starting with the given words"""
+        names = {row["name"] for row in DrugIndex(index_path).search("metf")}
+        assert names == {"metformin", "METFORMIN HYDROCHLORIDE"}
+        assert DrugIndex(index_path).search('"') == []
+
+    def test_interactions(self, index_path):
+        """Test that interaction text comes from the indexed label"""
+        index = DrugIndex(index_path)
+        assert index.interactions("Metformin Hydrochloride") == FDA_LABELS["results"][0]["drug_interactions"]
+        assert index.interactions("lisinopril") is None
+
+    def test_missing_index_is_unavailable(self, tmp_path):
+        """Test that a missing index file disables lookups instead of failing"""
+        index = DrugIndex(str(tmp_path / "missing.sqlite"))
+        assert index.available is False
+        assert index.lookup("metformin") is None
+        assert index.search("metformin") == []
+        assert index.interactions("metformin") is None
+
+@pytest.mark.unit
+class TestRemoteFallback:
+    """Test when medicine verification still calls the FDA and RxNav APIs"""
+
+    def verify(self, monkeypatch, index, name):
+        calls = []
+
+        async def get_fda_drug_info(drug_name):
+            calls.append(("FDA", drug_name))
+            return {"openfda": {"generic_name": ["remote"]}}
+
+        async def get_rxnav_drug_info(drug_name):
+            calls.append(("RxNav", drug_name))
+            return None
+
+        monkeypatch.setattr(medicine_db_module, "drug_index", index)
+        database = MedicineDatabase()
+        monkeypatch.setattr(database, "get_fda_drug_info", get_fda_drug_info)
+        monkeypatch.setattr(database, "get_rxnav_drug_info", get_rxnav_drug_info)
+        return asyncio.run(database.cross_verify_medicine(name, {"name": name})), calls
+
+    def test_indexed_name_is_verified_locally(self, monkeypatch, index_path):
+        """Test that an indexed name makes no remote calls"""
+        info, calls = self.verify(monkeypatch, DrugIndex(index_path), "Glucophage")
+        assert calls == []
+        assert info["verification_mode"] == "local"
+        assert info["verification_sources"] == ["FDA", "RxNav"]
+
+    def test_unknown_name_falls_back_to_remote(self, monkeypatch, index_path):
+        """Test that names missing from the index are looked up remotely"""
+        monkeypatch.setattr(medicine_db_module, "DRUG_INDEX_REMOTE_FALLBACK", True)
+        info, calls = self.verify(monkeypatch, DrugIndex(index_path), "Zyxorin")
+        assert sorted(calls) == [("FDA", "Zyxorin"), ("RxNav", "Zyxorin")]
+        assert info["verification_mode"] == "remote"
+        assert info["generic_name"] == "remote"
+
+    def test_remote_fallback_can_be_disabled(self, monkeypatch, index_path):
+        """Test that with the fallback disabled unknown names are unverified without remote calls"""
+        monkeypatch.setattr(medicine_db_module, "DRUG_INDEX_REMOTE_FALLBACK", False)
+        info, calls = self.verify(monkeypatch, DrugIndex(index_path), "Zyxorin")
+        assert calls == []
+        assert info["verified"] is False
+
+    def test_missing_index_always_uses_remote(self, monkeypatch, tmp_path):
+        """Test that without an index the remote APIs are used even with the fallback disabled"""
+        monkeypatch.setattr(medicine_db_module, "DRUG_INDEX_REMOTE_FALLBACK", False)
+        info, calls = self.verify(monkeypatch, DrugIndex(str(tmp_path / "missing.sqlite")), "Glucophage")
+        assert len(calls) == 2
+        assert info["verified"] is True
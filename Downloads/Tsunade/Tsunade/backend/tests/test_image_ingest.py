@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import base64
+import asyncio
+import random
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_ingest import Base64StreamDecoder, ImageTooLargeError, SpooledImage, spool_base64_json
+
+IMAGE = random.Random(7).randbytes(3001)
+
+def chunked(data, sizes):
+    """Split bytes into chunks of the given sizes, cycling through them"""
+    chunks = []
+    index = 0
+    position = 0
+    while position < len(data):
+        size = sizes[index % len(sizes)]
+        chunks.append(data[position:position + size])
+        position += size
+        index += 1
+    return chunks
+
+def decode_chunks(chunks):
+    decoder = Base64StreamDecoder()
+    return b"".join(decoder.feed(chunk) for chunk in chunks) + decoder.flush()
+
+async def as_stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+def spool(chunks, **kwargs):
+    image = asyncio.run(spool_base64_json(as_stream(chunks), **kwargs))
+    if image is None:
+        return None
+    try:
+        return image.read_bytes()
+    finally:
+        image.close()
+
+@pytest.mark.unit
+class TestBase64StreamDecoder:
+    """Test decoding of base64 text fed in arbitrary chunks"""
+
+    @pytest.mark.parametrize("sizes", [[1], [3], [5], [1, 2, 7], [4096]])
+    def test_chunk_boundaries(self, sizes):
+        """Test that groups split across chunks decode to the original bytes"""
+        encoded = base64.b64encode(IMAGE)
+        assert decode_chunks(chunked(encoded, sizes)) == IMAGE
+
+    @pytest.mark.parametrize("length", [1, 2, 3, 4])
+    def test_padding_split_from_data(self, length):
+        """Test that padding arriving in its own chunk is handled"""
+        encoded = base64.b64encode(IMAGE[:length])
+        assert decode_chunks([encoded[:-1], encoded[-1:]]) == IMAGE[:length]
+
+    def test_missing_padding(self):
+        """Test that unpadded input is completed on flush"""
+        encoded = base64.b64encode(IMAGE[:10]).rstrip(b"=")
+        assert decode_chunks(chunked(encoded, [3])) == IMAGE[:10]
+
+    def test_line_wrapping_and_url_safe_alphabet(self):
+        """Test that whitespace is skipped and the URL-safe alphabet is accepted"""
+        encoded = base64.urlsafe_b64encode(IMAGE)
+        wrapped = b"\r\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+        assert decode_chunks(chunked(wrapped, [77, 5])) == IMAGE
+
+    def test_invalid_data_raises_value_error(self):
+        """Test that undecodable input is reported as ValueError"""
+        decoder = Base64StreamDecoder()
+        with pytest.raises(ValueError):
+            decoder.feed(b"A===")
+
+@pytest.mark.unit
+class TestSpoolBase64Json:
+    """Test streaming a base64 image out of a JSON request body"""
+
+    @pytest.mark.parametrize("sizes", [[1], [2, 3], [17], [65536]])
+    def test_escaped_solidus_across_chunks(self, sizes):
+        """Test that escaped slashes split from their backslash are decoded"""
+        body = json.dumps({"name": "scan", "image": base64.b64encode(IMAGE).decode()}).replace("/", "\\/").encode()
+        assert b"\\/" in body
+        assert spool(chunked(body, sizes)) == IMAGE
+
+    @pytest.mark.parametrize("sizes", [[1], [4], [9]])
+    def test_data_url_prefix_across_chunks(self, sizes):
+        """Test that a data URL prefix split across chunks is skipped"""
+        body = json.dumps({"image": "data:image/png;base64," + base64.b64encode(IMAGE).decode()}).encode()
+        assert spool(chunked(body, sizes)) == IMAGE
+
+    def test_key_split_across_chunks(self):
+        """Test that the field name can be split across chunks"""
+        body = json.dumps({"padding": "x" * 100, "image": base64.b64encode(IMAGE).decode()}).encode()
+        split = body.index(b'"image"') + 3
+        assert spool([body[:split], body[split:]]) == IMAGE
+
+    def test_missing_field(self):
+        """Test that a body without the field yields None"""
+        assert spool(chunked(json.dumps({"other": "AAAA"}).encode(), [5])) is None
+
+    def test_size_limit(self):
+        """Test that decoded images over the limit are rejected"""
+        body = json.dumps({"image": base64.b64encode(IMAGE).decode()}).encode()
+        with pytest.raises(ImageTooLargeError):
+            spool(chunked(body, [100]), max_bytes=1000)
+
+@pytest.mark.unit
+class TestSpooledImage:
+    """Test handing spooled images over without copying them"""
+
+    def test_small_image_source_is_a_view(self):
+        """Test that an in-memory image is handed over as a read-only view of its buffer"""
+        with SpooledImage() as image:
+            image.write(IMAGE)
+            source = image.finish().source()
+            assert isinstance(source, memoryview)
+            assert source.readonly
+            assert source.obj is image._buffer
+            assert source == IMAGE
+
+    def test_large_image_source_is_the_path(self):
+        """Test that an image spooled to disk is handed over by path"""
+        with SpooledImage(memory_limit=1000) as image:
+            image.write(IMAGE)
+            source = image.finish().source()
+            assert source == image.path
+            with open(source, "rb") as f:
+                assert f.read() == IMAGE
+
+    @pytest.mark.parametrize("memory_limit", [1000, 10000])
+    def test_chunks(self, memory_limit):
+        """Test that chunks() yields the whole image in pieces of at most the given size"""
+        with SpooledImage(memory_limit=memory_limit) as image:
+            image.write(IMAGE)
+            chunks = list(image.finish().chunks(1024))
+            assert [len(chunk) for chunk in chunks] == [1024, 1024, 953]
+            assert b"".join(chunks) == IMAGE
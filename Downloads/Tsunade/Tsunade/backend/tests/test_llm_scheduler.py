@@ -0,0 +1,185 @@
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_scheduler import LLMScheduler, LLMBusyError, ScheduledStream, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+def content_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class FakeResponse:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+class FakeStream:
+    """Stands in for openai.AsyncStream; yields a chunk each time `step` is set"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.response = FakeResponse()
+        self.step = asyncio.Event()
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await self.step.wait()
+            self.step.clear()
+            yield chunk
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.unit
+class TestStreamSlots:
+    """Test that streamed calls hold their concurrency slot until closed"""
+
+    def test_concurrent_streams_respect_limit(self):
+        """Test that more concurrent streams than slots wait for earlier streams to finish"""
+        async def scenario():
+            scheduler = LLMScheduler(max_concurrency=2, tokens_per_minute=1_000_000)
+            fakes = [FakeStream([content_chunk("a"), content_chunk("b")]) for _ in range(5)]
+            opened = []
+            peak = 0
+
+            async def consume(fake):
+                nonlocal peak
+                stream = await scheduler.run(lambda: asyncio.sleep(0, fake), stream=True, estimated_tokens=10)
+                opened.append(fake)
+                peak = max(peak, scheduler.stats()["active"])
+                async for _ in stream:
+                    pass
+
+            tasks = [asyncio.create_task(consume(fake)) for fake in fakes]
+            await settle()
+            assert len(opened) == 2
+            assert scheduler.stats()["active"] == 2
+            assert scheduler.stats()["completed"] == 0
+
+            # Finish streams one at a time; each one frees a slot for the next
+            finished = 0
+            while finished < len(fakes):
+                fake = opened[finished]
+                for _ in fake.chunks:
+                    fake.step.set()
+                    await settle()
+                finished += 1
+                await settle()
+                assert fake.response.closed
+                assert scheduler.stats()["completed"] == finished
+                assert len(opened) == min(len(fakes), finished + 2)
+
+            await asyncio.gather(*tasks)
+            assert peak == 2
+            assert scheduler.stats()["active"] == 0
+
+        asyncio.run(scenario())
+
+    def test_early_close_releases_slot(self):
+        """Test that closing a stream before the end frees its slot"""
+        async def scenario():
+            scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=1_000_000)
+            fake = FakeStream([content_chunk("a"), content_chunk("b")])
+            stream = await scheduler.run(lambda: asyncio.sleep(0, fake), stream=True)
+            assert isinstance(stream, ScheduledStream)
+            assert scheduler.stats()["active"] == 1
+
+            await stream.aclose()
+            await stream.aclose()
+            assert fake.response.closed
+            assert scheduler.stats()["active"] == 0
+            assert scheduler.stats()["completed"] == 1
+
+        asyncio.run(scenario())
+
+    def test_stream_usage_is_reconciled(self):
+        """Test that the bucket is charged for the prompt and the chunks produced, not the budget"""
+        async def scenario():
+            scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=60_000)
+            fake = FakeStream([content_chunk("a"), SimpleNamespace(choices=[]), content_chunk("b")])
+            stream = await scheduler.run(
+                lambda: asyncio.sleep(0, fake), stream=True, estimated_tokens=1000, prompt_tokens=50
+            )
+            assert scheduler.stats()["tokens_available"] <= 59_001
+
+            fake.step.set()
+            async for _ in stream:
+                fake.step.set()
+            assert stream.completion_tokens == 2
+            # 50 prompt + 2 completion tokens charged, the rest refunded
+            assert 59_940 <= scheduler.stats()["tokens_available"] <= 60_000
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestAdmission:
+    """Test queueing and priorities of non-streamed calls"""
+
+    def test_interactive_runs_before_batch(self):
+        """Test that queued interactive calls are dispatched ahead of batch calls"""
+        async def scenario():
+            scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=1_000_000)
+            gate = asyncio.Event()
+            order = []
+
+            async def call(name):
+                if name == "first":
+                    await gate.wait()
+                order.append(name)
+
+            first = asyncio.create_task(scheduler.run(lambda: call("first")))
+            await settle()
+            batch = asyncio.create_task(scheduler.run(lambda: call("batch"), priority=PRIORITY_BATCH))
+            interactive = asyncio.create_task(scheduler.run(lambda: call("interactive"), priority=PRIORITY_INTERACTIVE))
+            await settle()
+            gate.set()
+            await asyncio.gather(first, batch, interactive)
+            assert order == ["first", "interactive", "batch"]
+
+        asyncio.run(scenario())
+
+    def test_full_queue_is_rejected(self):
+        """Test that calls beyond the queue limit raise LLMBusyError"""
+        async def scenario():
+            scheduler = LLMScheduler(max_concurrency=1, max_queue=1, tokens_per_minute=1_000_000)
+            gate = asyncio.Event()
+            running = asyncio.create_task(scheduler.run(gate.wait))
+            queued = asyncio.create_task(scheduler.run(gate.wait))
+            await settle()
+            with pytest.raises(LLMBusyError):
+                await scheduler.run(gate.wait)
+            gate.set()
+            await asyncio.gather(running, queued)
+            assert scheduler.stats()["rejected"] == 1
+
+        asyncio.run(scenario())
+
+    def test_zero_queue_admits_when_idle(self):
+        """Test that max_queue=0 still runs calls that get a slot straight away"""
+        async def scenario():
+            scheduler = LLMScheduler(max_concurrency=1, max_queue=0, tokens_per_minute=1_000_000)
+            gate = asyncio.Event()
+
+            async def answer():
+                return "ok"
+
+            assert await scheduler.run(answer) == "ok"
+            running = asyncio.create_task(scheduler.run(gate.wait))
+            await settle()
+            with pytest.raises(LLMBusyError):
+                await scheduler.run(answer)
+            gate.set()
+            await running
+            assert await scheduler.run(answer) == "ok"
+            stats = scheduler.stats()
+            assert stats["rejected"] == 1
+            assert sum(stats["queued"].values()) == 0
+
+        asyncio.run(scenario())
@@ -0,0 +1,107 @@
+import os
+import sys
+import asyncio
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MEDICINE_CACHE_REDIS", "false")
+os.environ.setdefault("EXERCISE_CACHE_REDIS", "false")
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.medicine_corrector import medicine_corrector
+from routes import extract_meds
+
+@pytest.mark.unit
+class TestMatchPrescriptionText:
+    """Test the local dictionary fast path of /extract-meds"""
+
+    def test_prescription_entry_is_matched(self):
+        """Test that a name with a strength and frequency is resolved locally"""
+        matched, unresolved = medicine_corrector.match_prescription_text("Tab Amoxicillin 500mg TDS")
+        assert [medicine["corrected"] for medicine in matched] == ["Amoxicillin"]
+        assert unresolved == []
+
+    def test_frequency_marks_prescription_entry(self):
+        """Test that a dosing frequency alone marks a prescription entry"""
+        matched, unresolved = medicine_corrector.match_prescription_text("Paracetamol 1-0-1")
+        assert [medicine["corrected"] for medicine in matched] == ["Acetaminophen"]
+        assert unresolved == []
+
+    @pytest.mark.parametrize("line", [
+        "Avoid ibuprofen and aspirin",
+        "Avoid ibuprofen 400mg",
+        "Allergic to amoxicillin",
+        "Stop metformin 500mg BD",
+        "Do not take aspirin with warfarin",
+        "No NSAIDs - ibuprofen contraindicated"
+    ])
+    def test_negated_and_instruction_lines_go_to_gpt(self, line):
+        """Test that names on negated or instruction lines are never accepted locally"""
+        matched, unresolved = medicine_corrector.match_prescription_text(line)
+        assert matched == []
+        assert unresolved == [line]
+
+    def test_bare_name_goes_to_gpt(self):
+        """Test that a name without dosage form, strength or frequency is not accepted"""
+        matched, unresolved = medicine_corrector.match_prescription_text("Ibuprofen")
+        assert matched == []
+        assert unresolved == ["Ibuprofen"]
+
+    def test_unknown_second_medicine_goes_to_gpt(self):
+        """Test that an entry with more strengths than known names is also sent to GPT"""
+        matched, unresolved = medicine_corrector.match_prescription_text("Ibuprofen 400mg + Zyxorin 10mg")
+        assert [medicine["corrected"] for medicine in matched] == ["Ibuprofen"]
+        assert unresolved == ["Ibuprofen 400mg + Zyxorin 10mg"]
+
+    def test_unrelated_lines_are_ignored(self):
+        """Test that lines without medicine names or markers are dropped"""
+        matched, unresolved = medicine_corrector.match_prescription_text("Patient has no fever")
+        assert matched == []
+        assert unresolved == []
+
+@pytest.mark.unit
+class TestExtractMedsDictionaryPath:
+    """Test that /extract-meds only skips GPT for prescription entries"""
+
+    def run_extract(self, monkeypatch, text, gpt_medicines=()):
+        calls = []
+
+        async def analyze_prescription(prescription_text):
+            calls.append(prescription_text)
+            return {"corrected_medicines": [dict(medicine) for medicine in gpt_medicines], "summary": ""}
+
+        monkeypatch.setattr(extract_meds.gpt_processor, "analyze_prescription", analyze_prescription)
+        response = asyncio.run(extract_meds.extract_medicines(extract_meds.ExtractMedsRequest(prescription_text=text)))
+        return response, calls
+
+    def test_instruction_only_text_is_sent_to_gpt(self, monkeypatch):
+        """Test that "Avoid ibuprofen and aspirin" is not returned as prescribed"""
+        response, calls = self.run_extract(monkeypatch, "Avoid ibuprofen and aspirin")
+        assert calls == ["Avoid ibuprofen and aspirin"]
+        assert response.medicines == []
+        assert response.success is False
+
+    def test_instruction_line_next_to_prescription_entry(self, monkeypatch):
+        """Test that the entry is resolved locally and the instruction line goes to GPT"""
+        response, calls = self.run_extract(monkeypatch, "Tab Amoxicillin 500mg TDS\nAvoid ibuprofen and aspirin")
+        assert calls == ["Avoid ibuprofen and aspirin"]
+        assert [(medicine.corrected, medicine.source) for medicine in response.medicines] == [("Amoxicillin", "dictionary")]
+
+    def test_prescription_entries_skip_gpt(self, monkeypatch):
+        """Test that confident prescription entries do not call GPT"""
+        response, calls = self.run_extract(monkeypatch, "Tab Amoxicillin 500mg TDS\nCap Omeprazole 20mg OD")
+        assert calls == []
+        assert [medicine.corrected for medicine in response.medicines] == ["Amoxicillin", "Omeprazole"]
+
+    def test_malformed_gpt_medicines_are_dropped(self, monkeypatch):
+        """Test that GPT entries without a usable name or confidence are skipped, not a 500"""
+        valid = {"original": "ibuprofn", "corrected": "Ibuprofen", "confidence": 90, "method": "spelling_correction", "explanation": "", "is_valid": True}
+        response, _ = self.run_extract(monkeypatch, "Avoid ibuprofn", [
+            valid,
+            {**valid, "corrected": None},
+            {**valid, "confidence": "high"},
+            {"original": "aspirin"}
+        ])
+        assert [(medicine.corrected, medicine.source) for medicine in response.medicines] == [("Ibuprofen", "gpt")]
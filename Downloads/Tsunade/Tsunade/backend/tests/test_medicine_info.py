@@ -0,0 +1,62 @@
+import os
+import sys
+import asyncio
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MEDICINE_CACHE_REDIS", "false")
+os.environ.setdefault("EXERCISE_CACHE_REDIS", "false")
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.gpt import GPTProcessor
+
+def info(name):
+    return {"name": name, "uses": [f"{name} uses"], "side_effects": ["nausea"]}
+
+@pytest.mark.unit
+class TestMedicineInfoCache:
+    """Test that cached medicine information is handed out as copies"""
+
+    def test_callers_cannot_modify_cached_info(self, monkeypatch):
+        """Test that changing a returned entry does not change the cached one"""
+        async def scenario():
+            processor = GPTProcessor()
+            calls = []
+
+            async def fetch(medicine_names):
+                calls.append(list(medicine_names))
+                return [info(name) for name in medicine_names]
+
+            monkeypatch.setattr(processor, "_fetch_medicine_info", fetch)
+            first, again = await processor.get_medicine_info(["Metformin", "metformin"])
+            assert first is not again
+            first["uses"].append("tampered")
+            first["name"] = "Tampered"
+
+            cached = (await processor.get_medicine_info(["Metformin"]))[0]
+            assert cached == info("Metformin")
+            assert calls == [["Metformin"]]
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestMatchMedicineInfo:
+    """Test pairing GPT's answers with the requested names"""
+
+    def test_parenthetical_and_whole_word_names_match(self):
+        """Test that "Amoxicillin (Amoxil)" answers both of its names"""
+        processor = GPTProcessor()
+        answer = [info("Amoxicillin (Amoxil)"), info("Metformin Hydrochloride")]
+        matched = processor._match_medicine_info(["amoxil", "Metformin", "Amoxicillin"], answer)
+        assert matched["amoxil"]["name"] == "Amoxicillin (Amoxil)"
+        assert matched["amoxicillin"]["name"] == "Amoxicillin (Amoxil)"
+        assert matched["metformin"]["name"] == "Metformin Hydrochloride"
+
+    def test_partial_word_does_not_match(self):
+        """Test that a name inside another word is not taken as a match"""
+        processor = GPTProcessor()
+        # One name for two answers, so nothing is matched by position either
+        matched = processor._match_medicine_info(["pril"], [info("Lisinopril"), info("Amoxicillin")])
+        assert matched == {}
@@ -0,0 +1,192 @@
+import os
+import sys
+import asyncio
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ocr_jobs
+from utils.ocr import OCRQueueFullError
+from utils.ocr_jobs import OCRJobQueue, InMemoryJobStore, RedisJobStore
+from utils.image_ingest import SpooledImage
+
+def spooled(data, **kwargs):
+    image = SpooledImage(**kwargs)
+    image.write(data)
+    return image.finish()
+
+class FlakyStore(InMemoryJobStore):
+    """In-memory store whose first `failures` saves raise, like a Redis timeout"""
+
+    def __init__(self, failures):
+        super().__init__(max_depth=10, result_ttl=3600)
+        self.failures = failures
+
+    async def save(self, job):
+        if job["status"] != "queued" and self.failures:
+            self.failures -= 1
+            raise ConnectionError("Redis timeout")
+        await super().save(job)
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """OCR pool stand-in; `full` is how many calls report a full pool first"""
+    state = {"full": 0, "calls": 0}
+
+    async def extract(image_data):
+        state["calls"] += 1
+        if state["full"]:
+            state["full"] -= 1
+            raise OCRQueueFullError("OCR service is busy")
+        return {"text": image_data.read_bytes().decode()}
+
+    monkeypatch.setattr(ocr_jobs.ocr_pool, "extract", extract)
+    monkeypatch.setattr(ocr_jobs.ocr_scan_store, "record", lambda result, **metadata: None)
+    return state
+
+async def wait_for_status(queue, job_id, status, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = await queue.get(job_id)
+        if job is not None and job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {await queue.get(job_id)}")
+
+@pytest.mark.unit
+class TestOCRJobConsumer:
+    """Test that consumers survive failures and absorb pool backpressure"""
+
+    def test_store_error_does_not_kill_consumer(self, fake_ocr):
+        """Test that a store error while starting a job leaves the consumer running"""
+        async def scenario():
+            queue = OCRJobQueue(consumers=1, pool_retry_delay=0.01)
+            await queue.start()
+            queue.store = FlakyStore(failures=1)
+            try:
+                lost = await queue.submit(spooled(b"first"))
+                kept = await queue.submit(spooled(b"second"))
+                job = await wait_for_status(queue, kept["job_id"], "completed")
+                assert job["text"] == "second"
+                # The job whose save failed is abandoned, not completed
+                assert (await queue.get(lost["job_id"]))["status"] in ("queued", "processing")
+                assert all(not task.done() for task in queue._tasks)
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_full_pool_is_retried(self, fake_ocr):
+        """Test that a full OCR pool delays the job instead of failing it"""
+        async def scenario():
+            fake_ocr["full"] = 3
+            queue = OCRJobQueue(consumers=1, pool_retry_delay=0.01)
+            await queue.start()
+            queue.store = InMemoryJobStore(max_depth=10, result_ttl=3600)
+            try:
+                submitted = await queue.submit(spooled(b"text"))
+                job = await wait_for_status(queue, submitted["job_id"], "completed")
+                assert job["text"] == "text"
+                assert job["error"] is None
+                assert fake_ocr["calls"] == 4
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_ocr_error_fails_job(self, monkeypatch, fake_ocr):
+        """Test that an OCR error is reported on the job"""
+        async def extract(image_data):
+            raise Exception("Tesseract crashed")
+
+        async def scenario():
+            monkeypatch.setattr(ocr_jobs.ocr_pool, "extract", extract)
+            queue = OCRJobQueue(consumers=1)
+            await queue.start()
+            queue.store = InMemoryJobStore(max_depth=10, result_ttl=3600)
+            try:
+                submitted = await queue.submit(spooled(b"text"))
+                job = await wait_for_status(queue, submitted["job_id"], "failed")
+                assert job["error"] == "Tesseract crashed"
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestOCRJobSubmit:
+    """Test submission when the queue is full"""
+
+    def test_full_queue_leaves_no_record(self):
+        """Test that a rejected job does not stay "queued" forever"""
+        async def scenario():
+            queue = OCRJobQueue(max_depth=1)
+            queue.store = InMemoryJobStore(max_depth=1, result_ttl=3600)
+            accepted = await queue.submit(spooled(b"first"))
+            with pytest.raises(OCRQueueFullError):
+                await queue.submit(spooled(b"second"))
+            assert list(queue.store._jobs) == [accepted["job_id"]]
+
+        asyncio.run(scenario())
+
+    def test_redis_depth_limit_holds_under_concurrency(self, fake_redis):
+        """Test that concurrent Redis submissions never exceed the queue depth"""
+        pytest.importorskip("lupa")
+
+        async def scenario():
+            queue = OCRJobQueue(max_depth=3)
+            queue.store = RedisJobStore(fake_redis, max_depth=3, result_ttl=3600)
+            results = await asyncio.gather(
+                *[queue.submit(spooled(f"page {i}".encode())) for i in range(10)],
+                return_exceptions=True
+            )
+            accepted = [result for result in results if isinstance(result, dict)]
+            assert len(accepted) == 3
+            assert sum(isinstance(result, OCRQueueFullError) for result in results) == 7
+            assert await queue.depth() == 3
+            assert len(await fake_redis.keys("ocr:job:*")) == 3 * 2
+
+            job_id, image = await queue.store.pop(timeout=1)
+            assert job_id in {job["job_id"] for job in accepted}
+            assert image.read_bytes().startswith(b"page ")
+            image.close()
+
+        asyncio.run(scenario())
+
+    def test_redis_round_trip_streams_large_image(self, fake_redis):
+        """Test that an image spooled to disk is copied through Redis in pieces and intact"""
+        pytest.importorskip("lupa")
+
+        async def scenario():
+            data = bytes(range(256)) * 1000 + b"tail"
+            store = RedisJobStore(fake_redis, max_depth=3, result_ttl=3600)
+            image = spooled(data, memory_limit=1024)
+            spool_path = image.path
+            await store.push("job", image)
+            assert not os.path.exists(spool_path)
+            assert await fake_redis.keys("ocr:job:*") == ["ocr:job:job:image"]
+
+            job_id, popped = await store.pop(timeout=1)
+            try:
+                assert job_id == "job"
+                assert popped.read_bytes() == data
+                assert popped.digest == image.digest
+                assert not await fake_redis.exists("ocr:job:job:image")
+            finally:
+                popped.close()
+
+        asyncio.run(scenario())
+
+    def test_rejected_upload_is_removed(self, fake_redis):
+        """Test that a push that loses the race for the last slot leaves no image behind"""
+        pytest.importorskip("lupa")
+
+        async def scenario():
+            store = RedisJobStore(fake_redis, max_depth=1, result_ttl=3600)
+            await store.push("first", spooled(b"first"))
+            with pytest.raises(OCRQueueFullError):
+                await store.push("second", spooled(b"second"))
+            assert await fake_redis.keys("ocr:job:second:*") == []
+
+        asyncio.run(scenario())
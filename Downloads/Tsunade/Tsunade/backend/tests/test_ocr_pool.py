@@ -0,0 +1,54 @@
+import os
+import sys
+import asyncio
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ocr import OCRWorkerPool
+
+def crash():
+    # Dies like a worker killed by the OOM killer
+    os._exit(1)
+
+def worker_pid():
+    return os.getpid()
+
+@pytest.mark.unit
+class TestOCRWorkerPool:
+    """Test that the OCR process pool recovers from dead workers"""
+
+    def test_killed_worker_gets_a_fresh_pool(self):
+        """Test that calls after a worker crash run on a new pool"""
+        async def scenario():
+            pool = OCRWorkerPool(max_workers=1, max_queue=4)
+            try:
+                first_pid = await pool.run(worker_pid)
+                broken = pool._executor
+                with pytest.raises(BrokenProcessPool):
+                    await pool.run(crash)
+                assert pool._executor is None
+
+                assert await pool.run(worker_pid) != first_pid
+                assert pool._executor is not broken
+                assert pool.stats()["running"] == 0
+            finally:
+                pool.shutdown()
+
+        asyncio.run(scenario())
+
+    def test_concurrent_calls_on_broken_pool_replace_it_once(self):
+        """Test that calls failing on the same broken pool do not discard its replacement"""
+        async def scenario():
+            pool = OCRWorkerPool(max_workers=2, max_queue=4)
+            try:
+                results = await asyncio.gather(pool.run(crash), pool.run(crash), return_exceptions=True)
+                assert all(isinstance(result, BrokenProcessPool) for result in results)
+                pids = await asyncio.gather(pool.run(worker_pid), pool.run(worker_pid))
+                assert all(pid != os.getpid() for pid in pids)
+            finally:
+                pool.shutdown()
+
+        asyncio.run(scenario())
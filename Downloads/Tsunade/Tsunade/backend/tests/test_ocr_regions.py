@@ -0,0 +1,53 @@
+import os
+import sys
+import random
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import prescription_lines, render_prescription
+from utils.ocr import TextRegionDetector
+
+def grayscale_page(dpi, angle, seed=7):
+    rng = random.Random(seed)
+    image = render_prescription(prescription_lines(rng), dpi, angle, rng)
+    return np.asarray(image.convert("L"), dtype=np.uint8)
+
+def covered_fraction(pixels, regions):
+    # Text is drawn at 10-50; speckle (120-200) and the fold line (215) are lighter
+    text = pixels < 100
+    inside = np.zeros_like(text)
+    for left, top, right, bottom in regions:
+        inside[top:bottom, left:right] = True
+    return (text & inside).sum() / text.sum()
+
+@pytest.mark.unit
+class TestTextRegionDetector:
+    """Test text-region detection on speckled synthetic prescriptions"""
+
+    @pytest.mark.parametrize("dpi,angle", [(150, 0.0), (200, -2.0), (300, 3.0)])
+    def test_speckled_page_yields_text_regions(self, dpi, angle):
+        """Test that speckle does not make the detector fall back to the full page"""
+        pixels = grayscale_page(dpi, angle)
+        regions = TextRegionDetector().detect(pixels)
+        assert regions
+        coverage = sum((right - left) * (bottom - top) for left, top, right, bottom in regions) / pixels.size
+        assert coverage < 0.5
+        assert covered_fraction(pixels, regions) > 0.99
+
+    def test_small_page_yields_text_regions(self):
+        """Test that pages below the working size are handled the same way"""
+        image = Image.fromarray(grayscale_page(200, 0.0))
+        image.thumbnail((1200, 1200), Image.BILINEAR)
+        pixels = np.asarray(image)
+        regions = TextRegionDetector().detect(pixels)
+        assert regions
+        assert covered_fraction(pixels, regions) > 0.99
+
+    def test_blank_page_has_no_regions(self):
+        """Test that a page without ink is OCRed as a whole"""
+        pixels = np.full((1650, 1275), 245, dtype=np.uint8)
+        assert TextRegionDetector().detect(pixels) == []
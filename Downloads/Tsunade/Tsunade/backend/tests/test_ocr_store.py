@@ -0,0 +1,96 @@
+import os
+import sys
+import asyncio
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ocr_store import OCRScanStore
+
+RESULT = {
+    "text": "Tab Metformin 500mg BD",
+    "mean_confidence": 91.5,
+    "tier": "fast",
+    "timings": {"preprocess_ms": 120.0, "ocr_ms": 2380.0},
+    "words": [{"text": "Metformin", "confidence": 95.0}, {"text": "BD", "confidence": 40.0}]
+}
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents = sorted(self.documents, key=lambda document: document["_sort"], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self.documents = self.documents[:limit]
+        return self
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield dict(document)
+
+class FakeCollection:
+    """Records the find() arguments OCRScanStore passes to Mongo"""
+
+    def __init__(self, documents=()):
+        self.documents = list(documents)
+        self.finds = []
+
+    def find(self, query, projection):
+        self.finds.append((query, projection))
+        return FakeCursor(self.documents)
+
+@pytest.mark.unit
+class TestBuildDocument:
+    """Test the PrescriptionImage documents recorded for scans"""
+
+    def test_scan_document(self):
+        """Test that a fresh scan records its timings and word statistics"""
+        document = OCRScanStore().build_document(RESULT, {"user_id": 7, "digest": "abc", "page": 2})
+        assert document["user_id"] == 7
+        assert document["image_digest"] == "abc"
+        assert document["image_metadata"]["page"] == 2
+        ocr_results = document["ocr_results"]
+        assert ocr_results["processing_time"] == 2500.0
+        assert ocr_results["cached"] is False
+        assert (ocr_results["word_count"], ocr_results["low_confidence_words"]) == (2, 1)
+
+    def test_cache_hit_costs_nothing(self):
+        """Test that a cache hit is not recorded with the original scan's processing time"""
+        document = OCRScanStore().build_document({**RESULT, "cached": True}, {})
+        assert document["ocr_results"]["processing_time"] == 0
+        assert document["ocr_results"]["cached"] is True
+        assert document["ocr_results"]["timings"] == RESULT["timings"]
+
+@pytest.mark.unit
+class TestFindScans:
+    """Test the slow and low-quality scan query"""
+
+    def test_query_is_scoped_to_user_and_skips_cache_hits(self, monkeypatch):
+        """Test that only the user's uncached scans are queried, without their text"""
+        async def scenario():
+            store = OCRScanStore()
+            collection = FakeCollection([{"_id": 1, "_sort": 1}])
+            monkeypatch.setattr(store, "_get_collection", lambda: collection)
+            scans = await store.find_scans(7, min_processing_time=2000)
+            assert scans == [{"_id": "1", "_sort": 1}]
+
+            query, projection = collection.finds[0]
+            assert query == {
+                "user_id": 7,
+                "ocr_results.cached": {"$ne": True},
+                "ocr_results.processing_time": {"$gte": 2000}
+            }
+            assert projection == {"ocr_results.words": 0, "ocr_results.extracted_text": 0}
+
+        asyncio.run(scenario())
+
+    def test_without_mongo_raises(self, monkeypatch):
+        """Test that the route can report an unavailable scan history"""
+        store = OCRScanStore()
+        monkeypatch.setattr(store, "_get_collection", lambda: None)
+        with pytest.raises(Exception, match="MongoDB is not connected"):
+            asyncio.run(store.find_scans(7, max_confidence=50))
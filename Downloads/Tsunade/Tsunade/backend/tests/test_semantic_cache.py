@@ -0,0 +1,95 @@
+import os
+import sys
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.semantic_cache import SemanticCache, guard_signature
+
+QUESTION = "What are the side effects of taking 500mg metformin twice a day?"
+
+def cache_with(question=QUESTION, answer="Nausea and stomach upset.", scope="", **kwargs):
+    cache = SemanticCache(max_entries=8, threshold=0.5, enabled=True, **kwargs)
+    cache.add(question, answer, scope=scope)
+    cache.add("How should I store insulin pens?", "In the fridge until opened.", scope=scope)
+    return cache
+
+@pytest.mark.unit
+class TestSemanticCacheLookup:
+    """Test near-duplicate matching of chat questions"""
+
+    def test_reworded_question_hits(self):
+        """Test that a reworded question with the same meaning is answered from the cache"""
+        cache = cache_with()
+        hit = cache.lookup("What side effects does taking 500mg metformin twice a day have?")
+        assert hit is not None
+        assert hit["answer"] == "Nausea and stomach upset."
+        assert cache.stats()["hits"] == 1
+
+    def test_unrelated_question_misses(self):
+        """Test that an unrelated question is not answered from the cache"""
+        cache = cache_with()
+        assert cache.lookup("Can I drink alcohol with amoxicillin?") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_disabled_cache_never_hits(self):
+        """Test that a disabled cache neither stores nor answers"""
+        cache = SemanticCache(enabled=False)
+        cache.add(QUESTION, "answer")
+        assert cache.lookup(QUESTION) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that a full cache evicts the least recently used question"""
+        cache = SemanticCache(max_entries=2, threshold=0.9, enabled=True)
+        cache.add("How should I store insulin pens?", "fridge")
+        cache.add("Can I crush my aspirin tablets?", "yes")
+        assert cache.lookup("How should I store insulin pens?")["answer"] == "fridge"
+        cache.add("Is paracetamol safe in pregnancy?", "usually")
+        assert cache.lookup("Can I crush my aspirin tablets?") is None
+        assert cache.lookup("How should I store insulin pens?")["answer"] == "fridge"
+
+@pytest.mark.unit
+class TestSemanticCacheGuards:
+    """Test that similar questions with a different meaning are rejected"""
+
+    @pytest.mark.parametrize("question", [
+        "What are the side effects of taking 1000mg metformin twice a day?",
+        "What are the side effects of taking 500mg metformin 3 times a day?"
+    ])
+    def test_different_numbers_are_rejected(self, question):
+        """Test that a different dose or count is not answered with the cached answer"""
+        cache = cache_with()
+        assert cache.lookup(question) is None
+        assert cache.stats()["guard_rejections"] >= 1
+
+    def test_negation_is_rejected(self):
+        """Test that a negated question does not share the answer of the plain one"""
+        cache = cache_with("Should I take ibuprofen with food?", "Yes, with food or milk.")
+        assert cache.lookup("Should I not take ibuprofen with food?") is None
+        assert cache.stats()["guard_rejections"] == 1
+
+    def test_contraction_negation_is_rejected(self):
+        """Test that negated contractions count as negation"""
+        cache = cache_with("Can I take ibuprofen with food?", "Yes, with food or milk.")
+        assert cache.lookup("Can't I take ibuprofen with food?") is None
+        assert cache.stats()["guard_rejections"] == 1
+
+    def test_other_scope_is_not_matched(self):
+        """Test that an answer stored for one medicine context is not used for another"""
+        cache = cache_with(scope="Metformin")
+        assert cache.lookup(QUESTION, scope="Warfarin") is None
+        assert cache.lookup(QUESTION, scope=" metformin ") is not None
+
+    def test_guarded_entry_does_not_hide_matching_one(self):
+        """Test that a rejected best match falls through to a valid lower match"""
+        cache = cache_with()
+        cache.add("What are the side effects of taking 1000mg metformin twice a day?", "Stronger stomach upset.")
+        hit = cache.lookup("What are the side effects of 1000mg metformin taken twice a day?")
+        assert hit["answer"] == "Stronger stomach upset."
+
+    def test_guard_signature(self):
+        """Test that the signature holds the numbers and the negation"""
+        assert guard_signature("Don't take 2 tablets of 500mg") == (frozenset({"2", "500mg"}), True)
+        assert guard_signature("Take two tablets") == (frozenset(), False)
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import asyncio
+import pytest
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.singleflight import SingleFlight
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.unit
+class TestLocalCoalescing:
+    """Test coalescing of concurrent calls within one process"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers with the same key get the result of a single call"""
+        async def scenario():
+            flight = SingleFlight("test")
+            gate = asyncio.Event()
+            runs = []
+
+            async def call():
+                runs.append(1)
+                await gate.wait()
+                return {"answer": 42}
+
+            callers = [asyncio.create_task(flight.do("key", call)) for _ in range(5)]
+            await settle()
+            gate.set()
+            results = await asyncio.gather(*callers)
+            assert len(runs) == 1
+            assert all(result is results[0] for result in results)
+            stats = flight.stats()
+            assert (stats["calls"], stats["executions"], stats["shared_in_process"], stats["in_flight"]) == (5, 1, 4, 0)
+
+        asyncio.run(scenario())
+
+    def test_different_keys_run_separately(self):
+        """Test that calls with different keys are not coalesced"""
+        async def scenario():
+            flight = SingleFlight("test")
+
+            async def call(value):
+                await asyncio.sleep(0)
+                return value
+
+            results = await asyncio.gather(flight.do("a", lambda: call("a")), flight.do("b", lambda: call("b")))
+            assert results == ["a", "b"]
+            assert flight.stats()["executions"] == 2
+
+        asyncio.run(scenario())
+
+    def test_exception_is_shared_and_not_cached(self):
+        """Test that a failure reaches every waiting caller and the next call runs again"""
+        async def scenario():
+            flight = SingleFlight("test")
+            gate = asyncio.Event()
+
+            async def failing():
+                await gate.wait()
+                raise ValueError("upstream error")
+
+            callers = [asyncio.create_task(flight.do("key", failing)) for _ in range(3)]
+            await settle()
+            gate.set()
+            results = await asyncio.gather(*callers, return_exceptions=True)
+            assert all(isinstance(result, ValueError) for result in results)
+
+            async def succeeding():
+                return "ok"
+
+            assert await flight.do("key", succeeding) == "ok"
+            assert flight.stats()["executions"] == 2
+
+        asyncio.run(scenario())
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that one caller going away leaves the shared call running"""
+        async def scenario():
+            flight = SingleFlight("test")
+            gate = asyncio.Event()
+
+            async def call():
+                await gate.wait()
+                return "done"
+
+            first = asyncio.create_task(flight.do("key", call))
+            second = asyncio.create_task(flight.do("key", call))
+            await settle()
+            first.cancel()
+            await settle()
+            gate.set()
+            assert await second == "done"
+            assert first.cancelled()
+
+        asyncio.run(scenario())
+
+@pytest.mark.unit
+class TestRedisCoalescing:
+    """Test coalescing across workers through Redis"""
+
+    def test_workers_share_published_result(self, fake_redis, with_redis):
+        """Test that a second worker waits for the lock holder's result instead of calling"""
+        async def scenario():
+            workers = [with_redis(SingleFlight("test", poll_interval=0.01), fake_redis) for _ in range(2)]
+            gate = asyncio.Event()
+            runs = []
+
+            async def call():
+                runs.append(1)
+                await gate.wait()
+                return {"answer": 42}
+
+            first = asyncio.create_task(workers[0].do("key", call, dumps=json.dumps, loads=json.loads))
+            await settle()
+            second = asyncio.create_task(workers[1].do("key", call, dumps=json.dumps, loads=json.loads))
+            await asyncio.sleep(0.05)
+            gate.set()
+            assert await asyncio.gather(first, second) == [{"answer": 42}, {"answer": 42}]
+            assert len(runs) == 1
+            assert workers[1].stats()["shared_across_workers"] == 1
+            assert not await fake_redis.exists("test:lock:key")
+
+        asyncio.run(scenario())
+
+    def test_failed_holder_lets_waiter_run(self, fake_redis, with_redis):
+        """Test that a waiter runs the call itself when the lock holder fails"""
+        async def scenario():
+            workers = [with_redis(SingleFlight("test", poll_interval=0.01), fake_redis) for _ in range(2)]
+            gate = asyncio.Event()
+
+            async def failing():
+                await gate.wait()
+                raise ValueError("upstream error")
+
+            async def succeeding():
+                return "ok"
+
+            first = asyncio.create_task(workers[0].do("key", failing, dumps=json.dumps, loads=json.loads))
+            await settle()
+            second = asyncio.create_task(workers[1].do("key", succeeding, dumps=json.dumps, loads=json.loads))
+            await asyncio.sleep(0.05)
+            gate.set()
+            with pytest.raises(ValueError):
+                await first
+            assert await second == "ok"
+            assert workers[1].stats()["executions"] == 1
+
+        asyncio.run(scenario())
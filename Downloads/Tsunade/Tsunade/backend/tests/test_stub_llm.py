@@ -0,0 +1,91 @@
+import os
+import sys
+import asyncio
+import httpx
+import openai
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MEDICINE_CACHE_REDIS", "false")
+os.environ.setdefault("EXERCISE_CACHE_REDIS", "false")
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm import create_app, parse_latency, canned_answer
+from utils.gpt import GPTProcessor, GPT_METHOD_HEADER
+
+def processor_on_stub(stub):
+    processor = GPTProcessor()
+    client = openai.AsyncOpenAI(
+        api_key="stub",
+        base_url="http://stub/v1",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=stub))
+    )
+    processor.clients = {base_url: client for base_url in processor.clients}
+    processor.client = client
+    return processor
+
+async def stub_stats(stub):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub), base_url="http://stub") as client:
+        return (await client.get("/stats")).json()
+
+@pytest.mark.unit
+class TestStubRouting:
+    """Test that the stub server answers each GPTProcessor method by its marker header"""
+
+    def test_methods_are_routed_by_header(self):
+        """Test that extraction methods get their own canned answers"""
+        async def scenario():
+            stub = create_app(parse_latency("fixed:0"), tokens_per_second=1000)
+            processor = processor_on_stub(stub)
+            text = "Tab Metformin 500mg BD\nTab Amlodipine 5mg OD"
+            assert await processor.extract_medicines(text) == ["Metformin", "Amlodipine"]
+            assert await processor.extract_diseases(text) == ["Diabetes Type 2", "Hypertension"]
+            stats = await stub_stats(stub)
+            assert stats == {"extract_medicines": 1, "extract_diseases": 1}
+
+        asyncio.run(scenario())
+
+    def test_routing_ignores_prompt_wording(self):
+        """Test that a reworded system prompt does not change the answer kind"""
+        body = {"messages": [
+            {"role": "system", "content": "You extract medicine names."},
+            {"role": "user", "content": "Cap Omeprazole 20mg OD"}
+        ]}
+        kind, message = canned_answer(body, "extract_medicines")
+        assert kind == "extract_medicines"
+        assert message["content"] == '["Omeprazole"]'
+        assert canned_answer(body)[0] == "chat"
+
+    def test_unmarked_function_call_is_analysis(self):
+        """Test that a request without the header but with functions gets a function call"""
+        body = {
+            "messages": [{"role": "user", "content": "Tab Metformin 500mg"}],
+            "functions": [{"name": "record_prescription_analysis", "parameters": {}}],
+            "function_call": {"name": "record_prescription_analysis"}
+        }
+        kind, message = canned_answer(body)
+        assert kind == "analyze_prescription"
+        assert message["function_call"]["name"] == "record_prescription_analysis"
+
+    def test_header_is_sent(self):
+        """Test that create_completion names its method in the request headers"""
+        async def scenario():
+            seen = []
+            stub = create_app(parse_latency("fixed:0"), tokens_per_second=1000)
+
+            @stub.middleware("http")
+            async def record(request, call_next):
+                seen.append(request.headers.get(GPT_METHOD_HEADER))
+                return await call_next(request)
+
+            processor = processor_on_stub(stub)
+            await processor.create_completion(
+                method="summarize_chat",
+                messages=[{"role": "user", "content": "Summarize"}],
+                max_tokens=50
+            )
+            assert seen == ["summarize_chat"]
+
+        asyncio.run(scenario())
@@ -0,0 +1,160 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Seconds to wait before retrying Redis after a connection failure
+REDIS_RETRY_INTERVAL = 30
+
+class TwoTierCache:
+    """
+    In-process LRU cache backed by an optional shared Redis tier.
+
+    Values must be JSON serializable. Lookups check the local LRU first,
+    then Redis; Redis hits are promoted into the LRU. If Redis is not
+    reachable the cache keeps working with the local tier only.
+    """
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 256,
+        ttl: int = 86400,
+        max_bytes: Optional[int] = None,
+        use_redis: bool = True
+    ):
+        self.namespace = namespace
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.use_redis = use_redis
+
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._expires: Dict[str, float] = {}
+        self._total_bytes = 0
+        self._redis_retry_at = 0.0
+
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def _get_redis(self):
+        if not self.use_redis or time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            from database.config import get_redis
+            return await get_redis()
+        except Exception as e:
+            print(f"Cache '{self.namespace}': Redis unavailable, using local tier only ({e})")
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+            return None
+
+    def _evict(self, key: str):
+        self._entries.pop(key, None)
+        self._expires.pop(key, None)
+        self._total_bytes -= self._sizes.pop(key, 0)
+
+    def _store_local(self, key: str, value: Any, size: int):
+        if self.max_entries == 0:
+            return
+        if key in self._entries:
+            self._evict(key)
+
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._expires[key] = time.monotonic() + self.ttl
+        self._total_bytes += size
+
+        # Evict least recently used entries until within limits
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._total_bytes > self.max_bytes and len(self._entries) > 1
+        ):
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def get_local(self, key: str) -> Optional[Any]:
+        """
+        Look up a key in the in-process tier only
+        """
+        if key not in self._entries:
+            return None
+        if self._expires[key] < time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a key, checking the local tier and then Redis
+
+        Args:
+            key: Cache key (without namespace)
+
+        Returns:
+            Cached value or None on a miss
+        """
+        value = self.get_local(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                raw = await client.get(self._redis_key(key))
+                if raw is not None:
+                    value = json.loads(raw)
+                    self._store_local(key, value, len(raw))
+                    self.redis_hits += 1
+                    return value
+            except Exception as e:
+                print(f"Cache '{self.namespace}' Redis read failed: {e}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        """
+        Store a value in both tiers
+
+        Args:
+            key: Cache key (without namespace)
+            value: JSON serializable value
+        """
+        raw = json.dumps(value)
+        self._store_local(key, value, len(raw))
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                await client.set(self._redis_key(key), raw, ex=self.ttl)
+            except Exception as e:
+                print(f"Cache '{self.namespace}' Redis write failed: {e}")
+
+    def clear_local(self):
+        """
+        Drop every entry from the in-process tier
+        """
+        self._entries.clear()
+        self._sizes.clear()
+        self._expires.clear()
+        self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters and current size
+        """
+        hits = self.memory_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0
+        }
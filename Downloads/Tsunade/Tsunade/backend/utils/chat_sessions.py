@@ -0,0 +1,290 @@
+import os
+import uuid
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# Chat session configuration
+CHAT_SESSION_TOKEN_BUDGET = int(os.getenv("CHAT_SESSION_TOKEN_BUDGET", "1500"))
+CHAT_SESSION_SUMMARY_TOKENS = int(os.getenv("CHAT_SESSION_SUMMARY_TOKENS", "300"))
+CHAT_SESSION_TTL_DAYS = int(os.getenv("CHAT_SESSION_TTL_DAYS", "30"))
+CHAT_SESSION_LOCAL_MAX = int(os.getenv("CHAT_SESSION_LOCAL_MAX", "1000"))
+CHAT_SESSION_MAX_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "100"))
+
+class ChatSessionNotFoundError(Exception):
+    """Raised when a chat session does not exist or has been closed"""
+    pass
+
+def count_tokens(text: str) -> int:
+    """
+    Rough token count of a chat message: characters / 4 plus per-message overhead
+    """
+    return len(text or "") // 4 + 4
+
+class ChatSessionStore:
+    """
+    Server-side chat history in the `chat_sessions` Mongo collection,
+    in the ChatSession document shape.
+
+    Only a bounded part of a session is sent to GPT: the summary of
+    compacted turns plus the newest turns that fit CHAT_SESSION_TOKEN_BUDGET.
+    Once the turns not yet summarized exceed the budget, the older ones are
+    folded into the summary in the background, keeping about half the budget
+    verbatim. `context.summarized_messages` counts the leading messages the
+    summary covers; once a session stores more than max_messages, the oldest
+    summarized ones are dropped from the document.
+
+    A new session is only stored with its first turn, so a request whose
+    GPT call fails leaves nothing behind.
+
+    Without MongoDB, sessions live in a bounded in-process LRU instead.
+    """
+    collection_name = "chat_sessions"
+
+    def __init__(
+        self,
+        token_budget: int = CHAT_SESSION_TOKEN_BUDGET,
+        ttl_days: int = CHAT_SESSION_TTL_DAYS,
+        local_max: int = CHAT_SESSION_LOCAL_MAX,
+        max_messages: int = CHAT_SESSION_MAX_MESSAGES
+    ):
+        self.token_budget = token_budget
+        self.ttl_days = ttl_days
+        self.local_max = local_max
+        self.max_messages = max_messages
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._compacting: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._indexed = False
+
+        self.compactions = 0
+
+    def _get_collection(self):
+        try:
+            from database import config
+        except Exception:
+            return None
+        if config.mongo_db is None:
+            return None
+        return config.mongo_db[self.collection_name]
+
+    async def _ensure_indexes(self, collection):
+        if self._indexed:
+            return
+        self._indexed = True
+        try:
+            await collection.create_index("session_id", unique=True)
+            await collection.create_index("updated_at", expireAfterSeconds=self.ttl_days * 86400)
+        except Exception as e:
+            print(f"Could not create chat session indexes: {e}")
+
+    def _remember_local(self, session: Dict[str, Any]):
+        self._local[session["session_id"]] = session
+        self._local.move_to_end(session["session_id"])
+        while len(self._local) > self.local_max:
+            self._local.popitem(last=False)
+
+    async def open(self, session_id: Optional[str] = None, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Load an active session of `user_id`, or start a new one for them when
+        no id is given. A new session is not stored until its first turn is
+        appended.
+
+        Raises:
+            ChatSessionNotFoundError: The session does not exist, is closed
+                or belongs to another user
+        """
+        if not session_id:
+            now = datetime.utcnow()
+            session = {
+                "user_id": user_id,
+                "session_id": uuid.uuid4().hex,
+                "messages": [],
+                "context": {
+                    "current_medicines": [],
+                    "current_conditions": [],
+                    "user_profile_summary": {},
+                    "client_context": "",
+                    "conversation_summary": "",
+                    "summarized_messages": 0
+                },
+                "created_at": now,
+                "updated_at": now,
+                "is_active": True,
+                "_new": True
+            }
+            return session
+
+        collection = self._get_collection()
+        if collection is not None:
+            session = await collection.find_one({"session_id": session_id})
+        else:
+            session = self._local.get(session_id)
+            if session is not None:
+                self._local.move_to_end(session_id)
+        # Another user's session is reported like a missing one
+        if session is None or not session.get("is_active", True) or session.get("user_id") != user_id:
+            raise ChatSessionNotFoundError(f"Chat session {session_id} not found")
+        return session
+
+    def history_messages(self, session: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Bounded conversation history for the next GPT call: the summary of
+        compacted turns and the newest turns within the token budget
+        """
+        context = session.get("context", {})
+        recent = session["messages"][context.get("summarized_messages", 0):]
+
+        history = []
+        used = 0
+        for message in reversed(recent):
+            used += count_tokens(message["content"])
+            if used > self.token_budget:
+                break
+            history.append({"role": message["role"], "content": message["content"]})
+        history.reverse()
+
+        if context.get("conversation_summary"):
+            history.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {context['conversation_summary']}"
+            })
+        return history
+
+    async def append_turn(self, session: Dict[str, Any], user_message: str, assistant_message: str, client_context: str = ""):
+        """
+        Record a question and its answer
+        """
+        now = datetime.utcnow()
+        turn = [
+            {"role": "user", "content": user_message, "timestamp": now, "message_id": uuid.uuid4().hex},
+            {"role": "assistant", "content": assistant_message, "timestamp": now, "message_id": uuid.uuid4().hex}
+        ]
+        session["messages"].extend(turn)
+        session["context"]["client_context"] = client_context
+        session["updated_at"] = now
+        new = session.pop("_new", False)
+
+        collection = self._get_collection()
+        if collection is None:
+            self._remember_local(session)
+            return
+        if new:
+            await self._ensure_indexes(collection)
+            await collection.insert_one(dict(session))
+            return
+        await collection.update_one(
+            {"session_id": session["session_id"]},
+            {
+                "$push": {"messages": {"$each": turn}},
+                "$set": {"context.client_context": client_context, "updated_at": now}
+            }
+        )
+
+    def needs_compaction(self, session: Dict[str, Any]) -> bool:
+        recent = session["messages"][session["context"].get("summarized_messages", 0):]
+        return sum(count_tokens(message["content"]) for message in recent) > self.token_budget
+
+    def schedule_compaction(self, session: Dict[str, Any], summarize: Callable[[str, List[Dict[str, str]]], Awaitable[str]]):
+        """
+        Fold older turns into the summary in the background if the session
+        is over its token budget
+
+        Args:
+            session: Session document
+            summarize: Coroutine function (previous summary, messages) -> new summary
+        """
+        session_id = session["session_id"]
+        if session_id in self._compacting or not self.needs_compaction(session):
+            return
+        self._compacting.add(session_id)
+        task = asyncio.create_task(self._compact(session, summarize))
+        # Keep a reference so the task is not garbage collected mid-summary
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, session: Dict[str, Any], summarize):
+        # _compacting only guards this process: the Mongo write below is
+        # conditional on the summary state read here, so a concurrent
+        # compaction in another worker is not applied twice
+        session_id = session["session_id"]
+        try:
+            context = session["context"]
+            start = context.get("summarized_messages", 0)
+            messages = session["messages"]
+
+            # Keep the newest turns within half the budget verbatim
+            keep_from = len(messages)
+            used = 0
+            while keep_from > start:
+                used += count_tokens(messages[keep_from - 1]["content"])
+                if used > self.token_budget // 2:
+                    break
+                keep_from -= 1
+            if keep_from <= start:
+                return
+
+            summary = await summarize(
+                context.get("conversation_summary", ""),
+                [{"role": message["role"], "content": message["content"]} for message in messages[start:keep_from]]
+            )
+            # Drop the oldest summarized messages beyond max_messages; turns
+            # appended meanwhile are at the end, so the prefix is unchanged
+            drop = min(keep_from, max(0, len(messages) - self.max_messages))
+
+            collection = self._get_collection()
+            if collection is not None:
+                result = await collection.update_one(
+                    {"session_id": session_id, "context.summarized_messages": start},
+                    [{"$set": {
+                        "messages": {"$slice": ["$messages", drop, {"$max": [1, {"$size": "$messages"}]}]},
+                        "context.conversation_summary": summary,
+                        "context.summarized_messages": keep_from - drop
+                    }}]
+                )
+                if result.matched_count == 0:
+                    print(f"Chat session {session_id} was compacted elsewhere; discarding this summary")
+                    return
+
+            del messages[:drop]
+            context["conversation_summary"] = summary
+            context["summarized_messages"] = keep_from - drop
+            self.compactions += 1
+        except Exception as e:
+            print(f"Chat session {session_id} compaction failed: {e}")
+        finally:
+            self._compacting.discard(session_id)
+
+    async def close(self, session_id: str, user_id: Optional[int]):
+        """
+        Mark a session of `user_id` inactive
+
+        Raises:
+            ChatSessionNotFoundError: The session does not exist or belongs
+                to another user
+        """
+        collection = self._get_collection()
+        if collection is None:
+            session = self._local.get(session_id)
+            if session is None or session.get("user_id") != user_id:
+                raise ChatSessionNotFoundError(f"Chat session {session_id} not found")
+            session["is_active"] = False
+            return
+        result = await collection.update_one(
+            {"session_id": session_id, "user_id": user_id},
+            {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            raise ChatSessionNotFoundError(f"Chat session {session_id} not found")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local_sessions": len(self._local),
+            "compactions": self.compactions,
+            "compacting": len(self._compacting),
+            "token_budget": self.token_budget
+        }
+
+# Global chat session store
+chat_session_store = ChatSessionStore()
@@ -0,0 +1,105 @@
+import io
+import os
+from typing import Optional, Union
+from PIL import Image
+
+# Multi-page document configuration
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "300"))
+OCR_MAX_DOCUMENT_PAGES = int(os.getenv("OCR_MAX_DOCUMENT_PAGES", "50"))
+
+PDF_CONTENT_TYPES = {"application/pdf", "application/x-pdf"}
+TIFF_CONTENT_TYPES = {"image/tiff", "image/tif", "image/x-tiff"}
+
+class UnsupportedDocumentError(Exception):
+    """Raised when a document cannot be rasterized in this deployment"""
+    pass
+
+def detect_document_kind(header: bytes, content_type: Optional[str] = None) -> str:
+    """
+    Classify an upload by its leading bytes, falling back to the content type
+
+    Args:
+        header: First bytes of the file
+        content_type: Content type sent by the client
+
+    Returns:
+        "pdf", "tiff" or "image"
+    """
+    if header.startswith(b"%PDF"):
+        return "pdf"
+    if header[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if content_type in PDF_CONTENT_TYPES:
+        return "pdf"
+    if content_type in TIFF_CONTENT_TYPES:
+        return "tiff"
+    return "image"
+
+def is_supported_content_type(content_type: Optional[str]) -> bool:
+    """
+    Whether an upload with this content type can be OCRed
+    """
+    if content_type is None:
+        return True
+    return content_type.startswith('image/') or content_type in PDF_CONTENT_TYPES
+
+def _open_pdf(source: Union[bytes, str]):
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        try:
+            import fitz
+        except ImportError:
+            raise UnsupportedDocumentError("PDF support requires PyMuPDF (pip install pymupdf)")
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def _open_image(source: Union[bytes, str]) -> Image.Image:
+    if isinstance(source, str):
+        return Image.open(source)
+    return Image.open(io.BytesIO(source))
+
+def count_pages(source: Union[bytes, str], kind: str) -> int:
+    """
+    Number of pages in a document without rasterizing any of them
+
+    Args:
+        source: Path of a spooled file, or the document bytes
+        kind: "pdf", "tiff" or "image"
+    """
+    if kind == "pdf":
+        with _open_pdf(source) as document:
+            return document.page_count
+    with _open_image(source) as image:
+        return getattr(image, "n_frames", 1)
+
+def render_page(source: Union[bytes, str], kind: str, index: int, dpi: int = OCR_PDF_DPI) -> Image.Image:
+    """
+    Rasterize a single page of a document
+
+    Only the requested page is decoded, so memory use does not grow with
+    the page count.
+
+    Args:
+        source: Path of a spooled file, or the document bytes
+        kind: "pdf", "tiff" or "image"
+        index: Zero-based page number
+        dpi: Rendering resolution for PDF pages
+
+    Returns:
+        RGB image of the page
+    """
+    if kind == "pdf":
+        with _open_pdf(source) as document:
+            pixmap = document.load_page(index).get_pixmap(dpi=dpi, alpha=False)
+            page = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+            page.info["dpi"] = (dpi, dpi)
+            return page
+
+    with _open_image(source) as image:
+        image.seek(index)
+        page = image.convert("RGB")
+        if "dpi" in image.info:
+            page.info["dpi"] = image.info["dpi"]
+        return page
@@ -0,0 +1,289 @@
+import os
+import csv
+import json
+import sqlite3
+import zipfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Local drug index (built by build_drug_index.py) and whether the remote FDA /
+# RxNav APIs are still asked about names the index does not contain
+DRUG_INDEX_PATH = os.getenv("DRUG_INDEX_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "drug_index.sqlite"
+)
+DRUG_INDEX_REMOTE_FALLBACK = os.getenv("DRUG_INDEX_REMOTE_FALLBACK", "true").lower() == "true"
+
+# RxNorm term types kept: ingredients, precise/multiple ingredients, brand names
+RXNORM_TERM_TYPES = {"IN", "PIN", "MIN", "BN"}
+# Characters of a label's drug interaction section kept in the index
+MAX_INTERACTIONS_CHARS = 4000
+
+SCHEMA = """
+CREATE TABLE drug_names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    generic_name TEXT,
+    rxcui TEXT,
+    set_id TEXT
+);
+CREATE TABLE labels (
+    set_id TEXT PRIMARY KEY,
+    generic_name TEXT,
+    brand_names TEXT,
+    drug_interactions TEXT
+);
+CREATE VIRTUAL TABLE drug_names_fts USING fts5(
+    name, content='drug_names', content_rowid='id', prefix='3'
+);
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def normalize_drug_name(name: str) -> str:
+    """
+    Lookup form of a drug name: lower case, single spaces
+    """
+    return " ".join(str(name).lower().split())
+
+def _iter_fda_labels(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Labels from an openFDA drug-label bulk file (.json or .json.zip)
+    """
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith(".json"):
+                    with archive.open(member) as f:
+                        yield from json.load(f).get("results", [])
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f).get("results", [])
+
+def _find_rrf(directory: str, filename: str) -> Optional[str]:
+    for candidate in (os.path.join(directory, filename), os.path.join(directory, "rrf", filename)):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def _iter_rrf(path: str) -> Iterator[List[str]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="|", quoting=csv.QUOTE_NONE):
+            yield row
+
+def build_index(output_path: str, fda_files: Iterable[str] = (), rxnorm_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Build the SQLite drug index from openFDA drug-label bulk files and an
+    RxNorm full release (RXNCONSO.RRF, and RXNREL.RRF for brand -> ingredient)
+
+    Args:
+        output_path: Index file to write (replaced if it exists)
+        fda_files: openFDA drug-label-*.json(.zip) files
+        rxnorm_dir: Directory of the RxNorm release (or its rrf/ folder)
+
+    Returns:
+        Counts of labels and names imported
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = output_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    connection.executescript(SCHEMA)
+    seen = set()
+    counts = {"labels": 0, "fda_names": 0, "rxnorm_names": 0}
+
+    def add_name(name, kind, source, generic_name=None, rxcui=None, set_id=None):
+        normalized = normalize_drug_name(name)
+        if not normalized or (normalized, kind, source) in seen:
+            return False
+        seen.add((normalized, kind, source))
+        connection.execute(
+            "INSERT INTO drug_names (name, normalized, kind, source, generic_name, rxcui, set_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name.strip(), normalized, kind, source, generic_name, rxcui, set_id)
+        )
+        return True
+
+    for path in fda_files:
+        print(f"Importing openFDA labels from {path}")
+        for label in _iter_fda_labels(path):
+            openfda = label.get("openfda") or {}
+            generic_names = openfda.get("generic_name") or []
+            brand_names = openfda.get("brand_name") or []
+            if not generic_names and not brand_names:
+                continue
+            set_id = label.get("set_id") or label.get("id")
+            generic_name = generic_names[0] if generic_names else None
+            rxcui = (openfda.get("rxcui") or [None])[0]
+            interactions = " ".join(label.get("drug_interactions") or [])[:MAX_INTERACTIONS_CHARS] or None
+
+            connection.execute(
+                "INSERT OR IGNORE INTO labels (set_id, generic_name, brand_names, drug_interactions) VALUES (?, ?, ?, ?)",
+                (set_id, generic_name, json.dumps(brand_names), interactions)
+            )
+            counts["labels"] += 1
+            for name in generic_names:
+                counts["fda_names"] += add_name(name, "generic", "FDA", generic_name, rxcui, set_id)
+            for name in brand_names:
+                counts["fda_names"] += add_name(name, "brand", "FDA", generic_name, rxcui, set_id)
+
+    if rxnorm_dir:
+        conso_path = _find_rrf(rxnorm_dir, "RXNCONSO.RRF")
+        if conso_path is None:
+            raise Exception(f"RXNCONSO.RRF not found in {rxnorm_dir}")
+        print(f"Importing RxNorm names from {conso_path}")
+
+        # RXCUI -> (term type, preferred string) of the concepts kept
+        concepts: Dict[str, tuple] = {}
+        for row in _iter_rrf(conso_path):
+            # RXCUI|LAT|TS|LUI|STT|SUI|ISPREF|RXAUI|SAUI|SCUI|SDUI|SAB|TTY|CODE|STR|SRL|SUPPRESS|CVF|
+            if len(row) < 17 or row[11] != "RXNORM" or row[1] != "ENG" or row[16] == "O":
+                continue
+            if row[12] in RXNORM_TERM_TYPES:
+                concepts.setdefault(row[0], (row[12], row[14]))
+
+        # Brand name -> ingredient, from the tradename relationships
+        ingredient_of: Dict[str, str] = {}
+        rel_path = _find_rrf(rxnorm_dir, "RXNREL.RRF")
+        if rel_path is not None:
+            for row in _iter_rrf(rel_path):
+                # RXCUI1|RXAUI1|STYPE1|REL|RXCUI2|RXAUI2|STYPE2|RELA|...
+                if len(row) < 8 or row[7] not in ("tradename_of", "has_tradename"):
+                    continue
+                first, second = concepts.get(row[0]), concepts.get(row[4])
+                if not first or not second:
+                    continue
+                if first[0] == "BN" and second[0] == "IN":
+                    ingredient_of.setdefault(row[0], second[1])
+                elif second[0] == "BN" and first[0] == "IN":
+                    ingredient_of.setdefault(row[4], first[1])
+
+        for rxcui, (term_type, name) in concepts.items():
+            kind = "brand" if term_type == "BN" else "generic"
+            generic_name = ingredient_of.get(rxcui) if term_type == "BN" else name
+            counts["rxnorm_names"] += add_name(name, kind, "RxNorm", generic_name, rxcui)
+
+    connection.execute("CREATE INDEX idx_drug_names_normalized ON drug_names (normalized)")
+    connection.execute("INSERT INTO drug_names_fts (drug_names_fts) VALUES ('rebuild')")
+    connection.executemany(
+        "INSERT INTO metadata (key, value) VALUES (?, ?)",
+        [(key, str(value)) for key, value in counts.items()]
+    )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+    os.replace(temp_path, output_path)
+    return counts
+
+class DrugIndex:
+    """
+    Read-only lookups in the local drug index.
+
+    Exact name lookups use an index on the normalized name; `search` uses
+    FTS5 prefix matching. If the index file does not exist, `available`
+    is False and every lookup returns nothing, so callers fall back to the
+    remote APIs.
+    """
+    def __init__(self, path: str = DRUG_INDEX_PATH):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+        self._opened = False
+
+        self.lookups = 0
+        self.hits = 0
+
+    def _connect(self):
+        if not self._opened:
+            self._opened = True
+            if os.path.exists(self.path):
+                try:
+                    self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                    self._connection.row_factory = sqlite3.Row
+                except Exception as e:
+                    print(f"Drug index unavailable ({e}), using remote APIs")
+        return self._connection
+
+    @property
+    def available(self) -> bool:
+        return self._connect() is not None
+
+    def _query(self, sql: str, params: tuple) -> List[sqlite3.Row]:
+        connection = self._connect()
+        if connection is None:
+            return []
+        with self._lock:
+            return connection.execute(sql, params).fetchall()
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Index entry for an exact (normalized) generic or brand name
+
+        Returns:
+            Dictionary with name, generic_name, brand_names, rxcui and
+            sources ("FDA" and/or "RxNorm"), or None if not indexed
+        """
+        self.lookups += 1
+        rows = self._query(
+            "SELECT name, kind, source, generic_name, rxcui, set_id FROM drug_names WHERE normalized = ?",
+            (normalize_drug_name(name),)
+        )
+        if not rows:
+            return None
+        self.hits += 1
+
+        brand_names: List[str] = []
+        set_id = next((row["set_id"] for row in rows if row["set_id"]), None)
+        if set_id:
+            label = self._query("SELECT brand_names FROM labels WHERE set_id = ?", (set_id,))
+            if label and label[0]["brand_names"]:
+                brand_names = json.loads(label[0]["brand_names"])
+        return {
+            "name": rows[0]["name"],
+            "generic_name": next((row["generic_name"] for row in rows if row["generic_name"]), None),
+            "brand_names": brand_names,
+            "rxcui": next((row["rxcui"] for row in rows if row["rxcui"]), None),
+            "sources": sorted({row["source"] for row in rows})
+        }
+
+    def search(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Indexed names starting with the words of `text`
+        """
+        words = [word for word in normalize_drug_name(text).replace('"', " ").split() if word]
+        if not words:
+            return []
+        query = " ".join(f'"{word}"*' for word in words)
+        rows = self._query(
+            "SELECT d.name, d.kind, d.source, d.generic_name FROM drug_names_fts f "
+            "JOIN drug_names d ON d.id = f.rowid WHERE drug_names_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def interactions(self, name: str) -> Optional[List[str]]:
+        """
+        Drug interaction text from the indexed FDA label, or None if the
+        name has no indexed label
+        """
+        rows = self._query(
+            "SELECT l.drug_interactions FROM drug_names d JOIN labels l ON l.set_id = d.set_id "
+            "WHERE d.normalized = ? AND d.set_id IS NOT NULL LIMIT 1",
+            (normalize_drug_name(name),)
+        )
+        if not rows:
+            return None
+        return [rows[0]["drug_interactions"]] if rows[0]["drug_interactions"] else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "path": self.path,
+            "lookups": self.lookups,
+            "hits": self.hits
+        }
+
+# Global drug index instance
+drug_index = DrugIndex()
@@ -1,7 +1,165 @@
 import os
 from typing import List, Dict, Any
 import openai
+import httpx
 import json
+import re
+import copy
+import asyncio
+import hashlib
+from openai.types.chat import ChatCompletion
+
+from utils.cache import TwoTierCache
+from utils.singleflight import SingleFlight
+from utils.llm_scheduler import LLMScheduler, LLMBusyError, PRIORITY_STANDARD, PRIORITY_BATCH, estimate_tokens, estimate_prompt_tokens
+
+# OpenAI HTTP connection pool configuration
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# Retries of 429/5xx are done by LLMScheduler; these are the client's own on top
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+
+# Model and endpoint of each GPTProcessor method. GPT_MODEL_<METHOD> and
+# OPENAI_BASE_URL_<METHOD> (e.g. GPT_MODEL_MEDICINE_INFO) override the defaults,
+# so a method can use another model or a local stand-in server (benchmarks/stub_llm.py)
+GPT_MODEL = os.getenv("GPT_MODEL", "gpt-4")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+GPT_METHODS = [
+    "chat", "extract_medicines", "extract_diseases", "medicine_info",
+    "exercise_recommendations", "verify_medicines", "analyze_prescription", "summarize_chat"
+]
+GPT_METHOD_MODELS = {method: os.getenv(f"GPT_MODEL_{method.upper()}", GPT_MODEL) for method in GPT_METHODS}
+GPT_METHOD_BASE_URLS = {method: os.getenv(f"OPENAI_BASE_URL_{method.upper()}") or OPENAI_BASE_URL for method in GPT_METHODS}
+# Request header naming the calling method; OpenAI ignores it, the stub server routes on it
+GPT_METHOD_HEADER = "X-GPT-Method"
+
+# Per-medicine information cache configuration
+MEDICINE_CACHE_SIZE = int(os.getenv("MEDICINE_CACHE_SIZE", "1024"))
+MEDICINE_CACHE_MAX_BYTES = int(os.getenv("MEDICINE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+MEDICINE_CACHE_TTL = int(os.getenv("MEDICINE_CACHE_TTL", str(7 * 86400)))
+MEDICINE_CACHE_REDIS = os.getenv("MEDICINE_CACHE_REDIS", "true").lower() == "true"
+
+# Medicine information calls: output token budget per call, initial estimate of
+# output tokens per medicine (refined from responses), retries of a failed chunk
+MEDICINE_INFO_MAX_TOKENS = int(os.getenv("MEDICINE_INFO_MAX_TOKENS", "2000"))
+MEDICINE_INFO_TOKENS_PER_MEDICINE = int(os.getenv("MEDICINE_INFO_TOKENS_PER_MEDICINE", "350"))
+MEDICINE_INFO_CHUNK_RETRIES = int(os.getenv("MEDICINE_INFO_CHUNK_RETRIES", "1"))
+
+# Exercise plan cache, keyed by disease set and profile bucket. EXERCISE_CACHE_PREWARM
+# lists disease combinations to generate at startup: combinations separated by ';',
+# diseases within one by ',' (e.g. "Hypertension;Diabetes Type 2,Hypertension")
+EXERCISE_CACHE_SIZE = int(os.getenv("EXERCISE_CACHE_SIZE", "256"))
+EXERCISE_CACHE_TTL = int(os.getenv("EXERCISE_CACHE_TTL", str(3 * 86400)))
+EXERCISE_CACHE_REDIS = os.getenv("EXERCISE_CACHE_REDIS", "true").lower() == "true"
+EXERCISE_CACHE_PREWARM = os.getenv("EXERCISE_CACHE_PREWARM", "")
+
+# Profile used when none is given, and for pre-warming
+DEFAULT_EXERCISE_PROFILE = {
+    "age": "adult",
+    "fitness_level": "beginner",
+    "preferences": "general wellness"
+}
+
+# Coalescing of identical concurrent completions, optionally across workers through Redis
+GPT_SINGLEFLIGHT = os.getenv("GPT_SINGLEFLIGHT", "true").lower() == "true"
+GPT_SINGLEFLIGHT_REDIS = os.getenv("GPT_SINGLEFLIGHT_REDIS", "false").lower() == "true"
+
+# JSON schema for the combined prescription analysis, enforced through function calling
+PRESCRIPTION_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "medicines": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "original": {"type": "string", "description": "Name as written in the prescription text"},
+                    "corrected": {"type": "string", "description": "Verified generic medicine name"},
+                    "confidence": {"type": "number", "minimum": 0, "maximum": 100},
+                    "method": {
+                        "type": "string",
+                        "enum": ["spelling_correction", "brand_to_generic", "context_inference", "no_change", "invalid_medicine"]
+                    },
+                    "explanation": {"type": "string"},
+                    "is_valid": {"type": "boolean"}
+                },
+                "required": ["original", "corrected", "confidence", "method", "explanation", "is_valid"]
+            }
+        },
+        "diseases": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Diseases, conditions or diagnoses indicated by the prescription"
+        },
+        "confidence": {
+            "type": "number",
+            "minimum": 0,
+            "maximum": 100,
+            "description": "Overall confidence in the analysis"
+        },
+        "summary": {"type": "string", "description": "Summary of the corrections made"}
+    },
+    "required": ["medicines", "diseases", "confidence", "summary"]
+}
+
+def completion_key(request: Dict[str, Any]) -> str:
+    """
+    Identity of a completion request: model, parameters and the messages
+    with whitespace normalized, so re-indented prompts still match
+    """
+    normalized = dict(request)
+    normalized["messages"] = [
+        {**message, "content": " ".join(str(message.get("content") or "").split())}
+        for message in request.get("messages", [])
+    ]
+    encoded = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def _dump_completion(response: ChatCompletion) -> str:
+    if hasattr(response, "model_dump_json"):
+        return response.model_dump_json()
+    return response.json()
+
+def _load_completion(raw: str) -> ChatCompletion:
+    if hasattr(ChatCompletion, "model_validate_json"):
+        return ChatCompletion.model_validate_json(raw)
+    return ChatCompletion.parse_raw(raw)
+
+def normalize_medicine_name(name: str) -> str:
+    """
+    Cache key form of a medicine name: lower case, single spaces
+    """
+    return " ".join(str(name).lower().split())
+
+def _age_band(age: Any) -> str:
+    try:
+        years = int(float(age))
+    except (TypeError, ValueError):
+        return normalize_medicine_name(age or "adult")
+    for upper, band in [(18, "under 18"), (30, "18-29"), (45, "30-44"), (60, "45-59"), (75, "60-74")]:
+        if years < upper:
+            return band
+    return "75+"
+
+def exercise_profile_bucket(user_profile: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Coarse form of a user profile that exercise plans are generated and
+    cached for: age band, fitness level and gender
+    """
+    return {
+        "age": _age_band(user_profile.get("age")),
+        "fitness_level": normalize_medicine_name(user_profile.get("fitness_level") or "beginner"),
+        "gender": normalize_medicine_name(user_profile.get("gender") or "any")
+    }
+
+def exercise_cache_key(diseases: List[str], bucket: Dict[str, str]) -> str:
+    """
+    Cache key of an exercise plan: the profile bucket and the sorted,
+    normalized set of diseases
+    """
+    names = sorted({normalize_medicine_name(disease) for disease in diseases if str(disease).strip()})
+    return f"{bucket['age']}|{bucket['fitness_level']}|{bucket['gender']}|" + ",".join(names)
 
 class GPTProcessor:
     def __init__(self):
@@ -10,14 +168,125 @@ class GPTProcessor:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        # Initialize OpenAI API with error handling
+        # Async client on a shared keep-alive connection pool, so one worker
+        # can keep many completions in flight without blocking the event loop
         try:
-            self.client = openai.OpenAI(api_key=api_key)
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                    keepalive_expiry=30.0
+                ),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=10.0)
+            )
+            # One client per configured endpoint, all on the same pool
+            self.clients = {
+                base_url: openai.AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=self.http_client,
+                    max_retries=OPENAI_MAX_RETRIES
+                )
+                for base_url in {OPENAI_BASE_URL, *GPT_METHOD_BASE_URLS.values()}
+            }
+            self.client = self.clients[OPENAI_BASE_URL]
         except Exception as e:
             print(f"Warning: Failed to initialize OpenAI client: {e}")
+            self.http_client = None
+            self.clients = {}
             self.client = None
+        
+        # Medicine information is cached per medicine, not per request list
+        self.medicine_cache = TwoTierCache(
+            "gpt:medicine",
+            max_entries=MEDICINE_CACHE_SIZE,
+            ttl=MEDICINE_CACHE_TTL,
+            max_bytes=MEDICINE_CACHE_MAX_BYTES,
+            use_redis=MEDICINE_CACHE_REDIS
+        )
+        
+        # Exercise plans are cached per disease set and profile bucket
+        self.exercise_cache = TwoTierCache(
+            "gpt:exercise",
+            max_entries=EXERCISE_CACHE_SIZE,
+            ttl=EXERCISE_CACHE_TTL,
+            use_redis=EXERCISE_CACHE_REDIS
+        )
+        self._prewarm_task = None
+        
+        # Running estimate of output tokens per medicine, sizes the chunks
+        self.medicine_info_tokens = float(MEDICINE_INFO_TOKENS_PER_MEDICINE)
+        
+        # Identical concurrent completions share one upstream request
+        self.singleflight = SingleFlight("gpt:singleflight", use_redis=GPT_SINGLEFLIGHT_REDIS)
+        
+        # Concurrency cap, tokens-per-minute budget, priorities and retries
+        self.scheduler = LLMScheduler()
+    
+    async def create_completion(self, priority: int = PRIORITY_STANDARD, method: str = None, **kwargs):
+        """
+        Await a chat completion on the shared client
+        
+        Concurrent requests with the same model, parameters and (whitespace
+        normalized) messages are coalesced into one upstream call whose
+        response is shared. Streaming requests are never coalesced. Every
+        upstream call is admitted by the scheduler, which queues it by
+        priority and retries rate limits and server errors.
+        
+        Args:
+            priority: Scheduler priority class (PRIORITY_INTERACTIVE,
+                PRIORITY_STANDARD or PRIORITY_BATCH)
+            method: GPT_METHODS entry whose configured model (unless
+                `model` is given) and endpoint are used; also sent as the
+                GPT_METHOD_HEADER request header
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            The ChatCompletion response (shared between coalesced callers,
+            so treat it as read-only), or for `stream=True` a
+            ScheduledStream that holds its scheduler slot until it is read
+            to the end or closed with `aclose()`
+            
+        Raises:
+            LLMBusyError: The scheduler queue is full or OpenAI kept rate limiting
+        """
+        if self.client is None:
+            raise Exception("OpenAI client not initialized")
+        base_url = GPT_METHOD_BASE_URLS.get(method, OPENAI_BASE_URL)
+        client = self.clients[base_url]
+        kwargs.setdefault("model", GPT_METHOD_MODELS.get(method, GPT_MODEL))
+        if method:
+            kwargs["extra_headers"] = {**(kwargs.get("extra_headers") or {}), GPT_METHOD_HEADER: method}
+        
+        def call():
+            return self.scheduler.run(
+                lambda: client.chat.completions.create(**kwargs),
+                priority=priority,
+                estimated_tokens=estimate_tokens(kwargs),
+                stream=bool(kwargs.get("stream")),
+                prompt_tokens=estimate_prompt_tokens(kwargs)
+            )
+        
+        if not GPT_SINGLEFLIGHT or kwargs.get("stream"):
+            return await call()
+        
+        return await self.singleflight.do(
+            completion_key({**kwargs, "base_url": base_url}),
+            call,
+            dumps=_dump_completion,
+            loads=_load_completion
+        )
     
-    def extract_medicines(self, prescription_text: str) -> List[str]:
+    async def aclose(self):
+        """
+        Stop pre-warming and close pooled connections
+        """
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+    
+    async def extract_medicines(self, prescription_text: str) -> List[str]:
         """
         Extract medicine names from prescription text using GPT-4
         
@@ -41,10 +310,10 @@ class GPTProcessor:
             ["Medicine Name 1", "Medicine Name 2"]
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
+            response = await self.create_completion(
+                method="extract_medicines",
                 messages=[
-                    {"role": "system", "content": "You are a medical assistant that extracts disease names from prescriptions. Return only valid JSON arrays."},
+                    {"role": "system", "content": "You are a medical assistant that extracts medicine names from prescriptions. Return only valid JSON arrays."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
@@ -65,10 +334,12 @@ class GPTProcessor:
                 # Fallback: extract medicine names manually
                 return self._fallback_medicine_extraction(content)
                 
+        except LLMBusyError:
+            raise
         except Exception as e:
             raise Exception(f"Medicine extraction failed: {str(e)}")
     
-    def extract_diseases(self, prescription_text: str) -> List[str]:
+    async def extract_diseases(self, prescription_text: str) -> List[str]:
         """
         Extract disease/condition names from prescription text using GPT-4
         
@@ -97,8 +368,8 @@ class GPTProcessor:
             {prescription_text}
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
+            response = await self.create_completion(
+                method="extract_diseases",
                 messages=[
                     {"role": "system", "content": "You are a medical expert that extracts disease information from prescriptions. Return only valid JSON arrays."},
                     {"role": "user", "content": prompt}
@@ -124,7 +395,6 @@ class GPTProcessor:
                     line = line.strip()
                     if line and not line.startswith('#') and not line.startswith('-'):
                         # Remove common prefixes and clean up
-                        import re
                         line = re.sub(r'^[\d\-\*\+\.\s]+', '', line)
                         line = re.sub(r'[\[\]"\']', '', line)
                         if line:
@@ -135,77 +405,229 @@ class GPTProcessor:
             print(f"Error extracting diseases: {e}")
             return []
     
-    def get_medicine_info(self, medicine_names: List[str]) -> List[Dict[str, Any]]:
+    async def get_medicine_info(self, medicine_names: List[str]) -> List[Dict[str, Any]]:
         """
         Get detailed information about medicines using GPT-4 with cross-verification
         
+        Each medicine is cached on its own under its normalized name; only
+        the names not in the cache are sent to GPT. They are split into
+        chunks that fit the output token budget, fetched concurrently.
+        
         Args:
             medicine_names: List of medicine names
             
         Returns:
-            List of medicine information dictionaries
+            List of medicine information dictionaries, in the order requested;
+            each is a copy the caller may modify without touching the cache
         """
         try:
-            medicines_str = ", ".join(medicine_names)
+            names = [name for name in medicine_names if str(name).strip()]
+            keys = [normalize_medicine_name(name) for name in names]
             
-            prompt = f"""
-            You are a certified healthcare assistant with access to medical databases. For the following medicines, provide detailed, accurate information in JSON format.
-            
-            Medicines: {medicines_str}
-            
-            For each medicine, provide comprehensive information:
-            - name: Exact medicine name
-            - description: What condition/disease it treats
-            - dosage: Standard adult dosage with frequency
-            - precautions: Important safety warnings and contraindications
-            - side_effects: Common and serious side effects
-            - category: Medicine category (antibiotic, pain reliever, etc.)
-            - interactions: Common drug interactions
-            - pregnancy_safety: Safety during pregnancy/breastfeeding
-            - storage: How to store the medicine
-            - missed_dose: What to do if a dose is missed
-            
-            IMPORTANT: 
-            - Be extremely accurate and medical-appropriate
-            - Include FDA-approved information when possible
-            - Mention if information is limited and suggest consulting healthcare provider
-            - Include both generic and brand names if applicable
-            
-            Return a JSON array of objects with these fields.
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a medical information assistant. Provide accurate, helpful information about medicines."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=2000
-            )
+            found: Dict[str, Dict[str, Any]] = {}
+            missing: Dict[str, str] = {}
+            for name, key in zip(names, keys):
+                if key in found or key in missing:
+                    continue
+                cached_info = await self.medicine_cache.get(key)
+                if cached_info is not None:
+                    found[key] = cached_info
+                else:
+                    missing[key] = name
             
-            content = response.choices[0].message.content.strip()
+            if missing:
+                chunk_size = self.medicine_info_chunk_size()
+                pending = list(missing.values())
+                chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+                results = await asyncio.gather(*[
+                    self._fetch_medicine_chunk(chunk, MEDICINE_INFO_CHUNK_RETRIES) for chunk in chunks
+                ])
+                for matched in results:
+                    for key, info in matched.items():
+                        found[key] = info
+                        await self.medicine_cache.set(key, info)
             
-            try:
-                medicine_info = json.loads(content)
-                if isinstance(medicine_info, list):
-                    return medicine_info
-                else:
-                    return []
-            except json.JSONDecodeError:
-                # Fallback: create basic info structure
-                return self._create_fallback_medicine_info(medicine_names)
-                
+            # The local cache tier holds these very dictionaries
+            return [
+                copy.deepcopy(found[key]) if found.get(key) else self._create_fallback_medicine_info([name])[0]
+                for name, key in zip(names, keys)
+            ]
+        except LLMBusyError:
+            raise
         except Exception as e:
             raise Exception(f"Medicine information retrieval failed: {str(e)}")
     
-    def get_exercise_recommendations(self, diseases: List[str], user_profile: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _match_medicine_info(self, medicine_names: List[str], medicine_info: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Pair GPT's answers with the requested names, keyed by normalized name.
+        Answers are matched by name first and by position only when GPT
+        returned exactly one entry per requested medicine.
+        """
+        by_name = {}
+        for info in medicine_info:
+            if isinstance(info, dict) and info.get("name"):
+                by_name.setdefault(normalize_medicine_name(info["name"]), info)
+        
+        matched = {}
+        for index, name in enumerate(medicine_names):
+            key = normalize_medicine_name(name)
+            info = by_name.get(key)
+            if info is None:
+                # GPT often answers "Amoxicillin (Amoxil)" for "amoxicillin";
+                # the name must be whole words of the answer, so "pril" does
+                # not match "lisinopril"
+                pattern = re.compile(r"(?<![a-z0-9])" + re.escape(key) + r"(?![a-z0-9])")
+                info = next((value for returned, value in by_name.items() if pattern.search(returned)), None)
+            if info is None and len(medicine_info) == len(medicine_names) and isinstance(medicine_info[index], dict):
+                info = medicine_info[index]
+            if info is not None:
+                matched[key] = info
+        return matched
+    
+    def medicine_info_chunk_size(self) -> int:
+        """
+        Medicines per call whose answers fit the output token budget with
+        20% headroom, based on the observed tokens per medicine
+        """
+        return max(1, int(MEDICINE_INFO_MAX_TOKENS * 0.8 // self.medicine_info_tokens))
+    
+    async def _fetch_medicine_chunk(self, medicine_names: List[str], retries: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch and match one chunk of medicines. A failed or truncated chunk
+        is retried on its own, split in half, up to `retries` times; what
+        still fails is left out (the caller uses fallback info, uncached).
+        """
+        try:
+            fetched = await self._fetch_medicine_info(medicine_names)
+            return self._match_medicine_info(medicine_names, fetched)
+        except LLMBusyError:
+            raise
+        except Exception as e:
+            if retries <= 0:
+                print(f"Medicine information chunk failed for {', '.join(medicine_names)}: {e}")
+                return {}
+            middle = (len(medicine_names) + 1) // 2
+            parts = [medicine_names[:middle], medicine_names[middle:]] if len(medicine_names) > 1 else [medicine_names]
+            results = await asyncio.gather(*[self._fetch_medicine_chunk(part, retries - 1) for part in parts])
+            return {key: info for matched in results for key, info in matched.items()}
+    
+    async def _fetch_medicine_info(self, medicine_names: List[str]) -> List[Dict[str, Any]]:
+        """
+        Ask GPT about a list of medicines in a single call
+        
+        Raises:
+            Exception: The answer was cut off by the token limit or is not a JSON array
+        """
+        medicines_str = ", ".join(medicine_names)
+        
+        prompt = f"""
+        You are a certified healthcare assistant with access to medical databases. For the following medicines, provide detailed, accurate information in JSON format.
+        
+        Medicines: {medicines_str}
+        
+        For each medicine, provide comprehensive information:
+        - name: Exact medicine name
+        - description: What condition/disease it treats
+        - dosage: Standard adult dosage with frequency
+        - precautions: Important safety warnings and contraindications
+        - side_effects: Common and serious side effects
+        - category: Medicine category (antibiotic, pain reliever, etc.)
+        - interactions: Common drug interactions
+        - pregnancy_safety: Safety during pregnancy/breastfeeding
+        - storage: How to store the medicine
+        - missed_dose: What to do if a dose is missed
+        
+        IMPORTANT: 
+        - Be extremely accurate and medical-appropriate
+        - Include FDA-approved information when possible
+        - Mention if information is limited and suggest consulting healthcare provider
+        - Include both generic and brand names if applicable
+        
+        Return a JSON array of objects with these fields.
+        """
+        
+        response = await self.create_completion(
+            priority=PRIORITY_BATCH,
+            method="medicine_info",
+            messages=[
+                {"role": "system", "content": "You are a medical information assistant. Provide accurate, helpful information about medicines."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=MEDICINE_INFO_MAX_TOKENS
+        )
+        
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            # Too many medicines for the budget: raise the estimate so later chunks are smaller
+            self.medicine_info_tokens = max(self.medicine_info_tokens, MEDICINE_INFO_MAX_TOKENS / len(medicine_names))
+            raise Exception(f"answer truncated at {MEDICINE_INFO_MAX_TOKENS} tokens")
+        
+        content = choice.message.content.strip()
+        try:
+            medicine_info = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise Exception(f"answer is not valid JSON ({e})")
+        if not isinstance(medicine_info, list):
+            raise Exception("answer is not a JSON array")
+        
+        usage = getattr(response, "usage", None)
+        if usage is not None and usage.completion_tokens and medicine_info:
+            observed = usage.completion_tokens / len(medicine_info)
+            self.medicine_info_tokens = 0.8 * self.medicine_info_tokens + 0.2 * observed
+        return medicine_info
+    
+    def medicine_cache_stats(self) -> Dict[str, Any]:
+        """
+        Hit ratio and size of the per-medicine information cache
+        """
+        return self.medicine_cache.stats()
+    
+    def exercise_cache_stats(self) -> Dict[str, Any]:
+        """
+        Hit ratio and size of the exercise plan cache
+        """
+        return self.exercise_cache.stats()
+    
+    def start_exercise_prewarm(self, combinations: str = EXERCISE_CACHE_PREWARM):
+        """
+        Generate plans for common disease combinations in the background,
+        for the default profile, so the first requests for them are hits
+        
+        Args:
+            combinations: Disease sets separated by ';', diseases by ','
+        """
+        disease_sets = [
+            [disease.strip() for disease in combination.split(",") if disease.strip()]
+            for combination in combinations.split(";")
+        ]
+        disease_sets = [diseases for diseases in disease_sets if diseases]
+        if not disease_sets or self.client is None:
+            return
+        self._prewarm_task = asyncio.create_task(self._prewarm_exercise_cache(disease_sets))
+    
+    async def _prewarm_exercise_cache(self, disease_sets: List[List[str]]):
+        for diseases in disease_sets:
+            await self.get_exercise_recommendations(diseases, priority=PRIORITY_BATCH)
+        print(f"Exercise plan cache pre-warmed with {len(disease_sets)} combination(s)")
+    
+    async def get_exercise_recommendations(
+        self,
+        diseases: List[str],
+        user_profile: Dict[str, Any] = None,
+        priority: int = PRIORITY_STANDARD
+    ) -> Dict[str, Any]:
         """
         Generate personalized exercise recommendations based on diseases and user profile
         
+        Plans are generated for a coarse profile bucket (age band, fitness
+        level, gender) and cached under it together with the normalized
+        disease set. Profiles with their own preferences are not cached.
+        
         Args:
             diseases: List of identified diseases/conditions
-            user_profile: Optional user profile with age, fitness level, preferences
+            user_profile: Optional user profile with age, gender, fitness level, preferences
+            priority: Scheduler priority class of the GPT call
             
         Returns:
             Dictionary containing exercise recommendations
@@ -216,11 +638,16 @@ class GPTProcessor:
             
             # Default user profile if not provided
             if user_profile is None:
-                user_profile = {
-                    "age": "adult",
-                    "fitness_level": "beginner",
-                    "preferences": "general wellness"
-                }
+                user_profile = DEFAULT_EXERCISE_PROFILE
+            
+            bucket = exercise_profile_bucket(user_profile)
+            preferences = user_profile.get('preferences') or DEFAULT_EXERCISE_PROFILE["preferences"]
+            cache_key = None
+            if normalize_medicine_name(preferences) == DEFAULT_EXERCISE_PROFILE["preferences"]:
+                cache_key = exercise_cache_key(diseases, bucket)
+                cached_plan = await self.exercise_cache.get(cache_key)
+                if cached_plan is not None:
+                    return cached_plan
             
             diseases_text = ", ".join(diseases) if diseases else "general health maintenance"
             
@@ -228,9 +655,10 @@ class GPTProcessor:
             Create personalized daily exercise recommendations for someone with the following conditions: {diseases_text}
             
             User Profile:
-            - Age: {user_profile.get('age', 'adult')}
-            - Fitness Level: {user_profile.get('fitness_level', 'beginner')}
-            - Preferences: {user_profile.get('preferences', 'general wellness')}
+            - Age: {bucket['age']}
+            - Gender: {bucket['gender']}
+            - Fitness Level: {bucket['fitness_level']}
+            - Preferences: {preferences}
             
             Provide recommendations in the following JSON format:
             {{
@@ -265,8 +693,9 @@ class GPTProcessor:
             - Specific benefits for each condition
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
+            response = await self.create_completion(
+                priority=priority,
+                method="exercise_recommendations",
                 messages=[
                     {"role": "system", "content": "You are a certified fitness expert and physical therapist who creates safe, personalized exercise plans for people with medical conditions. Always prioritize safety and provide evidence-based recommendations."},
                     {"role": "user", "content": prompt}
@@ -278,6 +707,8 @@ class GPTProcessor:
             
             try:
                 recommendations = json.loads(content)
+                if cache_key is not None and isinstance(recommendations, dict):
+                    await self.exercise_cache.set(cache_key, recommendations)
                 return recommendations
             except json.JSONDecodeError:
                 # Fallback response
@@ -363,7 +794,7 @@ class GPTProcessor:
         
         return info_list
 
-    def verify_and_correct_medicine_names(self, extracted_medicines: List[str], prescription_context: str = "") -> Dict:
+    async def verify_and_correct_medicine_names(self, extracted_medicines: List[str], prescription_context: str = "") -> Dict:
         """
         Use GPT-4 to verify and correct medicine names from OCR text
         
@@ -411,8 +842,8 @@ class GPTProcessor:
             Only return valid JSON.
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
+            response = await self.create_completion(
+                method="verify_medicines",
                 messages=[
                     {"role": "system", "content": "You are a medical expert specializing in prescription verification and medicine name correction. Provide accurate, detailed responses in JSON format."},
                     {"role": "user", "content": prompt}
@@ -445,8 +876,150 @@ class GPTProcessor:
                 }
                 return fallback_result
                 
+        except LLMBusyError:
+            raise
         except Exception as e:
             raise Exception(f"Medicine verification failed: {str(e)}")
 
+    async def analyze_prescription(self, prescription_text: str) -> Dict[str, Any]:
+        """
+        Extract verified medicine names and diseases from prescription text
+        in a single GPT-4 call
+        
+        The response is constrained to PRESCRIPTION_ANALYSIS_SCHEMA through
+        function calling. If the structured answer cannot be used, the
+        separate extraction and verification calls are made instead.
+        
+        Args:
+            prescription_text: OCR extracted text from prescription
+            
+        Returns:
+            Dictionary with corrected medicines (in the
+            verify_and_correct_medicine_names format), diseases, overall
+            confidence, summary, total_corrected and total_invalid
+        """
+        try:
+            if self.client is None:
+                raise Exception("OpenAI client not initialized")
+            
+            prompt = f"""
+            Analyze this prescription text, which was extracted with OCR and may contain misspellings.
+            
+            1. Find every medicine and correct its name to the proper generic name
+               (spelling_correction, brand_to_generic or context_inference), or
+               no_change if it is already correct. Mark anything that is not an
+               actual medicine as invalid_medicine with is_valid false.
+            2. Give a confidence (0-100) and a brief explanation for each medicine.
+            3. List the diseases, medical conditions or diagnoses the prescription indicates.
+            4. Give an overall confidence (0-100) and a summary of the corrections.
+            
+            Prescription text:
+            {prescription_text}
+            """
+            
+            response = await self.create_completion(
+                method="analyze_prescription",
+                messages=[
+                    {"role": "system", "content": "You are a medical expert specializing in prescription verification and medicine name correction. Be accurate; if you are unsure about a name, give it a low confidence."},
+                    {"role": "user", "content": prompt}
+                ],
+                functions=[{
+                    "name": "record_prescription_analysis",
+                    "description": "Record the medicines and diseases found in a prescription",
+                    "parameters": PRESCRIPTION_ANALYSIS_SCHEMA
+                }],
+                function_call={"name": "record_prescription_analysis"},
+                temperature=0.1,
+                max_tokens=1500
+            )
+            
+            message = response.choices[0].message
+            try:
+                arguments = message.function_call.arguments if message.function_call else message.content
+                analysis = json.loads(arguments)
+                if not isinstance(analysis.get("medicines"), list) or not isinstance(analysis.get("diseases"), list):
+                    raise ValueError("Analysis is missing medicines or diseases")
+            except (json.JSONDecodeError, ValueError, TypeError, AttributeError) as e:
+                print(f"Structured prescription analysis unusable, using separate calls: {e}")
+                return await self._analyze_prescription_separately(prescription_text)
+            
+            medicines = [
+                medicine for medicine in analysis["medicines"]
+                if isinstance(medicine, dict) and medicine.get("original")
+            ]
+            for medicine in medicines:
+                medicine.setdefault("corrected", medicine["original"])
+                medicine.setdefault("confidence", 50)
+                medicine.setdefault("method", "no_change")
+                medicine.setdefault("explanation", "")
+                medicine.setdefault("is_valid", True)
+            
+            return {
+                "corrected_medicines": medicines,
+                "diseases": [disease.strip() for disease in analysis["diseases"] if isinstance(disease, str) and disease.strip()],
+                "confidence": analysis.get("confidence"),
+                "summary": analysis.get("summary", ""),
+                "total_corrected": sum(1 for medicine in medicines if medicine["original"] != medicine["corrected"]),
+                "total_invalid": sum(1 for medicine in medicines if not medicine["is_valid"])
+            }
+            
+        except LLMBusyError:
+            raise
+        except Exception as e:
+            raise Exception(f"Prescription analysis failed: {str(e)}")
+    
+    async def _analyze_prescription_separately(self, prescription_text: str) -> Dict[str, Any]:
+        """
+        Fallback for analyze_prescription using the individual calls
+        """
+        medicines, diseases = await asyncio.gather(
+            self.extract_medicines(prescription_text),
+            self.extract_diseases(prescription_text)
+        )
+        if medicines:
+            result = await self.verify_and_correct_medicine_names(medicines, prescription_text)
+        else:
+            result = {"corrected_medicines": [], "summary": "No medicines found to correct.", "total_corrected": 0, "total_invalid": 0}
+        result["diseases"] = diseases
+        result["confidence"] = None
+        return result
+    
+    async def summarize_conversation(self, summary: str, messages: List[Dict[str, str]], max_tokens: int = 300) -> str:
+        """
+        Fold chat turns into a running conversation summary
+        
+        Args:
+            summary: Summary of the conversation so far (may be empty)
+            messages: Turns to add, as role/content dictionaries
+            max_tokens: Length limit of the new summary
+            
+        Returns:
+            The updated summary
+        """
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        prompt = f"""
+        Update the summary of a conversation between a user and RX Assistant with the new messages below.
+        Keep the medicines, conditions, symptoms, allergies and advice that were discussed, and anything
+        the user said about themselves. Leave out greetings and repetition. Write plain sentences.
+        
+        Summary so far:
+        {summary or "(none)"}
+        
+        New messages:
+        {transcript}
+        """
+        
+        response = await self.create_completion(
+            priority=PRIORITY_BATCH,
+            method="summarize_chat",
+            messages=[
+                {"role": "system", "content": "You summarize healthcare conversations accurately and concisely."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content.strip()
+
 # Global GPT processor instance
 gpt_processor = GPTProcessor()
\ No newline at end of file
@@ -0,0 +1,285 @@
+import os
+import re
+import binascii
+import hashlib
+import tempfile
+from typing import AsyncIterator, Iterator, Optional, Union
+
+# Upload ingestion configuration
+OCR_MAX_IMAGE_BYTES = int(os.getenv("OCR_MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+OCR_SPOOL_MEMORY_BYTES = int(os.getenv("OCR_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+INGEST_CHUNK_SIZE = 64 * 1024
+HEADER_BYTES = 16
+
+class ImageTooLargeError(Exception):
+    """Raised when an upload exceeds the configured maximum size"""
+    pass
+
+class SpooledImage:
+    """
+    Image bytes written incrementally, hashed on the way in.
+
+    Small images stay in memory; once `memory_limit` is exceeded the data
+    moves to a temporary file so OCR workers can open it by path instead of
+    receiving another full copy. Call close() to remove the file.
+    """
+    def __init__(self, max_bytes: int = OCR_MAX_IMAGE_BYTES, memory_limit: int = OCR_SPOOL_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.path: Optional[str] = None
+        self._buffer = bytearray()
+        self._file = None
+        self._hash = hashlib.sha256()
+        self.header = b""
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.close()
+            raise ImageTooLargeError(f"Image exceeds the maximum size of {self.max_bytes} bytes")
+
+        self._hash.update(chunk)
+        if len(self.header) < HEADER_BYTES:
+            # Leading bytes identify the file format (PDF, TIFF, ...)
+            self.header += chunk[:HEADER_BYTES - len(self.header)]
+        if self._file is None and self.size <= self.memory_limit:
+            self._buffer += chunk
+            return
+
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(prefix="ocr-", suffix=".img", delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.write(chunk)
+
+    def finish(self) -> "SpooledImage":
+        """
+        Flush buffered data; the image is ready to be read afterwards
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    def source(self) -> Union[memoryview, str]:
+        """
+        Path of the spooled file, or a read-only view of the in-memory
+        bytes for small images (not a copy)
+        """
+        if self.path is not None:
+            return self.path
+        return memoryview(self._buffer).toreadonly()
+
+    def chunks(self, size: int = INGEST_CHUNK_SIZE) -> Iterator[Union[bytes, memoryview]]:
+        """
+        The image in pieces of at most `size` bytes, read from the spooled
+        file or sliced from the in-memory bytes without copying them
+        """
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                while True:
+                    chunk = f.read(size)
+                    if not chunk:
+                        return
+                    yield chunk
+        view = memoryview(self._buffer).toreadonly()
+        for start in range(0, len(view), size):
+            yield view[start:start + size]
+
+    def read_bytes(self) -> bytes:
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                return f.read()
+        return bytes(self._buffer)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+        self._buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class Base64StreamDecoder:
+    """
+    Decodes base64 text fed in arbitrary chunks.
+
+    Whitespace and JSON escape backslashes are skipped; complete 4-character
+    groups are decoded as soon as they arrive.
+    """
+    _invalid = re.compile(rb"[^A-Za-z0-9+/=_-]")
+
+    def __init__(self):
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        data = self._pending + self._invalid.sub(b"", chunk)
+        usable = len(data) - (len(data) % 4)
+        self._pending = data[usable:]
+        if not usable:
+            return b""
+        return self._decode(data[:usable])
+
+    def flush(self) -> bytes:
+        data, self._pending = self._pending, b""
+        if not data:
+            return b""
+        return self._decode(data + b"=" * (-len(data) % 4))
+
+    def _decode(self, data: bytes) -> bytes:
+        # Accept URL-safe alphabet as well as the standard one
+        data = data.replace(b"-", b"+").replace(b"_", b"/")
+        try:
+            return binascii.a2b_base64(data)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid base64 image data: {e}")
+
+async def spool_upload(file, max_bytes: int = OCR_MAX_IMAGE_BYTES) -> SpooledImage:
+    """
+    Copy an UploadFile into a SpooledImage chunk by chunk
+
+    Args:
+        file: FastAPI UploadFile
+        max_bytes: Reject uploads larger than this
+
+    Returns:
+        Finished SpooledImage (caller must close it)
+    """
+    image = SpooledImage(max_bytes=max_bytes)
+    try:
+        while True:
+            chunk = await file.read(INGEST_CHUNK_SIZE)
+            if not chunk:
+                break
+            image.write(chunk)
+    except Exception:
+        image.close()
+        raise
+    return image.finish()
+
+def _find_closing_quote(data: bytes) -> int:
+    """
+    Index of the first unescaped double quote in a JSON string body, or -1
+    """
+    start = 0
+    while True:
+        index = data.find(b'"', start)
+        if index == -1:
+            return -1
+        backslashes = 0
+        while index - backslashes - 1 >= 0 and data[index - backslashes - 1] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return index
+        start = index + 1
+
+_json_escape = re.compile(rb"\\(.)", re.DOTALL)
+
+def _unescape_json(data: bytes) -> bytes:
+    # Base64 can only legitimately contain the escaped solidus; other escapes (\n, \r) are line wrapping
+    return _json_escape.sub(lambda m: b"/" if m.group(1) == b"/" else b"", data)
+
+async def spool_base64_json(
+    stream: AsyncIterator[bytes],
+    field: str = "image",
+    max_bytes: int = OCR_MAX_IMAGE_BYTES
+) -> Optional[SpooledImage]:
+    """
+    Decode a base64 image from a JSON request body as it streams in
+
+    Only the string value of `field` is decoded; a `data:image/...;base64,`
+    prefix is skipped. The body is never held in memory as a whole.
+
+    Args:
+        stream: Request body chunks (Request.stream())
+        field: JSON key holding the base64 string
+        max_bytes: Reject images whose decoded size exceeds this
+
+    Returns:
+        Finished SpooledImage, or None if the field is missing or empty
+    """
+    key_pattern = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"')
+    image = SpooledImage(max_bytes=max_bytes)
+    decoder = Base64StreamDecoder()
+
+    state = "seek"  # seek -> prefix -> value -> done
+    pending = b""
+
+    try:
+        async for chunk in stream:
+            if state == "done":
+                continue
+
+            data = pending + chunk
+            pending = b""
+
+            if state == "seek":
+                match = key_pattern.search(data)
+                if not match:
+                    # Keep only enough tail to match a key split across chunks
+                    pending = data[-(len(field) + 64):]
+                    continue
+                data = data[match.end():]
+                state = "prefix"
+
+            end = _find_closing_quote(data)
+            complete = end != -1
+            if complete:
+                data = data[:end]
+            else:
+                # Hold back a dangling escape so it is resolved with the next chunk
+                trailing = len(data) - len(data.rstrip(b"\\"))
+                if trailing % 2:
+                    data, pending = data[:-1], b"\\"
+
+            if state == "prefix":
+                if not complete and len(data) < 5:
+                    pending = data + pending
+                    continue
+                if data.startswith(b"data:"):
+                    comma = data.find(b",")
+                    if comma == -1:
+                        if not complete and len(data) < 256:
+                            pending = data + pending
+                            continue
+                        raise ValueError("Invalid image data URL")
+                    data = data[comma + 1:]
+                state = "value"
+
+            image.write(decoder.feed(_unescape_json(data)))
+            if complete:
+                state = "done"
+
+        if state == "seek":
+            image.close()
+            return None
+        if state == "prefix":
+            image.write(decoder.feed(_unescape_json(pending)))
+
+        image.write(decoder.flush())
+    except Exception:
+        image.close()
+        raise
+
+    if image.size == 0:
+        image.close()
+        return None
+    return image.finish()
@@ -0,0 +1,328 @@
+import os
+import math
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import openai
+
+# OpenAI scheduler configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "40000"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "200"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+
+# Priority classes, lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_STANDARD = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_STANDARD: "standard", PRIORITY_BATCH: "batch"}
+
+class LLMBusyError(Exception):
+    """Raised when OpenAI calls are rate limited or the scheduler queue is full"""
+    def __init__(self, message: str, retry_after: float = 5.0):
+        super().__init__(message)
+        # Whole seconds, for the Retry-After header
+        self.retry_after = max(1, math.ceil(retry_after))
+
+def estimate_prompt_tokens(request: Dict[str, Any]) -> int:
+    """
+    Rough prompt size of a completion request: prompt characters / 4
+    """
+    return sum(len(str(message.get("content") or "")) for message in request.get("messages", [])) // 4
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """
+    Rough token cost of a completion request: prompt characters / 4 plus
+    the completion budget
+    """
+    return estimate_prompt_tokens(request) + int(request.get("max_tokens") or 1000)
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+class ScheduledStream:
+    """
+    A streamed completion that keeps its scheduler slot until it has been
+    read to the end or closed.
+
+    Iterate it like the openai AsyncStream it wraps. Callers that may stop
+    reading early must `await aclose()`, which also closes the HTTP
+    response. Content chunks are counted as completion tokens, so the token
+    bucket is charged for what the stream actually produced.
+    """
+    def __init__(self, stream: Any, on_close: Callable[[int], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+        self.completion_tokens = 0
+
+    @property
+    def response(self):
+        return self._stream.response
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for chunk in self._stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    self.completion_tokens += 1
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """
+        Close the response and hand the slot back (idempotent)
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._stream.response.aclose()
+        finally:
+            self._on_close(self.completion_tokens)
+
+    def __del__(self):
+        # Last resort for a stream dropped without being read or closed
+        if not self._closed:
+            self._closed = True
+            try:
+                self._on_close(self.completion_tokens)
+            except RuntimeError:
+                pass
+
+class LLMScheduler:
+    """
+    Admission control in front of the OpenAI API.
+
+    Calls wait in a priority queue until both a concurrency slot and enough
+    tokens in a tokens-per-minute bucket are available; interactive calls are
+    dispatched ahead of standard and batch ones. 429 and 5xx responses are
+    retried with jittered exponential backoff, honouring Retry-After, and a
+    429 pauses all dispatching until the advertised time has passed.
+    A streamed call holds its slot until its ScheduledStream is closed.
+    """
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_queue: int = LLM_MAX_QUEUE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = max(1, tokens_per_minute)
+        self.max_queue = max(0, max_queue)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tokens = float(self.tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._waiters: List = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        self.completed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.tokens_per_minute),
+            self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60.0
+        )
+        self._refilled_at = now
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(max(0.01, delay), self._dispatch)
+
+    def _dispatch(self):
+        self._wakeup = None
+        while self._waiters and self._active < self.max_concurrency:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            now = time.monotonic()
+            if now < self._paused_until:
+                self._schedule_wakeup(self._paused_until - now)
+                return
+
+            # The head of the queue waits for its tokens; nothing jumps ahead of it
+            self._refill()
+            if self._tokens < tokens:
+                self._schedule_wakeup((tokens - self._tokens) * 60.0 / self.tokens_per_minute)
+                return
+
+            heapq.heappop(self._waiters)
+            self._tokens -= tokens
+            self._active += 1
+            future.set_result(None)
+
+    async def _acquire(self, priority: int, tokens: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), tokens, future))
+        self._dispatch()
+
+        # Only a call that has to wait counts against max_queue
+        if not future.done():
+            queued = sum(1 for waiter in self._waiters if not waiter[3].done())
+            if queued > self.max_queue:
+                future.cancel()
+                self.rejected += 1
+                raise LLMBusyError("AI service is busy. Please try again shortly.")
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller went away: hand the slot back
+                self._release()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_STANDARD,
+        estimated_tokens: int = 1000,
+        stream: bool = False,
+        prompt_tokens: int = 0
+    ) -> Any:
+        """
+        Run an OpenAI call once admitted, retrying transient failures
+
+        Args:
+            func: Coroutine function making the API call
+            priority: PRIORITY_INTERACTIVE, PRIORITY_STANDARD or PRIORITY_BATCH
+            estimated_tokens: Expected prompt + completion tokens
+            stream: The call returns a stream; its slot is kept until the
+                stream is exhausted or closed
+            prompt_tokens: Expected prompt tokens of a streamed call, used to
+                charge the bucket once the stream has finished
+
+        Returns:
+            The call's result, wrapped in a ScheduledStream for streams
+
+        Raises:
+            LLMBusyError: The queue is full, or the API kept rate limiting
+        """
+        tokens = min(max(1, estimated_tokens), self.tokens_per_minute)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, tokens)
+            release = True
+            try:
+                result = await func()
+            except Exception as e:
+                if not _is_retryable(e):
+                    raise
+                delay = self._backoff(e, attempt)
+                if isinstance(e, openai.RateLimitError):
+                    self.rate_limited += 1
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                if attempt == self.max_retries:
+                    if isinstance(e, openai.RateLimitError):
+                        raise LLMBusyError("AI service is rate limited. Please try again shortly.", retry_after=delay)
+                    raise
+                self.retries += 1
+                print(f"OpenAI call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            else:
+                if stream:
+                    # The stream's aclose() releases the slot
+                    release = False
+                    return ScheduledStream(
+                        result,
+                        lambda completion_tokens: self._finish_stream(tokens, prompt_tokens + completion_tokens)
+                    )
+                self._reconcile(tokens, result)
+                self.completed += 1
+                return result
+            finally:
+                if release:
+                    self._release()
+            await asyncio.sleep(delay)
+
+    def _reconcile(self, estimated_tokens: int, result: Any):
+        # Charge the bucket for what the call actually used
+        usage = getattr(result, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if total is not None:
+            self._tokens -= total - estimated_tokens
+
+    def _finish_stream(self, estimated_tokens: int, used_tokens: int):
+        self._tokens -= used_tokens - estimated_tokens
+        self.completed += 1
+        self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Current load, queue per priority class and retry counters
+        """
+        self._refill()
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future in self._waiters:
+            if not future.done():
+                queued[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queued": queued,
+            "tokens_available": int(self._tokens),
+            "tokens_per_minute": self.tokens_per_minute,
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "completed": self.completed,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "rejected": self.rejected
+        }
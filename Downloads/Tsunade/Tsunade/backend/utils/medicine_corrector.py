@@ -1,3 +1,4 @@
+import os
 import re
 import difflib
 from typing import List, Dict, Tuple, Optional
@@ -5,6 +6,11 @@ import requests
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
 
+from utils.drug_index import drug_index, DRUG_INDEX_REMOTE_FALLBACK
+
+# Minimum confidence for a dictionary match to be trusted without GPT
+MEDICINE_DICTIONARY_MIN_CONFIDENCE = float(os.getenv("MEDICINE_DICTIONARY_MIN_CONFIDENCE", "90"))
+
 class MedicineNameCorrector:
     def __init__(self):
         # Common medicine name patterns and corrections
@@ -99,6 +105,34 @@ class MedicineNameCorrector:
             r'\d+\s*mg', r'\d+\s*mcg', r'\d+\s*g', r'\d+\s*ml',
             r'\d+\s*%', r'\d+\s*units'
         ]
+        
+        # Every known brand/generic name and misspelling, mapped to its generic name
+        self.name_lookup = {}
+        for generic, brands in self.common_medicines.items():
+            self.name_lookup[generic] = generic
+            for brand in brands:
+                self.name_lookup[brand] = generic
+        self.known_names = list(self.name_lookup)
+        
+        # Words that mark a prescription line as a medicine line
+        self.dosage_form_words = {
+            'tab', 'tabs', 'tablet', 'tablets', 'cap', 'caps', 'capsule', 'capsules',
+            'syp', 'syrup', 'inj', 'injection', 'susp', 'suspension', 'drops', 'cream', 'oint', 'ointment', 'gel'
+        }
+        self.strength_regex = re.compile(r'\b\d+(?:\.\d+)?\s*(?:mg|mcg|g|ml|%|units|iu)\b', re.IGNORECASE)
+        self.token_regex = re.compile(r"[A-Za-z][A-Za-z\-]{3,}")
+        # Dosing frequencies: OD/BD/TDS..., 1-0-1, q8h, "twice daily"
+        self.frequency_regex = re.compile(
+            r"\b(?:od|bd|bid|tid|tds|qid|qds|hs|prn|sos|stat|daily|nightly|weekly|once|twice|thrice|"
+            r"\d+\s*-\s*\d+\s*-\s*\d+|q\d+h)\b",
+            re.IGNORECASE
+        )
+        # Negations and instructions: a name on such a line is not being prescribed
+        self.instruction_regex = re.compile(
+            r"\b(?:no|not|never|avoid|avoiding|stop|stopped|discontinue|discontinued|hold|withhold|"
+            r"allergic|allergy|allergies|intolerant|contraindicated|instead|without|dont|don't|history|previously)\b",
+            re.IGNORECASE
+        )
     
     def clean_medicine_name(self, name: str) -> str:
         """
@@ -164,6 +198,100 @@ class MedicineNameCorrector:
         # If no good match found, return original with low confidence
         return medicine_name, 30.0, "no_correction"
     
+    def match_known_medicine(self, token: str) -> Optional[Tuple[str, float, str]]:
+        """
+        Resolve a single word against the local dictionary
+        
+        Returns:
+            (generic_name, confidence, method) or None if nothing is close
+        """
+        word = token.lower().strip('-')
+        if word in self.name_lookup:
+            return self.name_lookup[word], 100.0, "exact_match"
+        if word in self.misspellings:
+            return self.misspellings[word], 95.0, "misspelling_correction"
+        if len(word) < 5:
+            return None
+        
+        best = process.extractOne(word, self.known_names, scorer=fuzz.ratio)
+        if best is None:
+            return None
+        return self.name_lookup[best[0]], float(best[1]), "fuzzy_match"
+    
+    def match_prescription_text(
+        self,
+        text: str,
+        min_confidence: float = MEDICINE_DICTIONARY_MIN_CONFIDENCE
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        Find medicines in prescription text using only the local dictionary
+        
+        A name is accepted locally only from a prescription entry: a line
+        with a dosage form, strength or frequency and no negation or
+        instruction words ("avoid", "stop", "allergic to", ...). Every other
+        line that mentions a known name or looks like a medicine line is
+        returned unresolved, as is an entry with more strengths than
+        recognised names, so GPT reads it in full.
+        
+        Args:
+            text: OCR text of the prescription
+            min_confidence: Lowest match confidence trusted without GPT
+            
+        Returns:
+            (matched medicines in the verify_and_correct_medicine_names
+            format, unresolved medicine lines)
+        """
+        matched = []
+        seen = set()
+        unresolved_lines = []
+        
+        for line in text.splitlines():
+            words = [word.lower() for word in self.token_regex.findall(line)]
+            strengths = len(self.strength_regex.findall(line))
+            
+            line_matches = []
+            for token in self.token_regex.findall(line):
+                if token.lower() in self.dosage_form_words:
+                    continue
+                match = self.match_known_medicine(token)
+                if match is not None and match[1] >= min_confidence:
+                    line_matches.append((token, match))
+            
+            is_medicine_line = (
+                strengths > 0
+                or any(word in self.dosage_form_words for word in words)
+                or self.frequency_regex.search(line) is not None
+            )
+            is_prescription_entry = is_medicine_line and self.instruction_regex.search(line) is None
+            if not line_matches or not is_prescription_entry:
+                if line_matches or is_medicine_line:
+                    unresolved_lines.append(line.strip())
+                continue
+            
+            # More strengths than recognised names: another medicine on this line is unknown
+            if strengths > len(line_matches):
+                unresolved_lines.append(line.strip())
+            
+            for token, (generic, confidence, method) in line_matches:
+                if generic in seen:
+                    continue
+                seen.add(generic)
+                corrected = generic.title()
+                matched.append({
+                    "original": token,
+                    "corrected": corrected,
+                    "confidence": confidence,
+                    "method": "no_change" if token.lower() == generic else {
+                        "exact_match": "brand_to_generic",
+                        "misspelling_correction": "spelling_correction",
+                        "fuzzy_match": "spelling_correction"
+                    }[method],
+                    "explanation": f"Matched {token} to {corrected} in the local medicine dictionary ({method})",
+                    "is_valid": True
+                })
+        
+        return matched, unresolved_lines
+    
     def extract_medicine_context(self, text: str) -> List[str]:
         """
         Extract medicine names from text using context clues
@@ -185,8 +313,25 @@ class MedicineNameCorrector:
     
     def verify_medicine_with_api(self, medicine_name: str) -> Dict:
         """
-        Verify medicine name using external APIs
+        Verify medicine name with the local drug index, falling back to
+        the FDA and RxNav APIs for names it does not contain
         """
+        entry = drug_index.lookup(medicine_name)
+        if entry is not None:
+            return {
+                'verified': True,
+                'source': 'FDA' if 'FDA' in entry['sources'] else 'RxNav',
+                'name': medicine_name,
+                'confidence': 90 if 'FDA' in entry['sources'] else 85
+            }
+        if drug_index.available and not DRUG_INDEX_REMOTE_FALLBACK:
+            return {
+                'verified': False,
+                'source': 'none',
+                'name': medicine_name,
+                'confidence': 0
+            }
+        
         try:
             # Try FDA API
             fda_response = requests.get(
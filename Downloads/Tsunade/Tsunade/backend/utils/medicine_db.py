@@ -1,70 +1,134 @@
-import requests
-import json
+import os
+import httpx
+import asyncio
 from typing import Dict, List, Optional
 
+from utils.drug_index import drug_index, DRUG_INDEX_REMOTE_FALLBACK
+
+# FDA / RxNav client configuration: concurrent requests, per-source timeouts (s)
+MEDICINE_DB_MAX_CONCURRENCY = int(os.getenv("MEDICINE_DB_MAX_CONCURRENCY", "10"))
+MEDICINE_DB_FDA_TIMEOUT = float(os.getenv("MEDICINE_DB_FDA_TIMEOUT", "5"))
+MEDICINE_DB_RXNAV_TIMEOUT = float(os.getenv("MEDICINE_DB_RXNAV_TIMEOUT", "5"))
+
 class MedicineDatabase:
     def __init__(self):
         # FDA API endpoint for drug information
         self.fda_api_base = "https://api.fda.gov/drug"
         self.rxnav_api_base = "https://rxnav.nlm.nih.gov/REST"
+        
+        # Shared keep-alive connections; the semaphore caps requests in flight
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MEDICINE_DB_MAX_CONCURRENCY,
+                max_keepalive_connections=MEDICINE_DB_MAX_CONCURRENCY,
+                keepalive_expiry=30.0
+            ),
+            timeout=httpx.Timeout(max(MEDICINE_DB_FDA_TIMEOUT, MEDICINE_DB_RXNAV_TIMEOUT))
+        )
+        self.semaphore = asyncio.Semaphore(MEDICINE_DB_MAX_CONCURRENCY)
     
-    def get_fda_drug_info(self, drug_name: str) -> Optional[Dict]:
+    async def _get_json(self, url: str, params: Dict, timeout: float) -> Optional[Dict]:
+        async with self.semaphore:
+            # Deadline for the whole request, not just each connect/read
+            response = await asyncio.wait_for(self.http_client.get(url, params=params), timeout)
+        if response.status_code == 200:
+            return response.json()
+        return None
+    
+    async def get_fda_drug_info(self, drug_name: str) -> Optional[Dict]:
         """
         Get FDA drug information
         """
         try:
             # Search for drug in FDA database
-            response = requests.get(
+            data = await self._get_json(
                 f"{self.fda_api_base}/label.json",
-                params={
+                {
                     "search": f"openfda.generic_name:\"{drug_name}\" OR openfda.brand_name:\"{drug_name}\"",
                     "limit": 1
                 },
-                timeout=10
+                MEDICINE_DB_FDA_TIMEOUT
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('results'):
-                    return data['results'][0]
+            if data and data.get('results'):
+                return data['results'][0]
             
             return None
-            
+        
         except Exception as e:
-            print(f"FDA API error: {e}")
+            print(f"FDA API error: {e!r}")
             return None
     
-    def get_rxnav_drug_info(self, drug_name: str) -> Optional[Dict]:
+    async def get_rxnav_drug_info(self, drug_name: str) -> Optional[Dict]:
         """
         Get RxNav drug information
         """
         try:
             # Search for drug in RxNav
-            response = requests.get(
+            data = await self._get_json(
                 f"{self.rxnav_api_base}/drugs.json",
-                params={"name": drug_name},
-                timeout=10
+                {"name": drug_name},
+                MEDICINE_DB_RXNAV_TIMEOUT
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('drugGroup', {}).get('conceptGroup'):
-                    return data['drugGroup']
+            if data and data.get('drugGroup', {}).get('conceptGroup'):
+                return data['drugGroup']
             
             return None
-            
+        
         except Exception as e:
-            print(f"RxNav API error: {e}")
+            print(f"RxNav API error: {e!r}")
             return None
     
-    def cross_verify_medicine(self, medicine_name: str, gpt_info: Dict) -> Dict:
+    def _verify_locally(self, verified_info: Dict, entry: Dict) -> Dict:
         """
-        Cross-verify medicine information with FDA and RxNav databases
+        Fill in verification fields from a local drug index entry
+        """
+        verified_info['verification_sources'] = []
+        if 'FDA' in entry['sources']:
+            verified_info['fda_verified'] = True
+            verified_info['fda_source'] = 'FDA Database'
+            verified_info['verification_sources'].append('FDA')
+        if 'RxNorm' in entry['sources']:
+            verified_info['rxnav_verified'] = True
+            verified_info['rxnav_source'] = 'RxNav Database'
+            verified_info['verification_sources'].append('RxNav')
+        
+        if entry['generic_name']:
+            verified_info['generic_name'] = entry['generic_name']
+        if entry['brand_names']:
+            verified_info['brand_names'] = entry['brand_names']
+        
+        verified_info['verified'] = True
+        verified_info['verification_mode'] = 'local'
+        return verified_info
+    
+    async def cross_verify_medicine(self, medicine_name: str, gpt_info: Dict) -> Dict:
+        """
+        Cross-verify medicine information with FDA and RxNav data.
+        
+        The local drug index is checked first; FDA and RxNav are queried
+        (both at the same time) only for names it does not contain, or
+        when no index has been built
         """
         verified_info = gpt_info.copy()
         
-        # Try FDA database
-        fda_info = self.get_fda_drug_info(medicine_name)
+        entry = drug_index.lookup(medicine_name)
+        if entry is not None:
+            return self._verify_locally(verified_info, entry)
+        
+        if drug_index.available and not DRUG_INDEX_REMOTE_FALLBACK:
+            verified_info['verified'] = False
+            verified_info['verification_sources'] = []
+            verified_info['verification_mode'] = 'local'
+            return verified_info
+        
+        fda_info, rxnav_info = await asyncio.gather(
+            self.get_fda_drug_info(medicine_name),
+            self.get_rxnav_drug_info(medicine_name)
+        )
+        
+        # FDA database
         if fda_info:
             verified_info['fda_verified'] = True
             verified_info['fda_source'] = 'FDA Database'
@@ -77,8 +141,7 @@ class MedicineDatabase:
                 if 'brand_name' in openfda:
                     verified_info['brand_names'] = openfda['brand_name']
         
-        # Try RxNav database
-        rxnav_info = self.get_rxnav_drug_info(medicine_name)
+        # RxNav database
         if rxnav_info:
             verified_info['rxnav_verified'] = True
             verified_info['rxnav_source'] = 'RxNav Database'
@@ -86,6 +149,7 @@ class MedicineDatabase:
         # Add verification status
         verified_info['verified'] = bool(fda_info or rxnav_info)
         verified_info['verification_sources'] = []
+        verified_info['verification_mode'] = 'remote'
         
         if fda_info:
             verified_info['verification_sources'].append('FDA')
@@ -94,39 +158,65 @@ class MedicineDatabase:
         
         return verified_info
     
-    def get_medicine_interactions(self, medicine_name: str) -> List[str]:
+    async def cross_verify_medicines(self, medicines_info: List[Dict]) -> List[Dict]:
+        """
+        Cross-verify a list of medicine information dictionaries concurrently
+        
+        Args:
+            medicines_info: Medicine information with a `name` each
+        
+        Returns:
+            Verified information, in the same order
+        """
+        return list(await asyncio.gather(*[
+            self.cross_verify_medicine(info.get("name", "Unknown"), info)
+            for info in medicines_info
+        ]))
+    
+    async def get_medicine_interactions(self, medicine_name: str) -> List[str]:
         """
-        Get drug interactions from FDA database
+        Get drug interactions from FDA labels, in the local drug index
+        if it has the medicine, otherwise from the FDA API
         """
+        local_interactions = drug_index.interactions(medicine_name)
+        if local_interactions is not None:
+            return local_interactions
+        if drug_index.available and not DRUG_INDEX_REMOTE_FALLBACK:
+            return []
+        
         try:
-            response = requests.get(
+            data = await self._get_json(
                 f"{self.fda_api_base}/label.json",
-                params={
+                {
                     "search": f"openfda.generic_name:\"{medicine_name}\"",
                     "limit": 1
                 },
-                timeout=10
+                MEDICINE_DB_FDA_TIMEOUT
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('results'):
-                    label = data['results'][0]
-                    
-                    # Extract drug interactions
-                    interactions = []
-                    if 'drug_interactions' in label:
-                        interactions.append(label['drug_interactions'][0])
-                    if 'drug_interactions_table' in label:
-                        interactions.append(label['drug_interactions_table'][0])
-                    
-                    return interactions
+            if data and data.get('results'):
+                label = data['results'][0]
+                
+                # Extract drug interactions
+                interactions = []
+                if 'drug_interactions' in label:
+                    interactions.append(label['drug_interactions'][0])
+                if 'drug_interactions_table' in label:
+                    interactions.append(label['drug_interactions_table'][0])
+                
+                return interactions
             
             return []
-            
+        
         except Exception as e:
-            print(f"Interaction lookup error: {e}")
+            print(f"Interaction lookup error: {e!r}")
             return []
+    
+    async def aclose(self):
+        """
+        Close pooled connections
+        """
+        await self.http_client.aclose()
 
 # Global medicine database instance
-medicine_db = MedicineDatabase() 
\ No newline at end of file
+medicine_db = MedicineDatabase()
@@ -1,11 +1,333 @@
 from PIL import Image
 import pytesseract
+import numpy as np
 import io
-import base64
-from typing import Optional
+import os
+import time
+import math
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Optional, Dict, List, Tuple, Union
+
+from utils.cache import TwoTierCache
+from utils.ocr_engines import OCR_ENGINE, select_ocr_engine
+from utils.image_ingest import SpooledImage
+from utils.documents import OCR_MAX_DOCUMENT_PAGES, count_pages, render_page
+
+# OCR worker pool configuration
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "32"))
+OCR_BATCH_MAX_FILES = int(os.getenv("OCR_BATCH_MAX_FILES", "20"))
+
+# OCR result cache configuration
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "256"))
+OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", "86400"))
+OCR_CACHE_REDIS = os.getenv("OCR_CACHE_REDIS", "true").lower() == "true"
+
+# Image preprocessing configuration
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() == "true"
+OCR_PREPROCESS_STAGES = os.getenv("OCR_PREPROCESS_STAGES", "downscale,grayscale,threshold,deskew,crop")
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+
+# Text-region detection configuration
+OCR_REGION_DETECTION = os.getenv("OCR_REGION_DETECTION", "true").lower() == "true"
+OCR_REGION_THREADS = int(os.getenv("OCR_REGION_THREADS", "2"))
+
+# Adaptive two-tier OCR configuration
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "true").lower() == "true"
+OCR_FAST_DPI = int(os.getenv("OCR_FAST_DPI", "150"))
+OCR_FAST_PSM = int(os.getenv("OCR_FAST_PSM", "6"))
+OCR_FAST_MIN_CONFIDENCE = float(os.getenv("OCR_FAST_MIN_CONFIDENCE", "80"))
+OCR_FAST_MIN_WORDS = int(os.getenv("OCR_FAST_MIN_WORDS", "5"))
+
+class ImagePreprocessor:
+    """
+    NumPy preprocessing pipeline that prepares photos for Tesseract.
+    
+    Stages run in a fixed order and can be enabled individually:
+    downscale -> grayscale -> threshold -> deskew -> crop.
+    Every stage is timed so its cost can be compared against the OCR time it saves.
+    """
+    STAGE_ORDER = ["downscale", "grayscale", "threshold", "deskew", "crop"]
+    
+    def __init__(
+        self,
+        stages: Optional[List[str]] = None,
+        target_dpi: int = OCR_TARGET_DPI,
+        page_width_inches: float = 8.5,
+        threshold_block_size: int = 31,
+        threshold_offset: int = 10,
+        max_skew_angle: float = 5.0,
+        skew_step: float = 0.5,
+        crop_margin: int = 10
+    ):
+        if stages is None:
+            stages = [stage.strip() for stage in OCR_PREPROCESS_STAGES.split(",") if stage.strip()]
+        unknown = set(stages) - set(self.STAGE_ORDER)
+        if unknown:
+            raise ValueError(f"Unknown preprocessing stages: {', '.join(sorted(unknown))}")
+        
+        self.stages = [stage for stage in self.STAGE_ORDER if stage in stages]
+        self.target_dpi = target_dpi
+        self.page_width_inches = page_width_inches
+        self.threshold_block_size = threshold_block_size | 1  # must be odd
+        self.threshold_offset = threshold_offset
+        self.max_skew_angle = max_skew_angle
+        self.skew_step = skew_step
+        self.crop_margin = crop_margin
+    
+    def process(self, image: Image.Image) -> Tuple[Image.Image, Dict[str, float]]:
+        """
+        Run the enabled stages on an image
+        
+        Args:
+            image: PIL image as decoded from the upload
+            
+        Returns:
+            Tuple of (processed PIL image, per-stage timings in milliseconds)
+        """
+        timings = {}
+        pixels = None
+        
+        for stage in self.stages:
+            start = time.perf_counter()
+            
+            if stage == "downscale":
+                image = self._downscale(image)
+            elif stage == "grayscale":
+                pixels = self._to_grayscale(image if pixels is None else pixels)
+            elif stage == "threshold":
+                if pixels is None:
+                    pixels = self._to_grayscale(image)
+                pixels = self._adaptive_threshold(pixels)
+            elif stage == "deskew":
+                if pixels is None:
+                    pixels = self._to_grayscale(image)
+                pixels = self._deskew(pixels)
+            elif stage == "crop":
+                if pixels is None:
+                    pixels = self._to_grayscale(image)
+                pixels = self._crop_borders(pixels)
+            
+            timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+        
+        if pixels is not None:
+            image = Image.fromarray(pixels)
+        
+        return image, timings
+    
+    def _downscale(self, image: Image.Image) -> Image.Image:
+        # Use embedded DPI when present, otherwise assume the photo spans a page width
+        source_dpi = None
+        dpi_info = image.info.get('dpi')
+        if dpi_info and dpi_info[0]:
+            source_dpi = float(dpi_info[0])
+        if not source_dpi or source_dpi <= 72:
+            source_dpi = min(image.size) / self.page_width_inches
+        
+        scale = self.target_dpi / source_dpi
+        if scale >= 1:
+            return image
+        
+        new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        # Integer box reduction first keeps the resampling filter cheap on 12MP+ photos
+        factor = int(1 / scale)
+        if factor >= 2:
+            image = image.reduce(factor)
+        return image.resize(new_size, Image.BILINEAR)
+    
+    def _to_grayscale(self, image) -> np.ndarray:
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                return image
+            rgb = image[..., :3].astype(np.float32)
+            gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+            return np.clip(gray, 0, 255).astype(np.uint8)
+        # PIL applies the same ITU-R 601 luma weights in C, which is much faster on large photos
+        return np.asarray(image.convert('L'), dtype=np.uint8)
+    
+    def _adaptive_threshold(self, gray: np.ndarray) -> np.ndarray:
+        # Local mean threshold computed with an integral image (O(1) per pixel).
+        # uint32 wrap-around cancels out in the window differences, so overflow is harmless.
+        block = self.threshold_block_size
+        pad = block // 2
+        height, width = gray.shape
+        
+        padded = np.pad(gray.astype(np.uint32), pad, mode='edge')
+        integral = np.pad(padded.cumsum(axis=0, dtype=np.uint32).cumsum(axis=1, dtype=np.uint32), ((1, 0), (1, 0)))
+        window_sums = (
+            integral[block:block + height, block:block + width]
+            - integral[0:height, block:block + width]
+            - integral[block:block + height, 0:width]
+            + integral[0:height, 0:width]
+        )
+        local_mean = window_sums.astype(np.float32) / float(block * block)
+        
+        return np.where(gray > local_mean - self.threshold_offset, 255, 0).astype(np.uint8)
+    
+    def _estimate_skew(self, pixels: np.ndarray) -> float:
+        # Projection-profile search: the right angle makes text rows collapse into sharp peaks
+        step = max(1, max(pixels.shape) // 800)
+        sample = pixels[::step, ::step]
+        ys, xs = np.nonzero(sample < 128)
+        if len(ys) < 50:
+            return 0.0
+        
+        ys = ys.astype(np.float64)
+        xs = xs.astype(np.float64)
+        best_angle, best_score = 0.0, -1.0
+        for angle in np.arange(-self.max_skew_angle, self.max_skew_angle + self.skew_step / 2, self.skew_step):
+            projected = ys - xs * np.tan(np.radians(angle))
+            histogram = np.bincount(np.round(projected - projected.min()).astype(np.int64))
+            score = float(np.sum(histogram.astype(np.float64) ** 2))
+            if score > best_score:
+                best_angle, best_score = float(angle), score
+        
+        return best_angle
+    
+    def _deskew(self, pixels: np.ndarray) -> np.ndarray:
+        angle = self._estimate_skew(pixels)
+        if abs(angle) < self.skew_step / 2:
+            return pixels
+        rotated = Image.fromarray(pixels).rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=255)
+        return np.asarray(rotated)
+    
+    def _crop_borders(self, pixels: np.ndarray) -> np.ndarray:
+        ink = pixels < 128
+        rows = np.nonzero(ink.mean(axis=1) > 0.002)[0]
+        cols = np.nonzero(ink.mean(axis=0) > 0.002)[0]
+        if len(rows) == 0 or len(cols) == 0:
+            return pixels
+        
+        top = max(0, rows[0] - self.crop_margin)
+        bottom = min(pixels.shape[0], rows[-1] + self.crop_margin + 1)
+        left = max(0, cols[0] - self.crop_margin)
+        right = min(pixels.shape[1], cols[-1] + self.crop_margin + 1)
+        return pixels[top:bottom, left:right]
+
+class TextRegionDetector:
+    """
+    Finds the blocks of a page that contain text using recursive XY-cuts.
+    
+    Works on a downsampled ink mask: rows with no ink split the page into
+    bands, wide ink-free columns split bands into blocks. Scanner speckle is
+    removed first, since a single speck would otherwise mark its whole row
+    and column as inked: cells need `min_cell_density` ink to count, and a
+    2x2 morphological opening drops what is left of isolated specks. Tiny or
+    sparse blocks, and blocks shorter than half a text line (rules, fold
+    lines), are dropped so Tesseract never sees them.
+    """
+    def __init__(
+        self,
+        working_size: int = 800,
+        min_row_gap: int = 6,
+        min_col_gap: int = 12,
+        min_block_area: int = 40,
+        min_ink_density: float = 0.02,
+        padding: int = 8,
+        max_coverage: float = 0.85,
+        min_cell_density: float = 0.3,
+        min_block_height: float = 0.5
+    ):
+        self.working_size = working_size
+        self.min_row_gap = min_row_gap
+        self.min_col_gap = min_col_gap
+        self.min_block_area = min_block_area
+        self.min_ink_density = min_ink_density
+        self.padding = padding
+        self.max_coverage = max_coverage
+        self.min_cell_density = min_cell_density
+        self.min_block_height = min_block_height
+    
+    def _ink_mask(self, pixels: np.ndarray) -> np.ndarray:
+        # Binarised input is used as-is; plain grayscale gets a global threshold below the mean
+        unique = np.unique(pixels[::17, ::17])
+        if len(unique) <= 2:
+            return pixels < 128
+        return pixels < (pixels.mean() - 2 * pixels.std() / 3)
+    
+    def _runs(self, profile: np.ndarray, min_gap: int) -> List[Tuple[int, int]]:
+        """
+        Start/end indices of inked runs, joining runs separated by less than min_gap
+        """
+        inked = np.flatnonzero(profile)
+        if len(inked) == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(inked) > min_gap)
+        starts = np.concatenate(([inked[0]], inked[breaks + 1]))
+        ends = np.concatenate((inked[breaks], [inked[-1]])) + 1
+        return list(zip(starts.tolist(), ends.tolist()))
+    
+    def _downsample(self, mask: np.ndarray, step: int) -> np.ndarray:
+        # Ink fraction per cell: strokes cover a good part of their cells, a speck only a pixel or two
+        height = mask.shape[0] - mask.shape[0] % step
+        width = mask.shape[1] - mask.shape[1] % step
+        cells = mask[:height, :width].reshape(height // step, step, width // step, step)
+        return cells.sum(axis=(1, 3), dtype=np.int32) >= math.ceil(self.min_cell_density * step * step)
+    
+    def _open(self, mask: np.ndarray) -> np.ndarray:
+        """
+        2x2 morphological opening: keeps ink only where a full 2x2 square fits
+        """
+        if mask.shape[0] < 2 or mask.shape[1] < 2:
+            return np.zeros_like(mask)
+        eroded = mask[:-1, :-1] & mask[1:, :-1] & mask[:-1, 1:] & mask[1:, 1:]
+        opened = np.zeros_like(mask)
+        opened[:-1, :-1] |= eroded
+        opened[1:, :-1] |= eroded
+        opened[:-1, 1:] |= eroded
+        opened[1:, 1:] |= eroded
+        return opened
+    
+    def detect(self, pixels: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Locate text blocks
+        
+        Args:
+            pixels: Grayscale or binarised page as a 2-D uint8 array
+            
+        Returns:
+            (left, top, right, bottom) boxes in full-resolution pixels, in
+            reading order. Empty if the page should be OCRed as a whole.
+        """
+        height, width = pixels.shape
+        # At least 2x2 pixels per cell, so a one-pixel speck never fills a cell
+        step = max(2, max(height, width) // self.working_size)
+        mask = self._open(self._downsample(self._ink_mask(pixels), step))
+        
+        # Merge consecutive text lines into one block: gaps up to ~1.5 line heights
+        row_profile = mask.any(axis=1)
+        lines = self._runs(row_profile, 1)
+        if not lines:
+            return []
+        line_height = float(np.median([end - start for start, end in lines]))
+        row_gap = max(self.min_row_gap, int(line_height * 1.5))
+        
+        boxes = []
+        for top, bottom in self._runs(row_profile, row_gap):
+            band = mask[top:bottom]
+            for left, right in self._runs(band.any(axis=0), self.min_col_gap):
+                block = band[:, left:right]
+                if block.size < self.min_block_area or block.mean() < self.min_ink_density:
+                    continue
+                if block.any(axis=1).sum() < self.min_block_height * line_height:
+                    continue
+                boxes.append((
+                    max(0, left * step - self.padding),
+                    max(0, top * step - self.padding),
+                    min(width, right * step + self.padding),
+                    min(height, bottom * step + self.padding)
+                ))
+        
+        covered = sum((right - left) * (bottom - top) for left, top, right, bottom in boxes)
+        if not boxes or covered > self.max_coverage * width * height:
+            return []
+        return boxes
 
 class OCRProcessor:
-    def __init__(self):
+    def __init__(self, engine: str = OCR_ENGINE):
         # Configure Tesseract path for different OS
         import os
         import sys
@@ -51,24 +373,73 @@ class OCRProcessor:
         except Exception as e:
             print(f"Error configuring Tesseract: {str(e)}")
             self.tesseract_installed = False
+        
+        # Prefer a persistent in-process engine, falling back to the CLI
+        self.engine = select_ocr_engine(engine, self.tesseract_installed)
+        if self.engine is not None:
+            print(f"OCR engine: {self.engine.name}")
+        
+        self.preprocess = OCR_PREPROCESS
+        self.preprocessor = ImagePreprocessor()
+        self.detect_regions = OCR_REGION_DETECTION
+        self.region_detector = TextRegionDetector()
+        self.region_threads = max(1, OCR_REGION_THREADS)
+        self._region_executor: Optional[ThreadPoolExecutor] = None
+        self.adaptive = OCR_ADAPTIVE
+        self.fast_preprocessor = ImagePreprocessor(stages=["downscale", "grayscale"], target_dpi=OCR_FAST_DPI)
     
-    def extract_text_from_image(self, image_data: bytes) -> str:
+    def extract_text_from_image(self, image_data: Union[bytes, str], preprocess: Optional[bool] = None) -> str:
         """
         Extract text from image using Tesseract OCR
         
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes, or the path of a spooled image file
+            preprocess: Override the configured preprocessing setting
             
         Returns:
             Extracted text string
         """
+        return self.extract_text_with_timings(image_data, preprocess)["text"]
+    
+    def extract_text_with_timings(
+        self,
+        image_data: Union[bytes, str, Image.Image],
+        preprocess: Optional[bool] = None,
+        detect_regions: Optional[bool] = None,
+        adaptive: Optional[bool] = None
+    ) -> Dict:
+        """
+        Extract text from image and report how long each step took
+        
+        In adaptive mode a cheap pass (downscaled, single-block segmentation)
+        runs first; the full-resolution path only runs when its mean word
+        confidence or word count is below the configured thresholds.
+        
+        Args:
+            image_data: Raw image bytes, the path of a spooled image file,
+                or an already decoded page
+            preprocess: Override the configured preprocessing setting
+            detect_regions: Override the configured text-region detection setting
+            adaptive: Override the configured adaptive two-tier setting
+            
+        Returns:
+            Dictionary with the extracted text, the tier that produced it
+            ("fast" or "full"), mean word confidence, per-word boxes and
+            confidences (in the coordinates of the image Tesseract saw),
+            number of OCRed regions and timings in milliseconds
+        """
         try:
             # Check if Tesseract is installed
-            if not self.tesseract_installed:
+            if self.engine is None:
                 raise Exception("Tesseract OCR is not installed. Please install Tesseract to use OCR functionality.")
                 
-            # Open image from bytes
-            image = Image.open(io.BytesIO(image_data))
+            # Open image from a spooled file path or from bytes
+            if isinstance(image_data, Image.Image):
+                image = image_data
+            elif isinstance(image_data, str):
+                image = Image.open(image_data)
+            else:
+                image = Image.open(io.BytesIO(image_data))
             
             # Convert to RGB if necessary
             if image.mode != 'RGB':
@@ -77,8 +448,40 @@ class OCRProcessor:
             # Print debug info
             print(f"Image mode: {image.mode}, Size: {image.size}")
             
+            timings = {}
+            fast_pass = None
+            if self.adaptive if adaptive is None else adaptive:
+                fast_pass = self._fast_pass(image)
+                timings.update(fast_pass["timings"])
+                if fast_pass["accepted"]:
+                    return {
+                        "text": self._clean_ocr_text(fast_pass["text"]),
+                        "tier": "fast",
+                        "mean_confidence": fast_pass["mean_confidence"],
+                        "word_count": len(fast_pass["words"]),
+                        "words": fast_pass["words"],
+                        "region_count": 1,
+                        "timings": timings
+                    }
+            
+            if self.preprocess if preprocess is None else preprocess:
+                image, stage_timings = self.preprocessor.process(image)
+                timings.update(stage_timings)
+            
+            regions = []
+            if self.detect_regions if detect_regions is None else detect_regions:
+                start = time.perf_counter()
+                regions = self.region_detector.detect(self.preprocessor._to_grayscale(image))
+                timings["regions"] = round((time.perf_counter() - start) * 1000, 2)
+            
             # Extract text using Tesseract
-            text = pytesseract.image_to_string(image)
+            start = time.perf_counter()
+            if regions:
+                text, words = self._ocr_regions(image, regions)
+            else:
+                data = self.engine.image_to_data(image)
+                text, words = data["text"], data["words"]
+            timings["ocr"] = round((time.perf_counter() - start) * 1000, 2)
             
             # Check if text is None
             if text is None:
@@ -87,7 +490,15 @@ class OCRProcessor:
             # Clean up the text
             cleaned_text = self._clean_ocr_text(text)
             
-            return cleaned_text
+            return {
+                "text": cleaned_text,
+                "tier": "full",
+                "mean_confidence": self._mean_confidence(words),
+                "word_count": len(words),
+                "words": words,
+                "region_count": len(regions) or 1,
+                "timings": timings
+            }
             
         except Exception as e:
             # Print detailed error
@@ -96,6 +507,57 @@ class OCRProcessor:
             print(traceback.format_exc())
             raise Exception(f"OCR processing failed: {str(e)}")
     
+    def _fast_pass(self, image: Image.Image) -> Dict:
+        """
+        Cheap OCR tier: downscaled grayscale image, single-block segmentation,
+        word confidences from image_to_data
+        """
+        small, stage_timings = self.fast_preprocessor.process(image)
+        timings = {f"fast_{stage}": ms for stage, ms in stage_timings.items()}
+        
+        start = time.perf_counter()
+        data = self.engine.image_to_data(small, psm=OCR_FAST_PSM)
+        timings["fast_ocr"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        mean_confidence = self._mean_confidence(data["words"])
+        accepted = mean_confidence >= OCR_FAST_MIN_CONFIDENCE and len(data["words"]) >= OCR_FAST_MIN_WORDS
+        
+        return {
+            "text": data["text"] or "",
+            "words": data["words"],
+            "accepted": accepted,
+            "mean_confidence": mean_confidence,
+            "timings": timings
+        }
+    
+    def _mean_confidence(self, words: List[Dict]) -> float:
+        """
+        Average Tesseract word confidence (0-100), 0 when nothing was recognised
+        """
+        if not words:
+            return 0.0
+        return round(sum(word["confidence"] for word in words) / len(words), 2)
+    
+    def _ocr_regions(self, image: Image.Image, regions: List[Tuple[int, int, int, int]]) -> Tuple[str, List[Dict]]:
+        """
+        OCR each detected block in parallel and join them in reading order.
+        Word boxes are shifted back into page coordinates.
+        """
+        crops = [image.crop(box) for box in regions]
+        if len(crops) == 1 or self.region_threads == 1:
+            results = [self.engine.image_to_data(crop, psm=6) for crop in crops]
+        else:
+            # Tesseract releases the GIL (tesserocr) or runs as a subprocess (pytesseract)
+            if self._region_executor is None:
+                self._region_executor = ThreadPoolExecutor(max_workers=self.region_threads)
+            results = list(self._region_executor.map(lambda crop: self.engine.image_to_data(crop, psm=6), crops))
+        
+        words = []
+        for (left, top, _, _), data in zip(regions, results):
+            for word in data["words"]:
+                words.append({**word, "left": word["left"] + left, "top": word["top"] + top})
+        return "\n".join(data["text"] for data in results if data["text"]), words
+    
     def _clean_ocr_text(self, text: str) -> str:
         """
         Clean and format OCR extracted text
@@ -121,38 +583,234 @@ class OCRProcessor:
                 cleaned_lines.append(cleaned_line)
         
         return '\n'.join(cleaned_lines)
+
+class OCRQueueFullError(Exception):
+    """Raised when the OCR worker pool cannot accept more pending jobs"""
+    pass
+
+def image_digest(image_data: bytes) -> str:
+    """
+    Content address for decoded image bytes, used as the OCR cache key
+    """
+    return hashlib.sha256(image_data).hexdigest()
+
+def _worker_source(source: Union[bytes, memoryview, str]) -> Union[bytes, bytearray, str]:
+    """
+    A SpooledImage source in a form that can be sent to a worker process:
+    a memoryview cannot be pickled, the buffer behind it can, without a copy
+    """
+    return source.obj if isinstance(source, memoryview) else source
+
+def _run_ocr_job(image_data: Union[bytes, str]) -> Dict:
+    """
+    Entry point executed inside an OCR worker process
+    """
+    return ocr_processor.extract_text_with_timings(image_data)
+
+def _run_document_page_job(source: Union[bytes, str], kind: str, index: int) -> Dict:
+    """
+    Entry point executed inside an OCR worker process for one document page.
+    The page is rasterized in the worker so only one page is decoded at a time.
+    """
+    start = time.perf_counter()
+    page = render_page(source, kind, index)
+    rasterize_ms = round((time.perf_counter() - start) * 1000, 2)
+    
+    result = ocr_processor.extract_text_with_timings(page)
+    result["timings"] = {"rasterize": rasterize_ms, **result["timings"]}
+    return result
+
+class OCRWorkerPool:
+    """
+    Bounded process pool that runs Tesseract off the event loop.
+    
+    At most `max_workers` images are processed at once; further requests
+    wait in line, up to `max_queue` of them, before being rejected. If a
+    worker process dies (crash, OOM kill), the calls on that pool fail and
+    the next call starts a fresh pool.
+    """
+    def __init__(self, max_workers: int = OCR_WORKERS, max_queue: int = OCR_MAX_QUEUE, cache: Optional[TwoTierCache] = None):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.cache = cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._running = 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so each gunicorn worker (forked after --preload) owns its pool
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+    
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        # Only the first failed call replaces the pool; the others saw the same one break
+        if self._executor is executor:
+            print("OCR worker process died, starting a new pool")
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
     
-    def extract_text_from_base64(self, base64_string: str) -> str:
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+    
+    async def run(self, func, *args):
         """
-        Extract text from base64 encoded image
+        Run a picklable function on the pool and await its result
         
         Args:
-            base64_string: Base64 encoded image string
+            func: Module-level function to execute in a worker process
+            *args: Arguments passed to the function
             
         Returns:
-            Extracted text string
+            The function's return value
         """
+        if self._pending >= self.max_workers + self.max_queue:
+            raise OCRQueueFullError("OCR service is busy. Please try again shortly.")
+        
+        self._pending += 1
         try:
-            # Check if base64_string is None
-            if base64_string is None:
-                print("Error: base64_string is None")
-                return ""
-                
-            # Remove data URL prefix if present
-            if isinstance(base64_string, str) and base64_string.startswith('data:image'):
-                base64_string = base64_string.split(',')[1]
+            async with self._get_slots():
+                self._running += 1
+                executor = self._get_executor()
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(executor, func, *args)
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    raise
+                finally:
+                    self._running -= 1
+        finally:
+            self._pending -= 1
+    
+    async def extract(self, image_data: Union[bytes, SpooledImage]) -> Dict:
+        """
+        OCR an image without blocking the event loop and return the full result.
+        Identical images are served from the result cache without running OCR.
+        
+        Args:
+            image_data: Raw image bytes, or a SpooledImage whose file is
+                opened directly by the worker instead of being copied to it
             
-            # Decode base64 to bytes
-            image_data = base64.b64decode(base64_string)
+        Returns:
+            Dictionary with text, tier, mean_confidence, region_count, timings
+            and whether it came from the cache
+        """
+        digest = None
+        if isinstance(image_data, SpooledImage):
+            digest = image_data.digest
+            image_data = _worker_source(image_data.source())
+        
+        if self.cache is None:
+            result = await self.run(_run_ocr_job, image_data)
+            result["cached"] = False
+            return result
+        
+        if digest is None:
+            digest = image_digest(image_data)
+        cached_result = await self.cache.get(digest)
+        if cached_result is not None:
+            # Copy so the entry held by the local cache tier is never mutated
+            return {**cached_result, "cached": True}
+        
+        result = await self.run(_run_ocr_job, image_data)
+        await self.cache.set(digest, result)
+        return {**result, "cached": False}
+    
+    async def extract_text_from_image(self, image_data: Union[bytes, SpooledImage]) -> str:
+        """
+        Extract text from image bytes without blocking the event loop
+        
+        Args:
+            image_data: Raw image bytes, or a SpooledImage
             
-            return self.extract_text_from_image(image_data)
+        Returns:
+            Extracted text string
+        """
+        result = await self.extract(image_data)
+        return result["text"]
+    
+    async def extract_document(self, document: SpooledImage, kind: str) -> AsyncIterator[Dict]:
+        """
+        OCR a multi-page PDF or TIFF page by page, yielding each page in order
+        as soon as it is done.
+        
+        At most `max_workers` pages are in flight, and each worker rasterizes
+        only its own page, so memory stays bounded regardless of page count.
+        A failed page is yielded with an error instead of aborting the document.
+        
+        Args:
+            document: Spooled document upload
+            kind: "pdf" or "tiff" (see utils.documents.detect_document_kind)
             
-        except Exception as e:
-            # Print detailed error
-            import traceback
-            print(f"Base64 Error: {str(e)}")
-            print(traceback.format_exc())
-            raise Exception(f"Base64 image processing failed: {str(e)}")
+        Yields:
+            Dictionaries with page (1-based), page_count and either the OCR
+            result fields or an error message
+        """
+        source = _worker_source(document.source())
+        page_count = await asyncio.to_thread(count_pages, source, kind)
+        page_count = min(page_count, OCR_MAX_DOCUMENT_PAGES)
+        
+        async def ocr_page(index: int) -> Dict:
+            key = f"{document.digest}:{index}"
+            start = time.perf_counter()
+            try:
+                cached_result = await self.cache.get(key) if self.cache is not None else None
+                if cached_result is not None:
+                    result = {**cached_result, "cached": True}
+                else:
+                    result = await self.run(_run_document_page_job, source, kind, index)
+                    if self.cache is not None:
+                        await self.cache.set(key, result)
+                    result = {**result, "cached": False}
+            except Exception as e:
+                result = {"text": "", "error": str(e)}
+            result["page"] = index + 1
+            result["page_count"] = page_count
+            result["processing_time_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return result
+        
+        in_flight: List[asyncio.Task] = []
+        next_index = 0
+        try:
+            while next_index < page_count or in_flight:
+                while next_index < page_count and len(in_flight) < self.max_workers:
+                    in_flight.append(asyncio.create_task(ocr_page(next_index)))
+                    next_index += 1
+                yield await in_flight.pop(0)
+        finally:
+            for task in in_flight:
+                task.cancel()
+    
+    def stats(self) -> dict:
+        """
+        Current pool utilisation and cache counters
+        """
+        return {
+            "workers": self.max_workers,
+            "running": self._running,
+            "queued": self._pending - self._running,
+            "max_queue": self.max_queue,
+            "cache": self.cache.stats() if self.cache is not None else None
+        }
+    
+    def shutdown(self):
+        """
+        Stop worker processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
 
 # Global OCR processor instance
-ocr_processor = OCRProcessor()
\ No newline at end of file
+ocr_processor = OCRProcessor()
+
+# Global OCR result cache, keyed by image digest
+ocr_cache = TwoTierCache("ocr:result", max_entries=OCR_CACHE_SIZE, ttl=OCR_CACHE_TTL, use_redis=OCR_CACHE_REDIS)
+
+# Global OCR worker pool
+ocr_pool = OCRWorkerPool(cache=ocr_cache)
\ No newline at end of file
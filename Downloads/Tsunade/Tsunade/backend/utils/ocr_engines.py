@@ -0,0 +1,154 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from PIL import Image
+import pytesseract
+
+# OCR backend selection: auto, tesserocr or pytesseract
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+
+class PytesseractEngine:
+    """
+    Runs the tesseract CLI through pytesseract.
+
+    Every call forks a tesseract process that reloads the language model,
+    so this is the portable fallback rather than the fast path.
+    """
+    name = "pytesseract"
+
+    def __init__(self, language: str = OCR_LANGUAGE):
+        self.language = language
+
+    def image_to_string(self, image: Image.Image, psm: Optional[int] = None) -> str:
+        config = f"--psm {psm}" if psm is not None else ""
+        return pytesseract.image_to_string(image, lang=self.language, config=config)
+
+    def image_to_data(self, image: Image.Image, psm: Optional[int] = None) -> Dict[str, Any]:
+        config = f"--psm {psm}" if psm is not None else ""
+        data = pytesseract.image_to_data(
+            image, lang=self.language, config=config, output_type=pytesseract.Output.DICT
+        )
+
+        words = []
+        lines = {}
+        for index, word in enumerate(data["text"]):
+            word = (word or "").strip()
+            confidence = float(data["conf"][index])
+            if not word or confidence < 0:
+                continue
+            words.append({
+                "text": word,
+                "confidence": confidence,
+                "left": int(data["left"][index]),
+                "top": int(data["top"][index]),
+                "width": int(data["width"][index]),
+                "height": int(data["height"][index])
+            })
+            line_key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+            lines.setdefault(line_key, []).append(word)
+
+        text = "\n".join(" ".join(line_words) for line_words in lines.values())
+        return {"text": text, "words": words}
+
+class TesserocrEngine:
+    """
+    Keeps a long-lived libtesseract handle through the tesserocr C-API binding.
+
+    The traineddata is loaded once per process (and per thread), so each call
+    only pays for recognition. Handles are never shared across a fork: a
+    worker process that inherits one from its parent builds its own.
+    """
+    name = "tesserocr"
+
+    def __init__(self, language: str = OCR_LANGUAGE):
+        self.language = language
+        self._local = threading.local()
+        self.available = False
+        try:
+            import tesserocr
+            self._tesserocr = tesserocr
+            self._get_api()
+            self.available = True
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"tesserocr engine unavailable: {e}")
+
+    def _tessdata_path(self) -> Optional[str]:
+        prefix = os.environ.get('TESSDATA_PREFIX')
+        if prefix and os.path.isdir(prefix):
+            return prefix
+        return None
+
+    def _get_api(self):
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            path = self._tessdata_path()
+            if path:
+                api = self._tesserocr.PyTessBaseAPI(path=path, lang=self.language)
+            else:
+                api = self._tesserocr.PyTessBaseAPI(lang=self.language)
+            self._local.api = api
+            self._local.pid = pid
+        return self._local.api
+
+    def image_to_string(self, image: Image.Image, psm: Optional[int] = None) -> str:
+        api = self._get_api()
+        api.SetPageSegMode(self._tesserocr.PSM.AUTO if psm is None else psm)
+        api.SetImage(image)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def image_to_data(self, image: Image.Image, psm: Optional[int] = None) -> Dict[str, Any]:
+        tesserocr = self._tesserocr
+        api = self._get_api()
+        api.SetPageSegMode(tesserocr.PSM.AUTO if psm is None else psm)
+        api.SetImage(image)
+        try:
+            api.Recognize()
+            words: List[Dict[str, Any]] = []
+            iterator = api.GetIterator()
+            level = tesserocr.RIL.WORD
+            if iterator is not None:
+                for item in tesserocr.iterate_level(iterator, level):
+                    word = (item.GetUTF8Text(level) or "").strip()
+                    if not word:
+                        continue
+                    left, top, right, bottom = item.BoundingBox(level)
+                    words.append({
+                        "text": word,
+                        "confidence": float(item.Confidence(level)),
+                        "left": left,
+                        "top": top,
+                        "width": right - left,
+                        "height": bottom - top
+                    })
+            return {"text": api.GetUTF8Text(), "words": words}
+        finally:
+            api.Clear()
+
+def select_ocr_engine(preference: str = OCR_ENGINE, tesseract_cli_available: bool = False):
+    """
+    Pick the OCR backend to use
+
+    Args:
+        preference: "auto", "tesserocr" or "pytesseract"
+        tesseract_cli_available: Whether the tesseract binary was found for pytesseract
+
+    Returns:
+        Engine instance, or None if no backend is usable
+    """
+    if preference in ("auto", "tesserocr"):
+        engine = TesserocrEngine()
+        if engine.available:
+            return engine
+        if preference == "tesserocr":
+            print("WARNING: tesserocr requested but not available, falling back to pytesseract")
+
+    if tesseract_cli_available:
+        return PytesseractEngine()
+
+    return None
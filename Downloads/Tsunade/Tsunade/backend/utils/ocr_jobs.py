@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import uuid
+import base64
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.ocr import ocr_pool, OCRQueueFullError, OCR_WORKERS
+from utils.ocr_store import ocr_scan_store
+from utils.image_ingest import SpooledImage, Base64StreamDecoder
+
+# OCR job queue configuration
+OCR_JOB_QUEUE_DEPTH = int(os.getenv("OCR_JOB_QUEUE_DEPTH", "100"))
+OCR_JOB_CONSUMERS = int(os.getenv("OCR_JOB_CONSUMERS", str(OCR_WORKERS)))
+OCR_JOB_RESULT_TTL = int(os.getenv("OCR_JOB_RESULT_TTL", "3600"))
+# Seconds a consumer waits before handing a job to a full OCR worker pool again
+OCR_JOB_POOL_RETRY_DELAY = float(os.getenv("OCR_JOB_POOL_RETRY_DELAY", "0.5"))
+
+# Images are copied to and from Redis in pieces of this many bytes (a
+# multiple of 3, so the base64 of consecutive pieces concatenates cleanly)
+REDIS_IMAGE_CHUNK_BYTES = 48 * 1024
+
+# Checks the depth and queues the uploaded job in one step, so concurrent
+# submissions cannot push the queue past its limit
+PUSH_IF_ROOM_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) >= tonumber(ARGV[1]) then
+    redis.call('DEL', KEYS[2])
+    return 0
+end
+redis.call('RENAME', KEYS[2], KEYS[3])
+redis.call('EXPIRE', KEYS[3], tonumber(ARGV[3]))
+redis.call('LPUSH', KEYS[1], ARGV[2])
+return 1
+"""
+
+class InMemoryJobStore:
+    """
+    Job queue and results kept in this process.
+
+    Used when Redis is not reachable. Jobs are only visible to the API
+    worker that accepted them.
+    """
+    name = "memory"
+
+    def __init__(self, max_depth: int, result_ttl: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_depth)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.result_ttl = result_ttl
+
+    async def push(self, job_id: str, image: SpooledImage):
+        # The queued job keeps the spool itself; the consumer closes it
+        try:
+            self._queue.put_nowait((job_id, image))
+        except asyncio.QueueFull:
+            raise OCRQueueFullError("OCR job queue is full. Please try again shortly.")
+
+    async def pop(self, timeout: float) -> Optional[Tuple[str, Optional[SpooledImage]]]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def save(self, job: Dict[str, Any]):
+        self._jobs[job["job_id"]] = job
+        self._jobs.move_to_end(job["job_id"])
+
+        # Drop finished jobs whose results have expired
+        cutoff = time.time() - self.result_ttl
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if oldest["created_at"] >= cutoff:
+                break
+            self._jobs.popitem(last=False)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    async def delete(self, job_id: str):
+        self._jobs.pop(job_id, None)
+
+class RedisJobStore:
+    """
+    Job queue in a Redis list, shared by every API worker.
+    """
+    name = "redis"
+    queue_key = "ocr:jobs:queue"
+
+    def __init__(self, client, max_depth: int, result_ttl: int):
+        self.client = client
+        self.max_depth = max_depth
+        self.result_ttl = result_ttl
+        self._push_if_room = client.register_script(PUSH_IF_ROOM_SCRIPT)
+
+    def _job_key(self, job_id: str) -> str:
+        return f"ocr:job:{job_id}"
+
+    def _image_key(self, job_id: str) -> str:
+        return f"ocr:job:{job_id}:image"
+
+    def _upload_key(self, job_id: str) -> str:
+        return f"ocr:job:{job_id}:upload"
+
+    async def push(self, job_id: str, image: SpooledImage):
+        """
+        Copy the image to Redis piece by piece, then queue the job if there
+        is room. The spool is closed once copied.
+        """
+        full = OCRQueueFullError("OCR job queue is full. Please try again shortly.")
+        upload_key = self._upload_key(job_id)
+        try:
+            # Cheap early rejection; the script below makes the final decision
+            if await self.client.llen(self.queue_key) >= self.max_depth:
+                raise full
+            # The shared client decodes responses as UTF-8, so images are stored base64 encoded
+            await self.client.set(upload_key, "", ex=self.result_ttl)
+            for chunk in image.chunks(REDIS_IMAGE_CHUNK_BYTES):
+                await self.client.append(upload_key, base64.b64encode(chunk).decode())
+            pushed = await self._push_if_room(
+                keys=[self.queue_key, upload_key, self._image_key(job_id)],
+                args=[self.max_depth, job_id, self.result_ttl]
+            )
+        except OCRQueueFullError:
+            raise
+        except Exception:
+            try:
+                await self.client.delete(upload_key)
+            except Exception:
+                pass
+            raise
+        finally:
+            image.close()
+        if not pushed:
+            raise full
+
+    async def pop(self, timeout: float) -> Optional[Tuple[str, Optional[SpooledImage]]]:
+        item = await self.client.brpop(self.queue_key, timeout=max(1, int(timeout)))
+        if item is None:
+            return None
+        job_id = item[1]
+        image_key = self._image_key(job_id)
+        length = await self.client.strlen(image_key)
+        if not length:
+            return job_id, None
+
+        # Decoded piece by piece into a spool, never held whole in memory
+        image = SpooledImage()
+        decoder = Base64StreamDecoder()
+        step = REDIS_IMAGE_CHUNK_BYTES // 3 * 4
+        try:
+            for start in range(0, length, step):
+                encoded = await self.client.getrange(image_key, start, start + step - 1)
+                image.write(decoder.feed(encoded.encode()))
+            image.write(decoder.flush())
+            await self.client.delete(image_key)
+        except Exception:
+            image.close()
+            raise
+        return job_id, image.finish()
+
+    async def depth(self) -> int:
+        return await self.client.llen(self.queue_key)
+
+    async def save(self, job: Dict[str, Any]):
+        await self.client.set(self._job_key(job["job_id"]), json.dumps(job), ex=self.result_ttl)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def delete(self, job_id: str):
+        await self.client.delete(self._job_key(job_id))
+
+class OCRJobQueue:
+    """
+    Accepts OCR jobs immediately and processes them in the background.
+
+    Jobs are queued in Redis when it is available, otherwise in memory.
+    Consumers feed the OCR worker pool, waiting while the pool is full;
+    once `max_depth` jobs are waiting, new submissions are rejected with
+    OCRQueueFullError. A store error fails at most the job being handled,
+    never the consumer.
+    """
+    def __init__(
+        self,
+        max_depth: int = OCR_JOB_QUEUE_DEPTH,
+        consumers: int = OCR_JOB_CONSUMERS,
+        result_ttl: int = OCR_JOB_RESULT_TTL,
+        pool_retry_delay: float = OCR_JOB_POOL_RETRY_DELAY
+    ):
+        self.max_depth = max(1, max_depth)
+        self.consumers = max(1, consumers)
+        self.result_ttl = result_ttl
+        self.pool_retry_delay = pool_retry_delay
+        self.store = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """
+        Choose a backend and start the consumer tasks
+        """
+        if self._tasks:
+            return
+
+        self.store = None
+        try:
+            from database.config import redis_client
+            if redis_client is not None:
+                await redis_client.ping()
+                self.store = RedisJobStore(redis_client, self.max_depth, self.result_ttl)
+        except Exception as e:
+            print(f"OCR job queue: Redis unavailable, using in-memory queue ({e})")
+
+        if self.store is None:
+            self.store = InMemoryJobStore(self.max_depth, self.result_ttl)
+
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.consumers)]
+        print(f"OCR job queue started ({self.store.name}, {self.consumers} consumers)")
+
+    async def stop(self):
+        """
+        Cancel the consumer tasks
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, image: SpooledImage) -> Dict[str, Any]:
+        """
+        Queue an image for OCR
+
+        Args:
+            image: Finished spool of the upload; the queue takes it over
+                and closes it
+
+        Returns:
+            The new job record
+
+        Raises:
+            OCRQueueFullError: `max_depth` jobs are already waiting
+        """
+        if self.store is None:
+            try:
+                await self.start()
+            except Exception:
+                image.close()
+                raise
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "text": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "completed_at": None,
+            "processing_time_ms": None
+        }
+        # Saved before it is queued, so a consumer always finds the record
+        try:
+            await self.store.save(job)
+        except Exception:
+            image.close()
+            raise
+        try:
+            await self.store.push(job["job_id"], image)
+        except Exception:
+            image.close()
+            # Do not leave a "queued" record for a job that will never run
+            try:
+                await self.store.delete(job["job_id"])
+            except Exception as e:
+                print(f"OCR job {job['job_id']}: could not delete unqueued record: {e}")
+            raise
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current state of a job, or None if unknown or expired
+        """
+        if self.store is None:
+            return None
+        return await self.store.load(job_id)
+
+    async def depth(self) -> int:
+        """
+        Number of jobs waiting for a consumer
+        """
+        if self.store is None:
+            return 0
+        return await self.store.depth()
+
+    async def _consume(self):
+        while True:
+            try:
+                item = await self.store.pop(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"OCR job queue read failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if item is None:
+                continue
+
+            job_id, image = item
+            try:
+                await self._process(job_id, image)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Store errors lose this job's status, not the consumer
+                print(f"OCR job {job_id} could not be processed: {e}")
+
+    async def _extract(self, image: SpooledImage) -> Dict[str, Any]:
+        # A full worker pool is backpressure, not a failure: wait for room
+        while True:
+            try:
+                return await ocr_pool.extract(image)
+            except OCRQueueFullError:
+                await asyncio.sleep(self.pool_retry_delay)
+
+    async def _process(self, job_id: str, image: Optional[SpooledImage]):
+        try:
+            await self._run_job(job_id, image)
+        finally:
+            if image is not None:
+                image.close()
+
+    async def _run_job(self, job_id: str, image: Optional[SpooledImage]):
+        job = await self.store.load(job_id)
+        if job is None:
+            return
+
+        job["status"] = "processing"
+        job["started_at"] = time.time()
+        await self.store.save(job)
+
+        start = time.perf_counter()
+        try:
+            if image is None:
+                raise Exception("Job image expired before processing")
+            result = await self._extract(image)
+            ocr_scan_store.record(result, size=image.size, format="job", digest=image.digest)
+            job["text"] = result["text"]
+            job["status"] = "completed"
+        except asyncio.CancelledError:
+            job["status"] = "failed"
+            job["error"] = "OCR service shut down before the job finished"
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                print(f"OCR job {job_id}: could not record shutdown: {e}")
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+
+        job["completed_at"] = time.time()
+        job["processing_time_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        await self.store.save(job)
+
+# Global OCR job queue
+ocr_job_queue = OCRJobQueue()
@@ -0,0 +1,150 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+# OCR result persistence configuration
+OCR_PERSIST_RESULTS = os.getenv("OCR_PERSIST_RESULTS", "true").lower() == "true"
+OCR_PERSIST_WORDS = os.getenv("OCR_PERSIST_WORDS", "true").lower() == "true"
+OCR_LOW_CONFIDENCE = float(os.getenv("OCR_LOW_CONFIDENCE", "60"))
+
+class OCRScanStore:
+    """
+    Records every OCR scan in the `prescription_images` Mongo collection,
+    filling the `ocr_results` fields of the PrescriptionImage schema.
+
+    Writes happen in background tasks so they never add request latency.
+    When MongoDB is not connected, scans are silently not recorded.
+    """
+    collection_name = "prescription_images"
+
+    def __init__(self, enabled: bool = OCR_PERSIST_RESULTS, store_words: bool = OCR_PERSIST_WORDS):
+        self.enabled = enabled
+        self.store_words = store_words
+        self._tasks: Set[asyncio.Task] = set()
+        self._indexed = False
+
+    def _get_collection(self):
+        try:
+            from database import config
+        except Exception:
+            return None
+        if config.mongo_db is None:
+            return None
+        return config.mongo_db[self.collection_name]
+
+    def build_document(self, result: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        PrescriptionImage document for an OCR result
+
+        Args:
+            result: Result from OCRWorkerPool.extract / extract_document
+            metadata: filename, size, format, digest, page and user_id of the upload
+        """
+        words = result.get("words") or []
+        timings = result.get("timings") or {}
+        cached = result.get("cached", False)
+        ocr_results = {
+            "extracted_text": result.get("text", ""),
+            "confidence_score": result.get("mean_confidence"),
+            # Cache hits carry the timings of the original scan but cost nothing
+            "processing_time": 0 if cached else round(sum(timings.values()), 2),
+            "tier": result.get("tier"),
+            "cached": cached,
+            "region_count": result.get("region_count"),
+            "word_count": len(words),
+            "low_confidence_words": sum(1 for word in words if word["confidence"] < OCR_LOW_CONFIDENCE),
+            "timings": timings
+        }
+        if self.store_words:
+            ocr_results["words"] = words
+
+        now = datetime.utcnow()
+        return {
+            "user_id": metadata.get("user_id"),
+            "medicine_history_id": metadata.get("medicine_history_id"),
+            "image_digest": metadata.get("digest"),
+            "image_metadata": {
+                "filename": metadata.get("filename"),
+                "size": metadata.get("size"),
+                "format": metadata.get("format"),
+                "page": metadata.get("page"),
+                "upload_timestamp": now
+            },
+            "ocr_results": ocr_results,
+            "created_at": now
+        }
+
+    def record(self, result: Dict[str, Any], **metadata):
+        """
+        Persist a scan in the background
+
+        Args:
+            result: OCR result dictionary
+            **metadata: filename, size, format, digest, page, user_id
+        """
+        if not self.enabled or "error" in result:
+            return
+        collection = self._get_collection()
+        if collection is None:
+            return
+
+        document = self.build_document(result, metadata)
+        task = asyncio.create_task(self._insert(collection, document))
+        # Keep a reference so the task is not garbage collected mid-write
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _insert(self, collection, document: Dict[str, Any]):
+        try:
+            if not self._indexed:
+                self._indexed = True
+                await collection.create_index([("user_id", 1), ("ocr_results.processing_time", -1)])
+                await collection.create_index([("user_id", 1), ("ocr_results.confidence_score", 1)])
+                await collection.create_index("image_digest")
+            await collection.insert_one(document)
+        except Exception as e:
+            print(f"Could not record OCR scan: {e}")
+
+    async def find_scans(
+        self,
+        user_id: Optional[int],
+        max_confidence: Optional[float] = None,
+        min_processing_time: Optional[float] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Recorded scans of a user that were slow and/or low quality, worst
+        first. Cache hits are left out; they repeat an earlier scan.
+
+        Args:
+            user_id: Only scans uploaded by this user
+            max_confidence: Only scans whose mean word confidence is at most this
+            min_processing_time: Only scans that took at least this many milliseconds
+            limit: Maximum number of scans to return
+
+        Returns:
+            Scan timings and metadata, without the extracted text or word boxes
+        """
+        collection = self._get_collection()
+        if collection is None:
+            raise Exception("MongoDB is not connected")
+
+        query: Dict[str, Any] = {"user_id": user_id, "ocr_results.cached": {"$ne": True}}
+        if max_confidence is not None:
+            query["ocr_results.confidence_score"] = {"$lte": max_confidence}
+        if min_processing_time is not None:
+            query["ocr_results.processing_time"] = {"$gte": min_processing_time}
+        sort_key = "ocr_results.processing_time" if min_processing_time is not None else "ocr_results.confidence_score"
+        direction = -1 if min_processing_time is not None else 1
+
+        projection = {"ocr_results.words": 0, "ocr_results.extracted_text": 0}
+        cursor = collection.find(query, projection).sort(sort_key, direction).limit(limit)
+        scans = []
+        async for scan in cursor:
+            scan["_id"] = str(scan["_id"])
+            scans.append(scan)
+        return scans
+
+# Global OCR scan store
+ocr_scan_store = OCRScanStore()
@@ -0,0 +1,192 @@
+import os
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+# Chat answer cache configuration
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "512"))
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.85"))
+CHAT_CACHE_DIMENSIONS = int(os.getenv("CHAT_CACHE_DIMENSIONS", "2048"))
+
+NEGATIONS = {"not", "no", "never", "without", "dont", "cant", "shouldnt", "avoid", "stop"}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def _hash_feature(feature: str, dimensions: int) -> int:
+    # crc32 rather than hash(), so vectors are the same in every worker
+    return zlib.crc32(feature.encode("utf-8")) % dimensions
+
+class HashingVectorizer:
+    """
+    Term-frequency vectors of word unigrams and character 3-5-grams,
+    hashed into a fixed number of dimensions. No vocabulary, no network.
+    """
+    def __init__(self, dimensions: int = CHAT_CACHE_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def features(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(text.lower().replace("'", ""))
+        normalized = f" {' '.join(words)} "
+        features = [f"w:{word}" for word in words]
+        for n in (3, 4, 5):
+            features.extend(normalized[i:i + n] for i in range(len(normalized) - n + 1))
+        return features
+
+    def transform(self, text: str) -> np.ndarray:
+        """
+        Sublinear (1 + log tf) term-frequency vector of a text
+        """
+        indices = [_hash_feature(feature, self.dimensions) for feature in self.features(text)]
+        counts = np.bincount(np.asarray(indices, dtype=np.int64), minlength=self.dimensions).astype(np.float32)
+        nonzero = counts > 0
+        counts[nonzero] = 1.0 + np.log(counts[nonzero])
+        return counts
+
+def guard_signature(text: str) -> Tuple[FrozenSet[str], bool]:
+    """
+    Parts of a question that must match exactly for answers to be shared:
+    the numbers in it (doses, ages, durations) and whether it is negated
+    """
+    words = TOKEN_PATTERN.findall(text.lower().replace("'", ""))
+    numbers = frozenset(word for word in words if any(char.isdigit() for char in word))
+    return numbers, any(word in NEGATIONS for word in words)
+
+class SemanticCache:
+    """
+    Answer cache for questions that are worded differently but mean the same.
+
+    Questions are embedded locally with a HashingVectorizer and kept as rows
+    of one preallocated matrix. A lookup is a single matrix-vector product:
+    rows are weighted by IDF over the cached questions, L2-normalized, and
+    compared by cosine similarity. A stored answer is returned when the best
+    match is at or above the threshold and passes the guards: the same
+    scope (e.g. the medicine context the question was asked with), the same
+    numbers and the same negation. Entries are evicted least recently used.
+    """
+    def __init__(
+        self,
+        max_entries: int = CHAT_CACHE_SIZE,
+        threshold: float = CHAT_CACHE_THRESHOLD,
+        dimensions: int = CHAT_CACHE_DIMENSIONS,
+        enabled: bool = CHAT_CACHE_ENABLED
+    ):
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        self.enabled = enabled
+        self.vectorizer = HashingVectorizer(dimensions)
+
+        self._term_frequencies = np.zeros((self.max_entries, dimensions), dtype=np.float32)
+        self._document_frequency = np.zeros(dimensions, dtype=np.float32)
+        self._scopes = np.zeros(self.max_entries, dtype=np.int64)
+        self._used = np.zeros(self.max_entries, dtype=bool)
+        self._weighted: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        # slot -> entry, least recently used first
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.guard_rejections = 0
+
+    @staticmethod
+    def _scope_id(scope: str) -> int:
+        return zlib.crc32(" ".join(scope.lower().split()).encode("utf-8"))
+
+    def _weights(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Recomputed only after the cached questions change
+        if self._weighted is None:
+            count = int(self._used.sum())
+            self._idf = (np.log((1.0 + count) / (1.0 + self._document_frequency)) + 1.0).astype(np.float32)
+            weighted = self._term_frequencies * self._idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._weighted = weighted / norms
+        return self._weighted, self._idf
+
+    def _query_vector(self, text: str, idf: np.ndarray) -> np.ndarray:
+        vector = self.vectorizer.transform(text) * idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, text: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Cached answer for a question similar enough to `text`
+
+        Args:
+            text: The question
+            scope: Context the answer depends on; only entries stored with
+                the same scope can match
+
+        Returns:
+            Dictionary with answer, question and similarity, or None
+        """
+        if not self.enabled:
+            return None
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        weighted, idf = self._weights()
+        similarities = weighted @ self._query_vector(text, idf)
+        similarities[~self._used | (self._scopes != self._scope_id(scope))] = -1.0
+
+        signature = guard_signature(text)
+        for slot in np.argsort(similarities)[::-1][:5]:
+            if similarities[slot] < self.threshold:
+                break
+            entry = self._entries[int(slot)]
+            if entry["signature"] != signature:
+                self.guard_rejections += 1
+                continue
+            self._entries.move_to_end(int(slot))
+            self.hits += 1
+            return {
+                "answer": entry["answer"],
+                "question": entry["question"],
+                "similarity": round(float(similarities[slot]), 4)
+            }
+
+        self.misses += 1
+        return None
+
+    def add(self, text: str, answer: str, scope: str = ""):
+        """
+        Cache the answer to a question, evicting the least recently used
+        entry when full
+        """
+        if not self.enabled or not text.strip():
+            return
+        if len(self._entries) >= self.max_entries:
+            slot, _ = self._entries.popitem(last=False)
+            self._document_frequency -= self._term_frequencies[slot] > 0
+        else:
+            slot = int(np.flatnonzero(~self._used)[0])
+
+        vector = self.vectorizer.transform(text)
+        self._term_frequencies[slot] = vector
+        self._document_frequency += vector > 0
+        self._scopes[slot] = self._scope_id(scope)
+        self._used[slot] = True
+        self._entries[slot] = {"question": text, "answer": answer, "signature": guard_signature(text)}
+        self._weighted = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit ratio and size of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "guard_rejections": self.guard_rejections,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold
+        }
+
+# Global cache of /chat answers
+chat_answer_cache = SemanticCache()
@@ -0,0 +1,148 @@
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.cache import REDIS_RETRY_INTERVAL
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    Within a process, callers arriving while a call for the same key is in
+    flight await the same future. With `use_redis`, the first worker to take
+    a Redis lock runs the call and publishes its serialized result under a
+    short-lived key; other workers poll for that result instead of running
+    the call themselves. If the lock holder disappears without a result,
+    the waiting worker runs the call on its own.
+    """
+    def __init__(
+        self,
+        namespace: str,
+        use_redis: bool = False,
+        lock_ttl: float = 120.0,
+        result_ttl: int = 30,
+        poll_interval: float = 0.1
+    ):
+        self.namespace = namespace
+        self.use_redis = use_redis
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._redis_retry_at = 0.0
+
+        self.calls = 0
+        self.executions = 0
+        self.local_shared = 0
+        self.redis_shared = 0
+
+    async def _get_redis(self):
+        if not self.use_redis or time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            from database.config import get_redis
+            return await get_redis()
+        except Exception as e:
+            print(f"SingleFlight '{self.namespace}': Redis unavailable, coalescing locally only ({e})")
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+            return None
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        dumps: Optional[Callable[[Any], str]] = None,
+        loads: Optional[Callable[[str], Any]] = None
+    ) -> Any:
+        """
+        Run `func` once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call (e.g. a hash of the request)
+            func: Coroutine function producing the result
+            dumps: Serializes the result for other workers (Redis mode)
+            loads: Deserializes a result published by another worker
+
+        Returns:
+            The shared result; exceptions are shared the same way
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            # A separate task, so one caller disconnecting does not cancel the call for the others
+            task = asyncio.create_task(self._run(key, func, dumps, loads))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.local_shared += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    async def _run(self, key: str, func, dumps, loads) -> Any:
+        client = await self._get_redis() if dumps is not None and loads is not None else None
+        if client is None:
+            self.executions += 1
+            return await func()
+
+        lock_key = f"{self.namespace}:lock:{key}"
+        result_key = f"{self.namespace}:result:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+            if not acquired:
+                shared = await self._wait_for_result(client, lock_key, result_key)
+                if shared is not None:
+                    self.redis_shared += 1
+                    return loads(shared)
+        except Exception as e:
+            print(f"SingleFlight '{self.namespace}' Redis coordination failed: {e}")
+            acquired = False
+
+        self.executions += 1
+        try:
+            result = await func()
+            if acquired:
+                try:
+                    await client.set(result_key, dumps(result), ex=self.result_ttl)
+                except Exception as e:
+                    print(f"SingleFlight '{self.namespace}' Redis publish failed: {e}")
+            return result
+        finally:
+            if acquired:
+                # Release the lock (only if still ours) so waiters stop polling
+                try:
+                    if await client.get(lock_key) == token:
+                        await client.delete(lock_key)
+                except Exception:
+                    pass
+
+    async def _wait_for_result(self, client, lock_key: str, result_key: str) -> Optional[str]:
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            shared = await client.get(result_key)
+            if shared is not None:
+                return shared
+            if not await client.exists(lock_key):
+                # Holder finished without publishing (failed) or died; check once more
+                return await client.get(result_key)
+            await asyncio.sleep(self.poll_interval)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        How many calls were coalesced instead of executed
+        """
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared_in_process": self.local_shared,
+            "shared_across_workers": self.redis_shared,
+            "in_flight": len(self._in_flight)
+        }